@@ -0,0 +1,124 @@
+import json
+from pathlib import Path
+import pytest
+import requests
+from tabulate import tabulate
+from tests.utils.hermetic import hermetic_enabled, stack as hermetic_stack
+
+# Must precede the imports of utils.env; benchmarks run without rate limits and count queries
+if hermetic_enabled():
+    hermetic_stack.configure_environment(RATE_LIMIT_ENABLED="false", QUERY_COUNT_HEADER_ENABLED="true")
+
+from benchmarks.load import PERCENTILES, find_regressions
+from models.users import User
+from tests.utils.config import get_base_url
+from utils.auth import extract_keycloak_id_from_token
+from utils.database import run_with_db_session
+from utils.env import TEST_USER_PASSWORD, TEST_USER_USERNAME
+
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption("--benchmark-requests", type=int, default=200, help="Requests sent by each API benchmark")
+    group.addoption("--benchmark-concurrency", type=int, default=8, help="Requests in flight at once")
+    group.addoption("--latency-tolerance", type=float, default=1.0, help="Fraction by which median latency may exceed the baseline")
+    group.addoption("--baseline", default=str(BASELINE_PATH), help="Baseline results to compare against")
+    group.addoption("--update-baseline", action="store_true", help="Store the results as the new baseline instead of comparing")
+
+
+def pytest_configure(config):
+    config.benchmark_results = {}
+
+
+def pytest_sessionstart(session):
+    if hermetic_enabled():
+        hermetic_stack.start()
+
+
+@pytest.fixture(scope="session")
+def base_url():
+    return get_base_url()
+
+
+@pytest.fixture(scope="session")
+def access_token(base_url):
+    response = requests.post(
+        f"{base_url}/auth/token",
+        data={"username": TEST_USER_USERNAME, "password": TEST_USER_PASSWORD},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    token = response.json().get("access_token")
+    if not token:
+        pytest.fail("Failed to obtain access token", pytrace=False)
+    run_with_db_session(ensure_user, extract_keycloak_id_from_token(token), TEST_USER_USERNAME)
+    return token
+
+
+def ensure_user(db, keycloak_id: str, username: str):
+    """Creates the benchmark user unless a user with its Keycloak ID or username exists, which is linked to the ID instead."""
+    user = db.query(User).filter((User.keycloak_id == keycloak_id) | (User.username == username)).first()
+    if user is None:
+        user = User(username=username)
+        db.add(user)
+    user.keycloak_id = keycloak_id
+    db.commit()
+
+
+@pytest.fixture(scope="session")
+def baseline(request):
+    path = Path(request.config.getoption("--baseline"))
+    if request.config.getoption("--update-baseline") or not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+@pytest.fixture
+def record_benchmark(request, baseline):
+    """Returns a function recording a benchmark's results, failing the test when they regressed from the baseline."""
+
+    def record(name: str, result: dict):
+        request.config.benchmark_results[name] = result
+        assert result["errors"] == 0, (
+            f"{result['errors']} of {result['requests']} requests failed, e.g. {result['error_samples']}. "
+            "Run the API with RATE_LIMIT_ENABLED=false for benchmarks."
+        )
+        regressions = find_regressions(result, baseline.get(name), request.config.getoption("--latency-tolerance"))
+        assert not regressions, f"{name} regressed: {'; '.join(regressions)}"
+
+    return record
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    if config.getoption("--update-baseline") and config.benchmark_results:
+        path = Path(config.getoption("--baseline"))
+        results = {name: {key: value for key, value in result.items() if key != "error_samples"} for name, result in config.benchmark_results.items()}
+        path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    if hermetic_enabled():
+        hermetic_stack.stop()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    """Prints a table of the benchmark results at the end of the session."""
+    if not config.benchmark_results:
+        return
+    rows = [
+        [
+            name,
+            result["requests"],
+            result["concurrency"],
+            *(result["latency_ms"].get(f"p{percent}") for percent in PERCENTILES),
+            result["throughput_per_second"],
+            result["queries_per_request"],
+            result["errors"],
+        ]
+        for name, result in config.benchmark_results.items()
+    ]
+    headers = ["benchmark", "requests", "concurrency", *(f"p{percent} ms" for percent in PERCENTILES), "req/s", "queries/req", "errors"]
+    terminalreporter.write_sep("=", "benchmark results")
+    terminalreporter.write_line(tabulate(rows, headers=headers))
+    if config.getoption("--update-baseline"):
+        terminalreporter.write_line(f"Baseline written to {config.getoption('--baseline')}")
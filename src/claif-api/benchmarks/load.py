@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from utils.query_count import QUERY_COUNT_HEADER
+
+
+# Latency percentiles reported for every benchmark
+PERCENTILES = (50, 95, 99)
+# Cached responses make the mean query count vary slightly between runs; an N+1 query adds a whole one
+QUERIES_PER_REQUEST_TOLERANCE = 0.5
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Returns the nearest-rank percentile of values sorted in ascending order."""
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies: List[float], elapsed_seconds: float, errors: List[str], query_counts: List[int], concurrency: int) -> Dict:
+    """Returns the JSON-ready results of a benchmark from its latencies in seconds and its wall time."""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "throughput_per_second": round(len(latencies) / elapsed_seconds, 2) if elapsed_seconds else None,
+        "latency_ms": {f"p{percent}": round(percentile(latencies, percent) * 1000, 3) for percent in PERCENTILES} if latencies else {},
+        # None when the server does not report query counts (QUERY_COUNT_HEADER_ENABLED is off)
+        "queries_per_request": round(sum(query_counts) / len(query_counts), 2) if query_counts else None,
+    }
+
+
+def run_load(send_request: Callable[[requests.Session, int], requests.Response], requests_count: int, concurrency: int, warmup_count: int = 5) -> Dict:
+    """
+    Sends requests_count requests with send_request(session, index) from concurrency threads at once,
+    returning the latency percentiles, throughput, errors and mean database queries per request.
+
+    Each thread keeps its own session, so connections are reused as a real client would. The first
+    warmup_count requests are sent beforehand and not measured.
+    """
+    local = threading.local()
+
+    def get_session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+            local.session.mount("http://", HTTPAdapter(pool_maxsize=1))
+        return local.session
+
+    for index in range(warmup_count):
+        send_request(get_session(), -1 - index)
+
+    latencies = []
+    errors = []
+    query_counts = []
+    lock = threading.Lock()
+
+    def timed_request(index: int):
+        start = time.perf_counter()
+        try:
+            response = send_request(get_session(), index)
+            error = None if response.status_code < 400 else f"{response.status_code}: {response.text[:200]}"
+        except requests.RequestException as e:
+            response, error = None, str(e)
+        latency = time.perf_counter() - start
+        with lock:
+            latencies.append(latency)
+            if error:
+                errors.append(error)
+            if response is not None and QUERY_COUNT_HEADER in response.headers:
+                query_counts.append(int(response.headers[QUERY_COUNT_HEADER]))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed_request, range(requests_count)))
+    return summarize(latencies, time.perf_counter() - start, errors, query_counts, concurrency)
+
+
+def run_calls(call: Callable[[int], None], calls_count: int, warmup_count: int = 5) -> Dict:
+    """Times calls_count in-process calls of call(index), one at a time, in the same form as run_load."""
+    for index in range(warmup_count):
+        call(-1 - index)
+    latencies = []
+    start = time.perf_counter()
+    for index in range(calls_count):
+        call_start = time.perf_counter()
+        call(index)
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.perf_counter() - start, [], [], 1)
+
+
+def find_regressions(result: Dict, baseline: Optional[Dict], latency_tolerance: float) -> List[str]:
+    """
+    Compares a benchmark's results with its baseline, returning a description of each regression.
+
+    Query counts barely vary, so any increase beyond QUERIES_PER_REQUEST_TOLERANCE is a regression.
+    Latencies vary between runs, so only a median more than latency_tolerance (a fraction) above the
+    baseline's counts; the tail percentiles move too much with garbage collection and scheduling.
+    """
+    if baseline is None:
+        return []
+    regressions = []
+    if result["queries_per_request"] is not None and baseline.get("queries_per_request") is not None:
+        if result["queries_per_request"] > baseline["queries_per_request"] + QUERIES_PER_REQUEST_TOLERANCE:
+            regressions.append(f"{result['queries_per_request']} queries per request, up from {baseline['queries_per_request']}")
+    baseline_p50 = baseline.get("latency_ms", {}).get("p50")
+    if baseline_p50 is not None and result["latency_ms"]["p50"] > baseline_p50 * (1 + latency_tolerance):
+        regressions.append(f"median latency of {result['latency_ms']['p50']}ms, up from {baseline_p50}ms")
+    return regressions
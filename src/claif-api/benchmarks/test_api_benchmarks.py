@@ -0,0 +1,128 @@
+import json
+import random
+import pytest
+import requests
+from benchmarks.load import run_calls, run_load
+from models.utils.synthetic_data import generate_session
+from models.utils.terminal_recordings import parse_asciinema_recording
+from tests.utils.config import get_auth_headers
+from tests.utils.serialization import build_large_recording, default_serialization, fast_serialization
+from utils.files import read_file, read_first_line_of_file
+
+
+RECORDING_CONTENT = read_file("asciinema_recording_samples/recording_1_revision_1.txt")
+ANNOTATED_CONTENT_METADATA = read_first_line_of_file("asciinema_recording_samples/recording_1_revision_2.txt")
+REVIEW_ANSWERS = {
+    "q_does_anno_match_content": True,
+    "q_can_anno_be_halved": False,
+    "q_how_well_anno_matches_content": 7,
+    "q_can_you_improve_anno": False,
+    "q_can_you_provide_markdown": False,
+}
+
+
+@pytest.fixture
+def load(request):
+    """Returns run_load bound to the configured number of requests and concurrency."""
+    requests_count = request.config.getoption("--benchmark-requests")
+    concurrency = request.config.getoption("--benchmark-concurrency")
+    return lambda send_request: run_load(send_request, requests_count, concurrency)
+
+
+@pytest.fixture(scope="module")
+def headers(access_token):
+    return get_auth_headers(access_token)
+
+
+@pytest.fixture(scope="module")
+def annotated_recordings(request, base_url, headers):
+    """Creates one annotated recording per concurrent request, so concurrent updates do not all wait on one row."""
+    recordings = []
+    for index in range(request.config.getoption("--benchmark-concurrency")):
+        response = requests.post(f"{base_url}/recordings/terminal/create", headers=headers, json={
+            "title": f"Benchmark recording {index}",
+            "description": "Created by the benchmarks",
+            "recording_content": RECORDING_CONTENT,
+        })
+        assert response.status_code == 200, response.text
+        recording_id = response.json()["recording_id"]
+        response = requests.post(f"{base_url}/recordings/terminal/update", headers=headers, json={
+            "recording_id": recording_id,
+            "title": f"Benchmark recording {index}",
+            "description": "Created by the benchmarks",
+            "content_metadata": ANNOTATED_CONTENT_METADATA,
+        })
+        assert response.status_code == 200, response.text
+        annotations = requests.get(f"{base_url}/recordings/terminal/{recording_id}/annotations", headers=headers).json()
+        recordings.append({"id": recording_id, "annotation_ids": [annotation["id"] for annotation in annotations]})
+    return recordings
+
+
+def test_parse_asciinema_recording(record_benchmark):
+    """Parsing a long recording, as done on every create."""
+    events, _ = generate_session(random.Random(0), 200)
+    content = "\n".join([ANNOTATED_CONTENT_METADATA, *(json.dumps(event) for event in events)])
+    record_benchmark("parse_asciinema_recording", run_calls(lambda index: parse_asciinema_recording(content), 200))
+
+
+def test_serialize_large_recording(record_benchmark):
+    """Serializing a 10 MB recording and its annotations, by the default pydantic/jsonable_encoder path and the fast path."""
+    recording, annotations = build_large_recording(10 * 1024 * 1024)
+    default_result = run_calls(lambda index: default_serialization(recording, annotations), 3, warmup_count=1)
+    fast_result = run_calls(lambda index: fast_serialization(recording, annotations), 3, warmup_count=1)
+    record_benchmark("serialize_large_recording_default", default_result)
+    record_benchmark("serialize_large_recording_fast", fast_result)
+    assert fast_result["latency_ms"]["p50"] < default_result["latency_ms"]["p50"]
+
+
+def test_create_recording(record_benchmark, load, base_url, headers):
+    payload = {"title": "Benchmark recording", "description": "Created by the benchmarks", "recording_content": RECORDING_CONTENT}
+    record_benchmark("create_recording", load(
+        lambda session, index: session.post(f"{base_url}/recordings/terminal/create", headers=headers, json=payload)
+    ))
+
+
+def test_read_recording(record_benchmark, load, base_url, headers, annotated_recordings):
+    record_benchmark("read_recording", load(
+        lambda session, index: session.get(f"{base_url}/recordings/terminal/read/{annotated_recordings[index % len(annotated_recordings)]['id']}", headers=headers)
+    ))
+
+
+def test_read_recording_review_fields(record_benchmark, load, base_url, headers, annotated_recordings):
+    """Reads as the CLI's review command makes them, leaving out the events."""
+    record_benchmark("read_recording_review_fields", load(
+        lambda session, index: session.get(
+            f"{base_url}/recordings/terminal/read/{annotated_recordings[index % len(annotated_recordings)]['id']}",
+            headers=headers,
+            params={"fields": "id,title,revision_number"},
+        )
+    ))
+
+
+def test_list_recordings(record_benchmark, load, base_url, headers):
+    record_benchmark("list_recordings", load(
+        lambda session, index: session.get(f"{base_url}/recordings/terminal/list", headers=headers)
+    ))
+
+
+def test_update_recording(record_benchmark, load, base_url, headers, annotated_recordings):
+    def update(session, index):
+        recording = annotated_recordings[index % len(annotated_recordings)]
+        return session.post(f"{base_url}/recordings/terminal/update", headers=headers, json={
+            "recording_id": recording["id"],
+            "title": "Benchmark recording",
+            "description": "Updated by the benchmarks",
+            "content_metadata": ANNOTATED_CONTENT_METADATA,
+        })
+
+    record_benchmark("update_recording", load(update))
+
+
+def test_create_annotation_review(record_benchmark, load, base_url, headers, annotated_recordings):
+    annotation_ids = [annotation_id for recording in annotated_recordings for annotation_id in recording["annotation_ids"]]
+    record_benchmark("create_annotation_review", load(
+        lambda session, index: session.post(f"{base_url}/annotation_reviews/create", headers=headers, json={
+            "annotation_id": annotation_ids[index % len(annotation_ids)],
+            **REVIEW_ANSWERS,
+        })
+    ))
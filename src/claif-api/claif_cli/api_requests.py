@@ -1,10 +1,16 @@
-import requests
+import gzip
+import json as jsonlib
 from auth_utils import get_auth_headers, handle_unauthorized
+from http_client import request
+from local_cache import cache_key, get_cached_response, set_cached_response
 
 
-def api_request(base_url, endpoint, method="GET", data=None, json=None, params=None, files=None):
+def api_request(base_url, endpoint, method="GET", data=None, json=None, params=None, files=None, compress=False, cache=False):
     """
     Makes an HTTP request to the API endpoint with authorization and retry logic.
+
+    Requests share one pooled session that retries rate-limited and failed requests with backoff.
+    An expired access token is renewed with the saved refresh token before falling back to a login prompt.
     
     Parameters:
         - base_url (str): The base URL of the API.
@@ -14,6 +20,8 @@ def api_request(base_url, endpoint, method="GET", data=None, json=None, params=N
         - json (dict, optional): JSON data to send with the request (for POST).
         - params (dict, optional): URL parameters to send with the request.
         - files (dict, optional): Files to upload with the request (for POST).
+        - compress (bool, optional): Send the JSON data gzip-compressed.
+        - cache (bool, optional): Keep the GET response in the local cache and revalidate it on later calls.
         
     Returns:
         - The response JSON if the request is successful, otherwise None.
@@ -23,18 +31,32 @@ def api_request(base_url, endpoint, method="GET", data=None, json=None, params=N
     if not headers:
         return None
 
-    response = requests.request(method, url, headers=headers, data=data, json=json, params=params, files=files)
+    encoding_headers = {}
+    if compress and json is not None:
+        data = gzip.compress(jsonlib.dumps(json).encode())
+        json = None
+        encoding_headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        headers.update(encoding_headers)
+
+    # A cached response is revalidated with its ETag, and reused when the API answers 304
+    key = cache_key(url, params) if cache and method == "GET" else None
+    cached_response = get_cached_response(key) if key else None
+    cache_headers = {"If-None-Match": cached_response[0]} if cached_response else {}
+    headers.update(cache_headers)
+
+    response = request(method, url, headers=headers, data=data, json=json, params=params, files=files)
+    if response.status_code == 401:
+        new_token = handle_unauthorized(base_url)
+        if not new_token:
+            return None
+        headers = {"Authorization": f"Bearer {new_token}", **encoding_headers, **cache_headers}
+        response = request(method, url, headers=headers, data=data, json=json, params=params, files=files)
+
+    if response.status_code == 304 and cached_response:
+        return jsonlib.loads(cached_response[1])
     if response.status_code == 200:
+        if key and response.headers.get("ETag"):
+            set_cached_response(key, response.headers["ETag"], response.content)
         return response.json()
-    elif response.status_code == 401:
-        new_token = handle_unauthorized(base_url)
-        if new_token:
-            headers = {"Authorization": f"Bearer {new_token}"}
-            response = requests.request(method, url, headers=headers, data=data, json=json, params=params, files=files)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"Error performing {method} request: {response.status_code} - {response.text}")
-    else:
-        print(f"Error performing {method} request: {response.status_code} - {response.text}")
-    return None
\ No newline at end of file
+    print(f"Error performing {method} request: {response.status_code} - {response.text}")
+    return None
@@ -1,6 +1,7 @@
 import json
-import requests
+import sys
 from getpass import getpass
+from http_client import request
 
 TOKEN_FILE = "access_token.json"
 
@@ -12,17 +13,22 @@ def get_auth_headers():
         print("Access token not found. Please login first using the 'login' command.")
         return {}
 
-def load_access_token():
+def load_tokens():
     try:
         with open(TOKEN_FILE, 'r') as f:
-            data = json.load(f)
-            return data.get("access_token")
+            return json.load(f)
     except FileNotFoundError:
-        return None
+        return {}
+
+def load_access_token():
+    return load_tokens().get("access_token")
 
-def save_access_token(token):
+def load_refresh_token():
+    return load_tokens().get("refresh_token")
+
+def save_access_token(token, refresh_token=None):
     with open(TOKEN_FILE, 'w') as f:
-        json.dump({"access_token": token}, f)
+        json.dump({"access_token": token, "refresh_token": refresh_token}, f)
 
 def login(base_url, password=None):
     username = input("Username: ")
@@ -34,12 +40,12 @@ def login(base_url, password=None):
         "grant_type": "password"
     }
 
-    response = requests.post(url, data=payload)
+    response = request("POST", url, data=payload)
     if response.status_code == 200:
         token_data = response.json()
         access_token = token_data.get("access_token")
         if access_token:
-            save_access_token(access_token)
+            save_access_token(access_token, token_data.get("refresh_token"))
             print("Login successful! Access token saved.")
             return access_token
         else:
@@ -49,6 +55,25 @@ def login(base_url, password=None):
         print(f"Error logging in: {response.status_code} - {response.text}")
         return None
 
+def refresh_access_token(base_url):
+    """Exchanges the saved refresh token for a new access token, returning None if it was rejected."""
+    refresh_token = load_refresh_token()
+    if not refresh_token:
+        return None
+    response = request("POST", f"{base_url}/auth/refresh", data={"refresh_token": refresh_token})
+    if response.status_code != 200:
+        return None
+    token_data = response.json()
+    save_access_token(token_data["access_token"], token_data.get("refresh_token"))
+    return token_data["access_token"]
+
 def handle_unauthorized(base_url):
+    new_token = refresh_access_token(base_url)
+    if new_token:
+        return new_token
+    # Scripted runs have nobody to answer the prompt, so they stop instead of waiting for input
+    if not sys.stdin.isatty():
+        print("Access token has expired or is invalid. Please login again using the 'login' command.")
+        return None
     print("Access token has expired or is invalid. Please log in again.")
     return login(base_url)
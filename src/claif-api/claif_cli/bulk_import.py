@@ -0,0 +1,229 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from auth_utils import get_auth_headers, refresh_access_token
+from http_client import request
+
+TERMINAL_EXTENSIONS = {".cast"}
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".m4a"}
+MANIFEST_FILENAME = ".claif-import-manifest.json"
+DEFAULT_WORKERS = 4
+
+
+def discover_files(directory):
+    """Returns the (path, kind) of every terminal recording and audio file under the directory, in path order."""
+    discovered = []
+    for path in sorted(Path(directory).rglob("*")):
+        if not path.is_file():
+            continue
+        suffix = path.suffix.lower()
+        if suffix in TERMINAL_EXTENSIONS:
+            discovered.append((path, "terminal"))
+        elif suffix in AUDIO_EXTENSIONS:
+            discovered.append((path, "audio"))
+    return discovered
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImportManifest:
+    """
+    Records uploaded files by content hash, so a rerun skips files already uploaded, even renamed or
+    moved ones. The manifest is rewritten atomically after every upload, so an interrupted import
+    loses nothing it finished.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.in_progress = set()
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def claim(self, digest):
+        """Returns whether the caller should upload the content, which no other worker has uploaded or claimed."""
+        with self.lock:
+            if digest in self.entries or digest in self.in_progress:
+                return False
+            self.in_progress.add(digest)
+            return True
+
+    def release(self, digest):
+        with self.lock:
+            self.in_progress.discard(digest)
+
+    def record(self, digest, entry):
+        with self.lock:
+            self.in_progress.discard(digest)
+            self.entries[digest] = entry
+            temporary_path = self.path.with_name(self.path.name + ".tmp")
+            with open(temporary_path, "w") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(temporary_path, self.path)
+
+
+class AdaptiveConcurrency:
+    """
+    Bounds the uploads in flight with additive increase, multiplicative decrease: each success raises
+    the limit by about one per round of uploads, and each rate-limited upload halves it.
+    """
+
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, rate_limited):
+        with self.condition:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+def was_rate_limited(response):
+    """Returns whether the API rate-limited the request, including attempts the session retried."""
+    if response.status_code == 429:
+        return True
+    retries = getattr(response.raw, "retries", None)
+    return any(attempt.status == 429 for attempt in getattr(retries, "history", ()))
+
+
+class SharedAuth:
+    """Auth headers shared by the workers, renewed once with the refresh token when a worker finds them expired."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.lock = threading.Lock()
+        self.headers = get_auth_headers()
+
+    def renew(self, expired_headers):
+        with self.lock:
+            # Another worker may have renewed the token already
+            if self.headers == expired_headers:
+                new_token = refresh_access_token(self.base_url)
+                if not new_token:
+                    return None
+                self.headers = {"Authorization": f"Bearer {new_token}"}
+            return self.headers
+
+
+def upload_file(base_url, path, kind, headers, compress):
+    if kind == "terminal":
+        with open(path, "r") as f:
+            payload = {
+                "title": path.stem,
+                "description": f"Imported from {path.name}",
+                "recording_content": f.read(),
+            }
+        url = f"{base_url}/recordings/terminal/create"
+        if compress:
+            body = gzip.compress(json.dumps(payload).encode())
+            headers = {**headers, "Content-Type": "application/json", "Content-Encoding": "gzip"}
+            return request("POST", url, headers=headers, data=body)
+        return request("POST", url, headers=headers, json=payload)
+    with open(path, "rb") as f:
+        return request("POST", f"{base_url}/recordings/audio_files/create", headers=headers, files={"file": (path.name, f)})
+
+
+def bulk_import(base_url, directory, workers=DEFAULT_WORKERS, manifest_path=None, compress=False):
+    """
+    Uploads every terminal recording (.cast) and audio file under the directory, several at a time.
+
+    Concurrency adapts to the API's rate limits, and files already in the manifest are skipped, so an
+    interrupted import can simply be rerun. Returns the counts of uploaded, skipped and failed files.
+    """
+    files = discover_files(directory)
+    if not files:
+        print(f"No terminal recordings or audio files found in {directory}.")
+        return {"uploaded": 0, "skipped": 0, "failed": 0}
+
+    auth = SharedAuth(base_url)
+    if not auth.headers:
+        return None
+    manifest = ImportManifest(manifest_path or Path(directory) / MANIFEST_FILENAME)
+    concurrency = AdaptiveConcurrency(workers)
+    counts = {"uploaded": 0, "skipped": 0, "failed": 0}
+    uploaded_bytes = [0]
+    output_lock = threading.Lock()
+    started_at = time.monotonic()
+
+    def report(status, path, detail=""):
+        with output_lock:
+            counts[status] += 1
+            done = sum(counts.values())
+            print(f"[{done}/{len(files)}] {status} {path}{f' ({detail})' if detail else ''}")
+
+    def import_file(path, kind):
+        digest = file_sha256(path)
+        if not manifest.claim(digest):
+            report("skipped", path, "already uploaded")
+            return
+        headers = auth.headers
+        concurrency.acquire()
+        rate_limited = False
+        try:
+            response = upload_file(base_url, path, kind, headers, compress)
+            rate_limited = was_rate_limited(response)
+            if response.status_code == 401:
+                headers = auth.renew(headers)
+                if headers:
+                    response = upload_file(base_url, path, kind, headers, compress)
+        except (OSError, ValueError) as e:
+            manifest.release(digest)
+            report("failed", path, str(e))
+            return
+        finally:
+            concurrency.release(rate_limited)
+
+        if response.status_code != 200:
+            manifest.release(digest)
+            report("failed", path, f"{response.status_code} - {response.text}")
+            return
+        manifest.record(digest, {
+            "path": str(path),
+            "kind": kind,
+            "uploaded_at": datetime.now(timezone.utc).isoformat(),
+            "response": response.json(),
+        })
+        with output_lock:
+            uploaded_bytes[0] += path.stat().st_size
+        report("uploaded", path)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(import_file, path, kind) for path, kind in files]:
+            future.result()
+
+    elapsed = max(time.monotonic() - started_at, 1e-6)
+    print(
+        f"Uploaded {counts['uploaded']}, skipped {counts['skipped']}, failed {counts['failed']} "
+        f"in {elapsed:.1f}s ({counts['uploaded'] / elapsed:.2f} files/s, "
+        f"{uploaded_bytes[0] / elapsed / (1024 * 1024):.2f} MiB/s)"
+    )
+    if counts["failed"]:
+        print("Rerun the same command to retry the failed files; uploaded files will be skipped.")
+    return counts
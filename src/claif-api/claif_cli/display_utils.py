@@ -37,4 +37,38 @@ def display_recordings_list(recordings):
         table_data.append(row)
     
     headers = ["ID", "Title", "Revision", "Annos", "Size", "Duration", "Creator"]
-    print(tabulate(table_data, headers, tablefmt="grid"))
\ No newline at end of file
+    print(tabulate(table_data, headers, tablefmt="grid"))
+
+
+def display_search_results(results):
+    table_data = []
+    for result in results:
+        truncated_title = result["title"][:30] + "..." if len(result["title"]) > 30 else result["title"]
+        truncated_description = result["description"][:40] + "..." if len(result["description"]) > 40 else result["description"]
+
+        row = [
+            result["id"],
+            truncated_title,
+            truncated_description,
+            result["revision_number"],
+            f"{result['rank']:.3f}",
+            result["creator_username"],
+        ]
+        table_data.append(row)
+
+    headers = ["ID", "Title", "Description", "Revision", "Rank", "Creator"]
+    print(tabulate(table_data, headers, tablefmt="grid"))
+
+
+def display_export(export):
+    print(f"Export {export['id']}: {export['status']}, {export['records_count']} records")
+    if export["error"]:
+        print(f"Error: {export['error']}")
+    if export["shards"]:
+        table_data = [
+            [f"{export['bucket_name']}/{shard['object_name']}", shard["records_count"], f"{int(shard['size_bytes'] / 1024)}KB"]
+            for shard in export["shards"]
+        ]
+        print(tabulate(table_data, ["Object", "Records", "Size"], tablefmt="grid"))
+    if export["watermark"]:
+        print(f"For the changes since this export, run: export --since-export {export['id']}")
@@ -0,0 +1,44 @@
+import time
+from api_requests import api_request
+from display_utils import display_export
+
+# Seconds between status checks while waiting for an export to finish
+EXPORT_POLL_SECONDS = 5
+
+
+def create_export(base_url, min_reviews_count=None, min_mean_score=None, since=None, since_export_id=None, include_content=True, wait=False):
+    if since_export_id is not None:
+        # Incremental exports continue from the watermark of an earlier export
+        previous_export = api_request(base_url, f"/exports/{since_export_id}")
+        if previous_export is None:
+            return None
+        if not previous_export["watermark"]:
+            print(f"Export {since_export_id} has not completed, so it has no watermark to continue from.")
+            return None
+        since = previous_export["watermark"]
+
+    payload = {
+        "min_reviews_count": min_reviews_count,
+        "min_mean_score": min_mean_score,
+        "since": since,
+        "include_content": include_content,
+    }
+    export = api_request(base_url, "/exports", method="POST", json=payload)
+    if export is None:
+        return None
+    print(f"Export {export['id']} started.")
+
+    while wait and export["status"] in ("pending", "running"):
+        time.sleep(EXPORT_POLL_SECONDS)
+        export = api_request(base_url, f"/exports/{export['id']}")
+        if export is None:
+            return None
+    display_export(export)
+    return export
+
+
+def show_export(base_url, export_id):
+    export = api_request(base_url, f"/exports/{export_id}")
+    if export:
+        display_export(export)
+    return export
@@ -0,0 +1,73 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT_SECONDS = 30
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_POOL_SIZE = 10
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+_session = None
+_timeout = DEFAULT_TIMEOUT_SECONDS
+_max_retries = DEFAULT_MAX_RETRIES
+_pool_size = DEFAULT_POOL_SIZE
+_session_lock = threading.Lock()
+
+
+class ApiRetry(Retry):
+    """
+    Retries rate-limited requests whatever their method, since the API rejected them before doing
+    anything, but retries server errors only for idempotent methods, so a create is never applied twice.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429:
+            return bool(self.total)
+        if method.upper() not in IDEMPOTENT_METHODS:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def create_session(max_retries, pool_size=DEFAULT_POOL_SIZE):
+    """Creates a session that keeps connections alive and retries with backoff, honoring Retry-After."""
+    retry = ApiRetry(
+        total=max_retries,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=IDEMPOTENT_METHODS,
+        respect_retry_after_header=True,
+        # Hand the last response back once retries run out, so callers can report it
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    # Each concurrent request needs its own pooled connection to keep it alive afterwards
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def configure_http_client(timeout=DEFAULT_TIMEOUT_SECONDS, max_retries=DEFAULT_MAX_RETRIES, pool_size=DEFAULT_POOL_SIZE):
+    global _session, _timeout, _max_retries, _pool_size
+    _timeout = timeout
+    if (max_retries, pool_size) != (_max_retries, _pool_size):
+        _max_retries, _pool_size = max_retries, pool_size
+        _session = None
+
+
+def get_session():
+    global _session
+    # Bulk imports send from several threads, which must all share the one session
+    with _session_lock:
+        if _session is None:
+            _session = create_session(_max_retries, _pool_size)
+        return _session
+
+
+def request(method, url, **kwargs):
+    """Sends a request on the shared session, with the configured timeout unless one is given."""
+    kwargs.setdefault("timeout", _timeout)
+    return get_session().request(method, url, **kwargs)
@@ -0,0 +1,75 @@
+class IntervalTree:
+    """
+    Centered interval tree over closed intervals.
+
+    Built once from (start, end, item) tuples, it answers "which items overlap this point or window"
+    in O(log n + k) instead of scanning every interval.
+    """
+
+    def __init__(self, intervals):
+        intervals = list(intervals)
+        self.center = None
+        self.left = None
+        self.right = None
+        self.by_start = []
+        self.by_end = []
+        if not intervals:
+            return
+
+        # Split around the median endpoint so both subtrees stay balanced
+        endpoints = sorted(point for start, end, _ in intervals for point in (start, end))
+        self.center = endpoints[len(endpoints) // 2]
+
+        left, right = [], []
+        for interval in intervals:
+            start, end, _ = interval
+            if end < self.center:
+                left.append(interval)
+            elif start > self.center:
+                right.append(interval)
+            else:
+                self.by_start.append(interval)
+        self.by_start.sort(key=lambda interval: interval[0])
+        self.by_end = sorted(self.by_start, key=lambda interval: interval[1], reverse=True)
+
+        if left:
+            self.left = IntervalTree(left)
+        if right:
+            self.right = IntervalTree(right)
+
+    def at(self, point):
+        """Returns the items whose interval contains the point."""
+        return self.overlapping(point, point)
+
+    def overlapping(self, start, end):
+        """Returns the items whose interval overlaps [start, end], ordered by interval start."""
+        results = []
+        self._collect(start, end, results)
+        results.sort(key=lambda interval: (interval[0], interval[1]))
+        return [item for _, _, item in results]
+
+    def _collect(self, start, end, results):
+        if self.center is None:
+            return
+        if end < self.center:
+            # Intervals at this node all reach the center, so only their starts matter
+            for interval in self.by_start:
+                if interval[0] > end:
+                    break
+                results.append(interval)
+            if self.left:
+                self.left._collect(start, end, results)
+        elif start > self.center:
+            # Intervals at this node all start before the center, so only their ends matter
+            for interval in self.by_end:
+                if interval[1] < start:
+                    break
+                results.append(interval)
+            if self.right:
+                self.right._collect(start, end, results)
+        else:
+            results.extend(self.by_start)
+            if self.left:
+                self.left._collect(start, end, results)
+            if self.right:
+                self.right._collect(start, end, results)
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+CACHE_FILENAME = "responses.sqlite3"
+# The least recently stored responses beyond this many are dropped
+MAX_ENTRIES = 1000
+
+_enabled = True
+
+
+def configure_local_cache(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+
+def cache_path():
+    """Returns the cache database path under $XDG_CACHE_HOME, or ~/.cache when it is not set."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "claif" / CACHE_FILENAME
+
+
+def cache_key(url, params=None):
+    """Returns the key of a GET request; the URL holds the recording id and the params its revision and fields."""
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted((name, value) for name, value in params.items() if value is not None))}"
+
+
+def connect():
+    path = cache_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, etag TEXT NOT NULL, body BLOB NOT NULL, stored_at REAL NOT NULL)"
+    )
+    return connection
+
+
+def get_cached_response(key):
+    """Returns the cached (etag, body) for the key, or None when it is not cached or caching is off."""
+    if not _enabled:
+        return None
+    connection = connect()
+    try:
+        return connection.execute("SELECT etag, body FROM responses WHERE key = ?", (key,)).fetchone()
+    finally:
+        connection.close()
+
+
+def set_cached_response(key, etag, body):
+    if not _enabled:
+        return
+    connection = connect()
+    try:
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, etag, body, time.time()))
+            connection.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY stored_at DESC LIMIT ?)",
+                (MAX_ENTRIES,),
+            )
+    finally:
+        connection.close()
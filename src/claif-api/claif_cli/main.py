@@ -1,12 +1,19 @@
 import argparse
 from auth_utils import login
+from http_client import DEFAULT_MAX_RETRIES, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT_SECONDS, configure_http_client
+from bulk_import import DEFAULT_WORKERS, bulk_import
+from local_cache import configure_local_cache
 from recordings import (
+    REVIEW_RECORDING_FIELDS,
     review_recording,
     create_recording,
     update_recording,
     list_recordings,
+    search_recordings,
+    delete_recording,
 )
 from audio_files import create_audio_file
+from exports import create_export, show_export
 
 DEFAULT_URL = "http://localhost:8000/v1"
 
@@ -15,6 +22,9 @@ def main():
     parser = argparse.ArgumentParser(description="CLI tool for interacting with FastAPI app.")
     parser.add_argument("--base-url", default=DEFAULT_URL, help="Base URL of the FastAPI app")
     parser.add_argument("--password", help="Don't use this for prod environments. Provide password directly for testing purposes")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_SECONDS, help="Seconds to wait for each API response")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES, help="Retries for rate-limited or failed requests")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor store responses in the local cache")
 
     subparsers = parser.add_subparsers(dest="command")
 
@@ -24,11 +34,13 @@ def main():
     review_recording_parser = subparsers.add_parser("review-recording", help="Review a recording")
     review_recording_parser.add_argument("recording_id", type=int, help="ID of the recording to review")
     review_recording_parser.add_argument("--revision-number", type=int, help="Revision number of the recording")
+    review_recording_parser.add_argument("--fields", default=REVIEW_RECORDING_FIELDS, help="Comma-separated recording fields to fetch along with the annotations")
 
     create_recording_parser = subparsers.add_parser("create-recording", help="Create a new recording")
     create_recording_parser.add_argument("recording_filepath", help="Path to the recording file")
     create_recording_parser.add_argument("recording_title", help="Title of the recording")
     create_recording_parser.add_argument("recording_description", help="Description of the recording")
+    create_recording_parser.add_argument("--compress", action="store_true", help="Upload the recording gzip-compressed")
 
     update_recording_parser = subparsers.add_parser("update-recording", help="Update an existing recording")
     update_recording_parser.add_argument("recording_id", type=int, help="ID of the recording to update")
@@ -38,23 +50,53 @@ def main():
 
     list_recordings_parser = subparsers.add_parser("list-recordings", help="List all recordings")
 
+    delete_recording_parser = subparsers.add_parser("delete-recording", help="Delete a recording you created")
+    delete_recording_parser.add_argument("recording_id", type=int, help="ID of the recording to delete")
+
+    search_parser = subparsers.add_parser("search", help="Search recordings by title, description, annotations and output")
+    search_parser.add_argument("query", help="Search terms; supports quoted phrases, OR and -excluded words")
+    search_parser.add_argument("--limit", type=int, default=20, help="Maximum number of results")
+    search_parser.add_argument("--offset", type=int, default=0, help="Number of results to skip")
+
     create_audio_file_parser = subparsers.add_parser("create-audio-file", help="Create a new audio file")
     create_audio_file_parser.add_argument("audio_filepath", help="Path to the audio file")
+
+    export_parser = subparsers.add_parser("export", help="Export recordings, annotations and review stats as training data")
+    export_parser.add_argument("--min-reviews", type=int, help="Only export recordings whose current revision has at least this many reviews")
+    export_parser.add_argument("--min-mean-score", type=float, help="Only export recordings whose current revision's mean review score is at least this (1-10)")
+    export_since_group = export_parser.add_mutually_exclusive_group()
+    export_since_group.add_argument("--since", help="Only export recordings changed after this ISO 8601 time")
+    export_since_group.add_argument("--since-export", type=int, help="Only export recordings changed since the given export")
+    export_parser.add_argument("--no-content", action="store_true", help="Leave out the recordings' terminal events")
+    export_parser.add_argument("--wait", action="store_true", help="Wait for the export to finish and list its files")
+
+    export_status_parser = subparsers.add_parser("export-status", help="Show the status and files of an export")
+    export_status_parser.add_argument("export_id", type=int, help="ID of the export")
+
+    bulk_import_parser = subparsers.add_parser("bulk-import", help="Upload every .cast and audio file in a directory")
+    bulk_import_parser.add_argument("directory", help="Directory to search for files, including subdirectories")
+    bulk_import_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Maximum number of concurrent uploads")
+    bulk_import_parser.add_argument("--manifest", help="Manifest of uploaded files (default: .claif-import-manifest.json in the directory)")
+    bulk_import_parser.add_argument("--compress", action="store_true", help="Upload terminal recordings gzip-compressed")
     
     args = parser.parse_args()
 
     base_url = args.base_url
+    pool_size = max(args.workers, DEFAULT_POOL_SIZE) if args.command == "bulk-import" else DEFAULT_POOL_SIZE
+    configure_http_client(timeout=args.timeout, max_retries=args.max_retries, pool_size=pool_size)
+    configure_local_cache(enabled=not args.no_cache)
 
     if args.command == "login":
         login(base_url, password=args.password)
     elif args.command == "review-recording":
-        review_recording(base_url, args.recording_id, args.revision_number)
+        review_recording(base_url, args.recording_id, args.revision_number, fields=args.fields)
     elif args.command == "create-recording":
         create_recording(
             base_url, 
             args.recording_filepath, 
             args.recording_title, 
-            args.recording_description
+            args.recording_description,
+            compress=args.compress,
         )
     elif args.command == "update-recording":
         update_recording(
@@ -66,8 +108,26 @@ def main():
         )
     elif args.command == "list-recordings":
         list_recordings(base_url)
+    elif args.command == "delete-recording":
+        delete_recording(base_url, args.recording_id)
+    elif args.command == "search":
+        search_recordings(base_url, args.query, limit=args.limit, offset=args.offset)
     elif args.command == "create-audio-file":
         create_audio_file(base_url, args.audio_filepath)
+    elif args.command == "export":
+        create_export(
+            base_url,
+            min_reviews_count=args.min_reviews,
+            min_mean_score=args.min_mean_score,
+            since=args.since,
+            since_export_id=args.since_export,
+            include_content=not args.no_content,
+            wait=args.wait,
+        )
+    elif args.command == "export-status":
+        show_export(base_url, args.export_id)
+    elif args.command == "bulk-import":
+        bulk_import(base_url, args.directory, workers=args.workers, manifest_path=args.manifest, compress=args.compress)
 
 
 if __name__ == "__main__":
@@ -1,33 +1,72 @@
-from display_utils import display_annotations, display_recordings_list
+from display_utils import display_annotations, display_recordings_list, display_search_results
 from annotation_reviews import create_review
 from api_requests import api_request
+from interval_tree import IntervalTree
+
+
+# Reviewing renders only the annotations, so the recording's events and header are left out
+REVIEW_RECORDING_FIELDS = "id,title,revision_number"
 
 
 def list_recordings(base_url):
     return api_request(base_url, "/recordings/terminal/list")
 
 
-def fetch_recording(base_url, recording_id, revision_number):
-    params = {"revision_number": revision_number}
-    return api_request(base_url, f"/recordings/terminal/read/{recording_id}")
+def fetch_recording(base_url, recording_id, revision_number, fields=None):
+    params = {"revision_number": revision_number, "fields": fields}
+    return api_request(base_url, f"/recordings/terminal/read/{recording_id}", params=params, cache=True)
 
 
 def delete_recording(base_url, recording_id):
-    return api_request(base_url, f"/recordings/terminal/delete/{recording_id}", method="DELETE")
+    response = api_request(base_url, f"/recordings/terminal/delete/{recording_id}", method="DELETE")
+    if response and "message" in response:
+        print(response["message"])
+    return response
+
+
+def parse_time_window(text):
+    """Parses "<seconds>" or "<from>-<to>" into a millisecond window, or None when empty."""
+    text = text.strip()
+    if not text:
+        return None
+    start, _, end = text.partition("-")
+    start_ms = float(start) * 1000
+    end_ms = float(end) * 1000 if end else start_ms
+    if start_ms > end_ms:
+        raise ValueError("The window start must not be after its end.")
+    return start_ms, end_ms
 
 
-def review_recording(base_url, recording_id, revision_number):
-    recording = fetch_recording(base_url, recording_id, revision_number)
+def review_recording(base_url, recording_id, revision_number, fields=REVIEW_RECORDING_FIELDS):
+    recording = fetch_recording(base_url, recording_id, revision_number, fields=fields)
     if not recording:
         return
 
     annotations = recording.get('annotations', [])
+    annotation_tree = IntervalTree(
+        (annotation['start_time_milliseconds'], annotation['end_time_milliseconds'], annotation)
+        for annotation in annotations
+    )
+    displayed_annotations = annotations
     while True:
         print("\nAnnotations for Recording ID:", recording_id)
-        display_annotations(annotations)
+        display_annotations(displayed_annotations)
+
+        selection = input(
+            "Enter the ID of the annotation you want to review, @<seconds> or @<from>-<to> to jump to a time window, "
+            "@ to show all (or 0 to exit): "
+        ).strip()
+        if selection.startswith("@"):
+            try:
+                time_window = parse_time_window(selection[1:])
+            except ValueError:
+                print("Invalid time window. Use @<seconds> or @<from>-<to>.")
+                continue
+            displayed_annotations = annotation_tree.overlapping(*time_window) if time_window else annotations
+            continue
 
         try:
-            annotation_id = int(input("Enter the ID of the annotation you want to review (or 0 to exit): ").strip())
+            annotation_id = int(selection)
         except ValueError:
             print("Invalid input. Please enter a valid ID.")
             continue
@@ -56,7 +95,7 @@ def review_recording(base_url, recording_id, revision_number):
         selected_annotation['reviews_count'] += 1
 
 
-def create_recording(base_url, recording_filepath, title, description):
+def create_recording(base_url, recording_filepath, title, description, compress=False):
     with open(recording_filepath, 'r') as file:
         recording_content = file.read()
 
@@ -65,7 +104,7 @@ def create_recording(base_url, recording_filepath, title, description):
         "description": description,
         "recording_content": recording_content,
     }
-    response = api_request(base_url, "/recordings/terminal/create", method="POST", json=payload)
+    response = api_request(base_url, "/recordings/terminal/create", method="POST", json=payload, compress=compress)
     if "message" in response:
         print(response["message"])
 
@@ -101,6 +140,18 @@ def update_recording(base_url, recording_id, recording_filepath=None, title=None
 
 
 def list_recordings(base_url):
-    recordings = api_request(base_url, "/recordings/terminal/list")
+    recordings = api_request(base_url, "/recordings/terminal/list", cache=True)
     if recordings:
         display_recordings_list(recordings)
+
+
+def search_recordings(base_url, query, limit=20, offset=0):
+    response = api_request(base_url, "/search", params={"q": query, "limit": limit, "offset": offset})
+    if response is None:
+        return
+    if not response["results"]:
+        print(f"No recordings match '{query}'.")
+        return
+    display_search_results(response["results"])
+    if response["next_offset"] is not None:
+        print(f"More results available with --offset {response['next_offset']}")
@@ -1,4 +1,4 @@
-from routers import users, auth, terminal_recordings, annotation_reviews, audio_files
+from routers import users, auth, terminal_recordings, annotation_reviews, audio_files, search, exports
 from models.base_models import ORMBase
 from utils.fastapi import init_fastapi_app
 from utils.database import engine
@@ -15,6 +15,8 @@ app.include_router(users.router, prefix="/v1/users", tags=["users"])
 app.include_router(terminal_recordings.router, prefix="/v1/recordings/terminal", tags=["terminal_recordings"])
 app.include_router(audio_files.router, prefix="/v1/recordings/audio_files", tags=["audio_files"])
 app.include_router(annotation_reviews.router, prefix="/v1/annotation_reviews", tags=["annotation_reviews"])
+app.include_router(search.router, prefix="/v1/search", tags=["search"])
+app.include_router(exports.router, prefix="/v1/exports", tags=["exports"])
 
 
 # Create the database tables, create enum, and fetch Keycloak public key at startup
@@ -25,7 +27,11 @@ def on_startup():
     ORMBase.metadata.create_all(bind=engine, checkfirst=True)
     logging.info("Database tables created successfully.")
 
-    # Fetch Keycloak public key and store it in the app state
+    # Fetch Keycloak public key and store it in the app state, unless one was set beforehand (as the
+    # hermetic test harness does with its own signing key)
+    if getattr(app.state, "keycloak_public_key", None):
+        logging.info("Using the Keycloak public key already in app state.")
+        return
     logging.info("Fetching Keycloak public key...")
     app.state.keycloak_public_key = fetch_keycloak_public_key()
     logging.info("Keycloak public key successfully fetched and stored in app state.")
@@ -0,0 +1,102 @@
+from typing import Dict, Optional
+from pydantic import BaseModel
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, UniqueConstraint, func
+from models.base_models import ORMBase
+
+
+# Possible answers to q_how_well_anno_matches_content
+REVIEW_SCORES = range(1, 11)
+REVIEW_BOOLEAN_QUESTIONS = (
+    "q_does_anno_match_content",
+    "q_can_anno_be_halved",
+    "q_can_you_improve_anno",
+    "q_can_you_provide_markdown",
+)
+
+
+# SQLAlchemy models
+class AnnotationReviewStats(ORMBase):
+    """
+    Base class for incrementally maintained annotation review aggregates.
+
+    The score columns aggregate q_how_well_anno_matches_content; the yes counts aggregate the boolean questions.
+    """
+
+    __abstract__ = True
+    # Incremented on every change, so the version identifies the state of the aggregated reviews
+    version = Column(Integer, nullable=False, default=0)
+    # Set on every change, so incremental exports find the revisions reviewed since their watermark
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    reviews_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    score_1_count = Column(Integer, nullable=False, default=0)
+    score_2_count = Column(Integer, nullable=False, default=0)
+    score_3_count = Column(Integer, nullable=False, default=0)
+    score_4_count = Column(Integer, nullable=False, default=0)
+    score_5_count = Column(Integer, nullable=False, default=0)
+    score_6_count = Column(Integer, nullable=False, default=0)
+    score_7_count = Column(Integer, nullable=False, default=0)
+    score_8_count = Column(Integer, nullable=False, default=0)
+    score_9_count = Column(Integer, nullable=False, default=0)
+    score_10_count = Column(Integer, nullable=False, default=0)
+    q_does_anno_match_content_yes_count = Column(Integer, nullable=False, default=0)
+    q_can_anno_be_halved_yes_count = Column(Integer, nullable=False, default=0)
+    q_can_you_improve_anno_yes_count = Column(Integer, nullable=False, default=0)
+    q_can_you_provide_markdown_yes_count = Column(Integer, nullable=False, default=0)
+
+
+class TerminalAnnotationReviewStats(AnnotationReviewStats):
+    __tablename__ = "terminal_annotation_review_stats"
+    annotation_id = Column(Integer, ForeignKey("terminal_recording_annotations.id", ondelete="CASCADE"), unique=True, index=True, nullable=False)
+    recording_id = Column(Integer, ForeignKey("terminal_recordings.id", ondelete="CASCADE"), index=True)
+    revision_number = Column(Integer)
+
+
+class TerminalRecordingReviewStats(AnnotationReviewStats):
+    __tablename__ = "terminal_recording_review_stats"
+    __table_args__ = (
+        UniqueConstraint("recording_id", "revision_number", name="uq_terminal_recording_review_stats_revision"),
+    )
+    recording_id = Column(Integer, ForeignKey("terminal_recordings.id", ondelete="CASCADE"), nullable=False)
+    revision_number = Column(Integer, nullable=False)
+
+
+# Pydantic models
+class AnnotationReviewStatsRead(BaseModel):
+    """Pydantic model for reading aggregated annotation review answers."""
+    reviews_count: int
+    q_how_well_anno_matches_content_mean: Optional[float]
+    q_how_well_anno_matches_content_histogram: Dict[int, int]
+    q_does_anno_match_content_yes_ratio: Optional[float]
+    q_can_anno_be_halved_yes_ratio: Optional[float]
+    q_can_you_improve_anno_yes_ratio: Optional[float]
+    q_can_you_provide_markdown_yes_ratio: Optional[float]
+
+    @classmethod
+    def from_stats(cls, stats: Optional[AnnotationReviewStats], **fields):
+        """Builds the read model from a stats row, or from empty stats when nothing was reviewed yet."""
+        reviews_count = stats.reviews_count if stats else 0
+        aggregates = {
+            "reviews_count": reviews_count,
+            "q_how_well_anno_matches_content_mean": stats.score_sum / reviews_count if reviews_count else None,
+            "q_how_well_anno_matches_content_histogram": {
+                score: getattr(stats, f"score_{score}_count") if stats else 0 for score in REVIEW_SCORES
+            },
+        }
+        for question in REVIEW_BOOLEAN_QUESTIONS:
+            yes_count = getattr(stats, f"{question}_yes_count") if stats else 0
+            aggregates[f"{question}_yes_ratio"] = yes_count / reviews_count if reviews_count else None
+        return cls(**aggregates, **fields)
+
+
+class TerminalAnnotationReviewStatsRead(AnnotationReviewStatsRead):
+    """Pydantic model for reading the review aggregates of a terminal recording annotation."""
+    annotation_id: int
+    recording_id: int
+    revision_number: int
+
+
+class TerminalRecordingReviewStatsRead(AnnotationReviewStatsRead):
+    """Pydantic model for reading the review aggregates of a terminal recording revision."""
+    recording_id: int
+    revision_number: int
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Annotated, Optional
-from pydantic import BaseModel, conint
-from sqlalchemy import CheckConstraint, Column, Integer, ForeignKey, Boolean
+from pydantic import BaseModel, conint, conlist
+from sqlalchemy import CheckConstraint, Column, Index, Integer, ForeignKey, Boolean
 from sqlalchemy.orm import relationship
 from models.base_models import ORMBase, Creatable
 from models.users import UserRead
@@ -25,6 +25,10 @@ class AnnotationReview(ORMBase, Creatable):
 
 class TerminalAnnotationReview(AnnotationReview):
     __tablename__ = "terminal_annotation_reviews"
+    __table_args__ = (
+        # Serves paginated review reads of a recording revision
+        Index("ix_terminal_annotation_reviews_recording_revision", "recording_id", "revision_number", "id"),
+    )
     creator_id = Column(Integer, ForeignKey("users.id"), index=True)
     creator = relationship("User", foreign_keys=[creator_id], back_populates="terminal_annotation_reviews")
     annotation_id = Column(Integer, ForeignKey("terminal_recording_annotations.id"), index=True)
@@ -48,7 +52,7 @@ class AnnotationReviewQuestions(BaseModel):
     """Pydantic model for annotation reviews."""
     q_does_anno_match_content: bool
     q_can_anno_be_halved: bool
-    q_how_well_anno_matches_content: int
+    q_how_well_anno_matches_content: conint(ge=1, le=10)
     q_can_you_improve_anno: bool
     q_can_you_provide_markdown: bool
 
@@ -89,9 +93,26 @@ class AnnotationReviewCreate(AnnotationReviewQuestions):
         schema_extra = annotation_review_create_example
 
 
+class AnnotationReviewBatchCreate(BaseModel):
+    """Pydantic model for creating many terminal annotation reviews in one request."""
+    reviews: conlist(AnnotationReviewCreate, min_items=1, max_items=500)
+
+    class Config:
+        schema_extra = {"example": {"reviews": [annotation_review_create_example["example"]]}}
+
+
 class AnnotationReviewUpdate(AnnotationReviewQuestions):
     """Pydantic model for updating a terminal recording review."""
-    annotation_id: Annotated[int, conint(gt=0)]
+    annotation_review_id: Annotated[int, conint(gt=0)]
 
     class Config:
-        schema_extra = annotation_review_create_example
+        schema_extra = {
+            "example": {
+                "annotation_review_id": 12,
+                "q_does_anno_match_content": True,
+                "q_can_anno_be_halved": False,
+                "q_how_well_anno_matches_content": 7,
+                "q_can_you_improve_anno": False,
+                "q_can_you_provide_markdown": False,
+            }
+        }
@@ -1,8 +1,8 @@
 
 
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
-from sqlalchemy import Column, Float, Integer, ForeignKey, String, Table
+from sqlalchemy import Column, Float, Index, Integer, ForeignKey, String, Table
 from sqlalchemy.orm import relationship
 from models.base_models import ORMBase
 
@@ -12,7 +12,7 @@ class Annotation(ORMBase):
     """ Base class for all annotation types. """
 
     __abstract__ = True
-    revision_number = Column(Integer)
+    revision_number = Column(Integer, index=True)
     annotation_text = Column(String)
     start_time_milliseconds = Column(Float)
     end_time_milliseconds = Column(Float)
@@ -22,7 +22,11 @@ class Annotation(ORMBase):
 
 class TerminalRecordingAnnotation(Annotation):
     __tablename__ = "terminal_recording_annotations"
-    
+    __table_args__ = (
+        # Serves time-window lookups within a revision of a recording
+        Index("ix_terminal_recording_annotations_time_range", "recording_id", "revision_number", "start_time_milliseconds", "end_time_milliseconds"),
+    )
+
     creator_id = Column(Integer, ForeignKey("users.id"), index=True)
     creator = relationship("User", foreign_keys=[creator_id], back_populates="terminal_annotations")
     recording_id = Column(Integer, ForeignKey("terminal_recordings.id"), index=True)
@@ -32,6 +36,9 @@ class TerminalRecordingAnnotation(Annotation):
 
 class AudioTranscriptionAnnotation(Annotation):
     __tablename__ = "audio_transcription_annotations"
+    __table_args__ = (
+        Index("ix_audio_transcription_annotations_time_range", "recording_id", "revision_number", "start_time_milliseconds", "end_time_milliseconds"),
+    )
     creator_id = Column(Integer, ForeignKey("users.id"), index=True)
     creator = relationship("User", foreign_keys=[creator_id], back_populates="audio_annotations")
     recording_id = Column(Integer, ForeignKey("audio_transcriptions.id"), index=True)
@@ -53,3 +60,23 @@ class TerminalAnnotationRead(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class TerminalAnnotationChange(BaseModel):
+    """Pydantic model for a single annotation change between two revisions."""
+    change: str
+    from_annotation: Optional[TerminalAnnotationRead]
+    to_annotation: Optional[TerminalAnnotationRead]
+    text_similarity: Optional[float]
+
+    class Config:
+        orm_mode = True
+
+
+class TerminalAnnotationDiff(BaseModel):
+    """Pydantic model for the annotation differences between two revisions of a terminal recording."""
+    recording_id: int
+    from_revision_number: int
+    to_revision_number: int
+    unchanged_count: int
+    changes: List[TerminalAnnotationChange]
@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, confloat, conint
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from models.base_models import ORMBase
+
+
+# Export job states, in the order a job moves through them
+EXPORT_PENDING = "pending"
+EXPORT_RUNNING = "running"
+EXPORT_COMPLETED = "completed"
+EXPORT_FAILED = "failed"
+
+
+# SQLAlchemy models
+class DatasetExport(ORMBase):
+    """A background job writing live terminal recordings, their annotations and review stats to object storage."""
+
+    __tablename__ = "dataset_exports"
+    creator_id = Column(Integer, ForeignKey("users.id"), index=True)
+    status = Column(String, nullable=False, default=EXPORT_PENDING)
+    # The filters and options the job was created with
+    parameters = Column(JSONB, nullable=False, default=dict)
+    # Only recordings changed after this time are exported; None exports every recording
+    since = Column(DateTime(timezone=True))
+    # Passed as the next incremental export's since, it covers every change this export may have missed
+    watermark = Column(DateTime(timezone=True))
+    bucket_name = Column(String, nullable=False)
+    object_prefix = Column(String)
+    shards = Column(JSONB, nullable=False, default=list)
+    records_count = Column(Integer, nullable=False, default=0)
+    error = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True))
+
+
+# Pydantic models
+class DatasetExportCreate(BaseModel):
+    """Pydantic model for starting a dataset export."""
+    min_reviews_count: Optional[conint(ge=0)]
+    min_mean_score: Optional[confloat(ge=1, le=10)]
+    since: Optional[datetime]
+    include_content: bool = True
+    records_per_shard: Optional[conint(gt=0, le=100000)]
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "min_reviews_count": 3,
+                "min_mean_score": 7.5,
+                "since": "2024-10-01T00:00:00+00:00",
+                "include_content": True,
+            }
+        }
+
+
+class DatasetExportShard(BaseModel):
+    object_name: str
+    records_count: int
+    size_bytes: int
+
+
+class DatasetExportRead(BaseModel):
+    """Pydantic model for reading the state of a dataset export."""
+    id: int
+    creator_id: int
+    status: str
+    parameters: dict
+    since: Optional[datetime]
+    watermark: Optional[datetime]
+    bucket_name: str
+    object_prefix: Optional[str]
+    shards: List[DatasetExportShard]
+    records_count: int
+    error: Optional[str]
+    created_at: datetime
+    completed_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
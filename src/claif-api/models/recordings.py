@@ -1,8 +1,9 @@
 from datetime import datetime
-from typing import Annotated, Optional
+from typing import Annotated, Any, Dict, List, Optional
 from pydantic import BaseModel, conint
-from sqlalchemy import Boolean, Column, Float, Integer, String, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, DateTime, Float, Index, Integer, String, ForeignKey, func, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from models.base_models import ORMBase, Creatable, Deletable
 from models.users import UserRead
 
@@ -30,6 +31,22 @@ class RecordingAnnotatable(Recording):
 
 class TerminalRecording(RecordingAnnotatable):
     __tablename__ = "terminal_recordings"
+    __table_args__ = (
+        # Partial indexes cover only live rows, so soft-deleted recordings do not slow down listing and search
+        Index("ix_terminal_recordings_live_id", "id", postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_terminal_recordings_search_vector", "search_vector", postgresql_using="gin", postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_terminal_recordings_content_search_vector", "content_search_vector", postgresql_using="gin", postgresql_where=text("deleted_at IS NULL")),
+    )
+
+    # Events are stored as JSONB so reads return the array without decoding a JSON string
+    content_body = Column(JSONB)
+    # Statistics derived from the events at ingest, loaded only by the stats endpoint
+    content_stats = deferred(Column(JSONB))
+    # Full-text search vectors of the title, description and annotations, and of the output text
+    search_vector = deferred(Column(TSVECTOR))
+    content_search_vector = deferred(Column(TSVECTOR))
+    # Set on every change to the row, so incremental exports find the recordings changed since their watermark
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
     creator_id = Column(Integer, ForeignKey("users.id"), index=True)
     creator = relationship("User", foreign_keys=[creator_id], back_populates="terminal_recordings")
     annotations = relationship("TerminalRecordingAnnotation", back_populates="recording", lazy="dynamic", cascade="all, delete-orphan")
@@ -64,7 +81,7 @@ class TerminalRecordingRead(BaseModel):
     size_bytes: int
     duration_milliseconds: int
     content_metadata: str
-    content_body: str
+    content_body: List[Any]
     annotations_count: int
     revision_number: int
     creator: UserRead
@@ -77,6 +94,53 @@ class TerminalRecordingRead(BaseModel):
         arbitrary_types_allowed = True
 
 
+class IdleGap(BaseModel):
+    start_seconds: float
+    end_seconds: float
+    duration_seconds: float
+
+
+class OutputBurst(BaseModel):
+    start_seconds: float
+    output_bytes: int
+
+
+class TerminalRecordingContentStats(BaseModel):
+    """Pydantic model for the statistics derived from a terminal recording's events."""
+    recording_id: int
+    event_counts: Dict[str, int]
+    duration_seconds: float
+    bucket_seconds: float
+    idle_time_limit_seconds: float
+    output_bytes_total: int
+    output_bytes_per_second: List[int]
+    idle_gaps: List[IdleGap]
+    idle_seconds_total: float
+    peak_output_bursts: List[OutputBurst]
+
+
+class TerminalRecordingSearchResult(BaseModel):
+    """Pydantic model for a recording matching a search query."""
+    id: int
+    title: str
+    description: str
+    revision_number: int
+    creator_id: int
+    creator_username: str
+    annotations_count: int
+    duration_milliseconds: int
+    rank: float
+
+
+class TerminalRecordingSearchResults(BaseModel):
+    """Pydantic model for a page of search results, ordered by rank."""
+    query: str
+    limit: int
+    offset: int
+    next_offset: Optional[int]
+    results: List[TerminalRecordingSearchResult]
+
+
 # Pydantic models
 class TerminalRecordingListRead(BaseModel):
     """Pydantic model for reading terminal recordings in a list. """
@@ -0,0 +1,88 @@
+from difflib import SequenceMatcher
+from typing import List, Tuple
+from models.annotations import TerminalRecordingAnnotation
+
+
+# Minimum combined time-overlap/text-similarity score for two annotations to be treated as the same one
+DIFF_MATCH_THRESHOLD = 0.5
+
+
+def annotation_key(annotation: TerminalRecordingAnnotation):
+    """Returns the fields that identify an unchanged annotation across revisions."""
+    return (
+        annotation.level,
+        annotation.start_time_milliseconds,
+        annotation.end_time_milliseconds,
+        annotation.annotation_text,
+    )
+
+
+def time_overlap_ratio(a: TerminalRecordingAnnotation, b: TerminalRecordingAnnotation) -> float:
+    """Returns the intersection-over-union of the time ranges of two annotations."""
+    intersection = min(a.end_time_milliseconds, b.end_time_milliseconds) - max(a.start_time_milliseconds, b.start_time_milliseconds)
+    union = max(a.end_time_milliseconds, b.end_time_milliseconds) - min(a.start_time_milliseconds, b.start_time_milliseconds)
+    if union <= 0:
+        return 1.0 if intersection == 0 else 0.0
+    return max(intersection, 0) / union
+
+
+def text_similarity_ratio(a: TerminalRecordingAnnotation, b: TerminalRecordingAnnotation) -> float:
+    """Returns the similarity of the texts of two annotations between 0 and 1."""
+    return SequenceMatcher(None, a.annotation_text or "", b.annotation_text or "").ratio()
+
+
+def diff_annotations(from_annotations: List[TerminalRecordingAnnotation], to_annotations: List[TerminalRecordingAnnotation]):
+    """
+    Computes the annotation-level differences between two revisions.
+
+    Annotations with identical level, time range and text are unchanged. The remaining annotations
+    are paired greedily by level, time overlap and text similarity; paired annotations are reported
+    as modified and unpaired ones as removed or added.
+
+    Returns a tuple of (unchanged_count, changes) where each change is a dict with the keys
+    change, from_annotation, to_annotation and text_similarity.
+    """
+    # Pair up the annotations that did not change between revisions
+    unmatched_to = {}
+    for annotation in to_annotations:
+        unmatched_to.setdefault(annotation_key(annotation), []).append(annotation)
+
+    unchanged_count = 0
+    removed_candidates = []
+    for annotation in from_annotations:
+        same = unmatched_to.get(annotation_key(annotation))
+        if same:
+            same.pop()
+            unchanged_count += 1
+        else:
+            removed_candidates.append(annotation)
+    added_candidates = [annotation for annotations in unmatched_to.values() for annotation in annotations]
+
+    # Score every remaining pair on the same level and keep the best pairs first
+    scored_pairs: List[Tuple[float, float, TerminalRecordingAnnotation, TerminalRecordingAnnotation]] = []
+    for old in removed_candidates:
+        for new in added_candidates:
+            if old.level != new.level:
+                continue
+            similarity = text_similarity_ratio(old, new)
+            score = (time_overlap_ratio(old, new) + similarity) / 2
+            if score >= DIFF_MATCH_THRESHOLD:
+                scored_pairs.append((score, similarity, old, new))
+    scored_pairs.sort(key=lambda pair: pair[0], reverse=True)
+
+    changes = []
+    paired_ids = set()
+    for _, similarity, old, new in scored_pairs:
+        if id(old) in paired_ids or id(new) in paired_ids:
+            continue
+        paired_ids.update((id(old), id(new)))
+        changes.append({"change": "modified", "from_annotation": old, "to_annotation": new, "text_similarity": round(similarity, 4)})
+
+    for old in removed_candidates:
+        if id(old) not in paired_ids:
+            changes.append({"change": "removed", "from_annotation": old, "to_annotation": None, "text_similarity": None})
+    for new in added_candidates:
+        if id(new) not in paired_ids:
+            changes.append({"change": "added", "from_annotation": None, "to_annotation": new, "text_similarity": None})
+
+    return unchanged_count, changes
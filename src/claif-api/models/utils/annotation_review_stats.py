@@ -0,0 +1,180 @@
+from typing import Dict, Iterable, List
+from sqlalchemy import and_, case, delete, exists, func, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.annotations import TerminalRecordingAnnotation
+from models.annotation_reviews import AnnotationReview, TerminalAnnotationReview
+from models.annotation_review_stats import (
+    REVIEW_BOOLEAN_QUESTIONS,
+    REVIEW_SCORES,
+    TerminalAnnotationReviewStats,
+    TerminalRecordingReviewStats,
+)
+from utils._logging import logging
+from utils.database import stream_rows, write_in_batches
+from utils.env import DB_BATCH_SIZE
+
+
+STATS_COLUMNS = (
+    ["reviews_count", "score_sum"]
+    + [f"score_{score}_count" for score in REVIEW_SCORES]
+    + [f"{question}_yes_count" for question in REVIEW_BOOLEAN_QUESTIONS]
+)
+
+
+def increment_annotation_reviews_count(db: Session, reviews_counts: Dict[int, int]):
+    """
+    Adds review counts to terminal recording annotations, keyed by annotation ID.
+
+    The increment runs server-side as one UPDATE ... SET reviews_count = reviews_count + n, so concurrent
+    reviewers never overwrite each other's increments and no row is loaded into the session.
+    """
+    if not reviews_counts:
+        return
+    annotation_ids = sorted(reviews_counts)
+    db.execute(
+        update(TerminalRecordingAnnotation)
+        .where(TerminalRecordingAnnotation.id.in_(annotation_ids))
+        .values(reviews_count=func.coalesce(TerminalRecordingAnnotation.reviews_count, 0) + case(reviews_counts, value=TerminalRecordingAnnotation.id))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def review_stats_deltas(review: AnnotationReview, sign: int = 1) -> Dict[str, int]:
+    """Returns the change a single review makes to each stats column."""
+    score = review.q_how_well_anno_matches_content
+    deltas = {column: 0 for column in STATS_COLUMNS}
+    deltas["reviews_count"] = sign
+    deltas["score_sum"] = sign * score
+    deltas[f"score_{score}_count"] = sign
+    for question in REVIEW_BOOLEAN_QUESTIONS:
+        if getattr(review, question):
+            deltas[f"{question}_yes_count"] = sign
+    return deltas
+
+
+def accumulate_deltas(rows: Dict, key, identity: Dict, deltas: Dict[str, int]):
+    """Adds the deltas to the row for the key, creating the row on first use."""
+    row = rows.get(key)
+    if row is None:
+        row = rows[key] = {**identity, **{column: 0 for column in STATS_COLUMNS}}
+    for column, delta in deltas.items():
+        row[column] += delta
+
+
+def upsert_stats(db: Session, model, index_elements: List[str], rows: List[Dict], replace: bool = False):
+    """
+    Inserts the stats rows or adds them to the existing rows in a single atomic statement.
+    With replace, existing rows are overwritten instead.
+    """
+    if not rows:
+        return
+    statement = insert(model).values([{**row, "version": 1} for row in rows])
+    statement = statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={
+            "version": model.version + 1,
+            "updated_at": func.now(),
+            **{
+                column: getattr(statement.excluded, column) if replace else getattr(model, column) + getattr(statement.excluded, column)
+                for column in STATS_COLUMNS
+            },
+        },
+    )
+    db.execute(statement)
+
+
+def update_review_stats(
+    db: Session,
+    added_reviews: Iterable[AnnotationReview] = (),
+    removed_reviews: Iterable[AnnotationReview] = (),
+):
+    """
+    Applies added and removed terminal annotation reviews to the per-annotation and per-recording stats.
+
+    Deltas are grouped per annotation and per recording revision, so any number of reviews costs one
+    upsert per stats table. Rows are written in key order to keep concurrent writers from deadlocking.
+    """
+    annotation_rows = {}
+    recording_rows = {}
+    for sign, reviews in ((1, added_reviews), (-1, removed_reviews)):
+        for review in reviews:
+            deltas = review_stats_deltas(review, sign)
+            accumulate_deltas(annotation_rows, review.annotation_id, {
+                "annotation_id": review.annotation_id,
+                "recording_id": review.recording_id,
+                "revision_number": review.revision_number,
+            }, deltas)
+            accumulate_deltas(recording_rows, (review.recording_id, review.revision_number), {
+                "recording_id": review.recording_id,
+                "revision_number": review.revision_number,
+            }, deltas)
+
+    upsert_stats(db, TerminalAnnotationReviewStats, ["annotation_id"], [annotation_rows[key] for key in sorted(annotation_rows)])
+    upsert_stats(db, TerminalRecordingReviewStats, ["recording_id", "revision_number"], [recording_rows[key] for key in sorted(recording_rows)])
+
+
+def review_stats_aggregates_query(db: Session, group_columns: List):
+    """Returns the query aggregating every terminal annotation review into stats columns, grouped and ordered by the columns."""
+    score = TerminalAnnotationReview.q_how_well_anno_matches_content
+    aggregates = [
+        func.count().label("reviews_count"),
+        func.sum(score).label("score_sum"),
+        *[func.count().filter(score == value).label(f"score_{value}_count") for value in REVIEW_SCORES],
+        *[
+            func.count().filter(getattr(TerminalAnnotationReview, question).is_(True)).label(f"{question}_yes_count")
+            for question in REVIEW_BOOLEAN_QUESTIONS
+        ],
+    ]
+    return db.query(*group_columns, *aggregates).group_by(*group_columns).order_by(*group_columns)
+
+
+def backfill_review_stats(db: Session, batch_size: int = DB_BATCH_SIZE):
+    """
+    Rebuilds the terminal annotation review stats, and the annotations' review counts, from the reviews.
+
+    The aggregates are computed by the database and streamed through a server-side cursor, then written
+    batch_size rows per statement, so memory stays flat however many annotations there are. Everything
+    runs in one transaction holding a SHARE lock on the reviews: reviews submitted meanwhile wait for the
+    backfill instead of being overwritten by it.
+    """
+    db.execute(text(f"LOCK TABLE {TerminalAnnotationReview.__tablename__} IN SHARE MODE"))
+
+    def write_annotation_stats(db: Session, rows: List):
+        upsert_stats(db, TerminalAnnotationReviewStats, ["annotation_id"], [row._asdict() for row in rows], replace=True)
+        db.execute(
+            update(TerminalRecordingAnnotation)
+            .where(TerminalRecordingAnnotation.id.in_([row.annotation_id for row in rows]))
+            .values(reviews_count=case({row.annotation_id: row.reviews_count for row in rows}, value=TerminalRecordingAnnotation.id))
+            .execution_options(synchronize_session=False)
+        )
+
+    def write_recording_stats(db: Session, rows: List):
+        upsert_stats(db, TerminalRecordingReviewStats, ["recording_id", "revision_number"], [row._asdict() for row in rows], replace=True)
+
+    annotations_count = write_in_batches(db, stream_rows(review_stats_aggregates_query(db, [
+        TerminalAnnotationReview.annotation_id,
+        TerminalAnnotationReview.recording_id,
+        TerminalAnnotationReview.revision_number,
+    ]), batch_size), write_annotation_stats, batch_size)
+    revisions_count = write_in_batches(db, stream_rows(review_stats_aggregates_query(db, [
+        TerminalAnnotationReview.recording_id,
+        TerminalAnnotationReview.revision_number,
+    ]), batch_size), write_recording_stats, batch_size)
+
+    # Stats and counts of annotations and revisions whose reviews are all gone
+    db.execute(delete(TerminalAnnotationReviewStats).where(~exists().where(
+        TerminalAnnotationReview.annotation_id == TerminalAnnotationReviewStats.annotation_id,
+    )))
+    db.execute(delete(TerminalRecordingReviewStats).where(~exists().where(and_(
+        TerminalAnnotationReview.recording_id == TerminalRecordingReviewStats.recording_id,
+        TerminalAnnotationReview.revision_number == TerminalRecordingReviewStats.revision_number,
+    ))))
+    db.execute(
+        update(TerminalRecordingAnnotation)
+        .where(TerminalRecordingAnnotation.reviews_count != 0, ~exists().where(TerminalAnnotationReview.annotation_id == TerminalRecordingAnnotation.id))
+        .values(reviews_count=0)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    logging.info(f"Backfilled the review stats of {annotations_count} annotations and {revisions_count} recording revisions.")
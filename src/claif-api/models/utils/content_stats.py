@@ -0,0 +1,91 @@
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import numpy
+
+
+# Width of the output volume buckets
+BUCKET_SECONDS = 1
+# Gap between events treated as idle when the recording header sets no idle_time_limit
+DEFAULT_IDLE_TIME_LIMIT_SECONDS = 2.0
+# Number of busiest output buckets reported as peak bursts
+PEAK_BURSTS_COUNT = 5
+# Recordings with fewer events are cheaper to process without building arrays
+NUMPY_MIN_EVENTS = 2000
+
+
+def compute_content_stats(content_body: List[list], idle_time_limit: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Derives summary statistics from the events of an asciinema recording.
+
+    Events are [time_seconds, type, data] lists in time order. The result holds the number of events
+    per type, the bytes of output per second, the idle gaps between consecutive events at or above
+    the idle time limit, and the seconds with the most output.
+    """
+    if not idle_time_limit:
+        idle_time_limit = DEFAULT_IDLE_TIME_LIMIT_SECONDS
+
+    event_counts = Counter(event[1] for event in content_body)
+    times = [float(event[0]) for event in content_body]
+    output_times = [float(event[0]) for event in content_body if event[1] == "o"]
+    output_sizes = [len(event[2].encode("utf-8")) for event in content_body if event[1] == "o"]
+    duration_seconds = max(times) if times else 0.0
+
+    if len(content_body) >= NUMPY_MIN_EVENTS:
+        output_bytes_per_second, idle_gaps, peak_seconds = _bucket_with_numpy(times, output_times, output_sizes, duration_seconds, idle_time_limit)
+    else:
+        output_bytes_per_second, idle_gaps, peak_seconds = _bucket_with_python(times, output_times, output_sizes, duration_seconds, idle_time_limit)
+
+    return {
+        "event_counts": dict(event_counts),
+        "duration_seconds": duration_seconds,
+        "bucket_seconds": BUCKET_SECONDS,
+        "idle_time_limit_seconds": idle_time_limit,
+        "output_bytes_total": sum(output_sizes),
+        "output_bytes_per_second": output_bytes_per_second,
+        "idle_gaps": [
+            {"start_seconds": start, "end_seconds": end, "duration_seconds": end - start}
+            for start, end in idle_gaps
+        ],
+        "idle_seconds_total": sum(end - start for start, end in idle_gaps),
+        "peak_output_bursts": [
+            {"start_seconds": second * BUCKET_SECONDS, "output_bytes": output_bytes_per_second[second]}
+            for second in peak_seconds
+        ],
+    }
+
+
+def _buckets_count(duration_seconds: float) -> int:
+    return int(math.floor(duration_seconds / BUCKET_SECONDS)) + 1
+
+
+def _bucket_with_python(times, output_times, output_sizes, duration_seconds, idle_time_limit):
+    buckets = [0] * _buckets_count(duration_seconds)
+    for time, size in zip(output_times, output_sizes):
+        buckets[int(time // BUCKET_SECONDS)] += size
+
+    idle_gaps = [
+        (previous, current) for previous, current in zip(times, times[1:])
+        if current - previous >= idle_time_limit
+    ]
+    busiest = sorted(range(len(buckets)), key=lambda second: (-buckets[second], second))
+    peak_seconds = [second for second in busiest[:PEAK_BURSTS_COUNT] if buckets[second] > 0]
+    return buckets, idle_gaps, peak_seconds
+
+
+def _bucket_with_numpy(times, output_times, output_sizes, duration_seconds, idle_time_limit):
+    bucket_indexes = (numpy.asarray(output_times, dtype=numpy.float64) // BUCKET_SECONDS).astype(numpy.int64)
+    buckets = numpy.bincount(
+        bucket_indexes,
+        weights=numpy.asarray(output_sizes, dtype=numpy.int64),
+        minlength=_buckets_count(duration_seconds),
+    ).astype(numpy.int64)
+
+    event_times = numpy.asarray(times, dtype=numpy.float64)
+    gap_indexes = numpy.nonzero(numpy.diff(event_times) >= idle_time_limit)[0]
+    idle_gaps = [(times[index], times[index + 1]) for index in gap_indexes.tolist()]
+
+    # A stable sort on negated volume keeps the earliest second first among equally busy ones
+    busiest = numpy.argsort(-buckets, kind="stable")[:PEAK_BURSTS_COUNT]
+    peak_seconds = [second for second in busiest.tolist() if buckets[second] > 0]
+    return buckets.tolist(), idle_gaps, peak_seconds
@@ -0,0 +1,192 @@
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from sqlalchemy import and_, func, or_, select, tuple_
+from sqlalchemy.orm import Session
+from models.annotations import TerminalAnnotationRead, TerminalRecordingAnnotation
+from models.annotation_review_stats import AnnotationReviewStatsRead, TerminalAnnotationReviewStats, TerminalRecordingReviewStats
+from models.exports import EXPORT_COMPLETED, EXPORT_FAILED, EXPORT_RUNNING, DatasetExport
+from models.recordings import TerminalRecording
+from utils._logging import logging
+from utils.database import stream_batches
+from utils.env import EXPORT_BATCH_SIZE, EXPORT_RECORDS_PER_SHARD, EXPORT_WATERMARK_OVERLAP_SECONDS
+from utils.json_responses import dumps_json, serialize_orm
+
+
+EXPORT_CONTENT_TYPE = "application/gzip"
+
+# The recording columns exported with every record; the events are added unless left out
+EXPORTED_RECORDING_COLUMNS = (
+    TerminalRecording.id,
+    TerminalRecording.revision_number,
+    TerminalRecording.title,
+    TerminalRecording.description,
+    TerminalRecording.creator_username,
+    TerminalRecording.duration_milliseconds,
+    TerminalRecording.content_metadata,
+)
+
+
+def export_recordings_query(db: Session, parameters: Dict[str, Any], since: Optional[datetime]):
+    """
+    Returns the query of live recordings to export with the review stats of their current revision,
+    filtered by review counts and mean score and, for incremental exports, by changes since a time.
+    """
+    columns = list(EXPORTED_RECORDING_COLUMNS)
+    if parameters.get("include_content", True):
+        columns.append(TerminalRecording.content_body)
+    query = db.query(*columns, TerminalRecordingReviewStats).outerjoin(
+        TerminalRecordingReviewStats,
+        and_(
+            TerminalRecordingReviewStats.recording_id == TerminalRecording.id,
+            TerminalRecordingReviewStats.revision_number == TerminalRecording.revision_number,
+        ),
+    ).filter(TerminalRecording.deleted_at.is_(None))
+
+    if parameters.get("min_reviews_count"):
+        query = query.filter(TerminalRecordingReviewStats.reviews_count >= parameters["min_reviews_count"])
+    if parameters.get("min_mean_score") is not None:
+        # Compared as score_sum >= mean * count, so unreviewed revisions never divide by zero
+        query = query.filter(
+            TerminalRecordingReviewStats.reviews_count > 0,
+            TerminalRecordingReviewStats.score_sum >= parameters["min_mean_score"] * TerminalRecordingReviewStats.reviews_count,
+        )
+    if since is not None:
+        # A recording changes when it is updated and when its current revision is reviewed
+        query = query.filter(or_(TerminalRecording.updated_at > since, TerminalRecordingReviewStats.updated_at > since))
+    return query.order_by(TerminalRecording.id)
+
+
+def deleted_recordings_query(db: Session, since: datetime):
+    """Returns the query of recordings deleted since a time, which incremental exports carry as tombstones."""
+    return db.query(TerminalRecording.id, TerminalRecording.deleted_at).filter(
+        TerminalRecording.deleted_at > since,
+    ).order_by(TerminalRecording.id)
+
+
+def read_annotations_with_stats(db: Session, recording_revisions: List[tuple]) -> Dict[tuple, List[dict]]:
+    """Returns the serialized annotations of the given (recording_id, revision_number) pairs, each with its review stats."""
+    rows = db.query(TerminalRecordingAnnotation, TerminalAnnotationReviewStats).outerjoin(
+        TerminalAnnotationReviewStats,
+        TerminalAnnotationReviewStats.annotation_id == TerminalRecordingAnnotation.id,
+    ).filter(
+        tuple_(TerminalRecordingAnnotation.recording_id, TerminalRecordingAnnotation.revision_number).in_(recording_revisions),
+    ).order_by(
+        TerminalRecordingAnnotation.recording_id,
+        TerminalRecordingAnnotation.start_time_milliseconds,
+        TerminalRecordingAnnotation.level,
+    ).all()
+
+    annotations = {}
+    for annotation, stats in rows:
+        annotations.setdefault((annotation.recording_id, annotation.revision_number), []).append({
+            **serialize_orm(TerminalAnnotationRead, annotation),
+            "review_stats": AnnotationReviewStatsRead.from_stats(stats).dict(),
+        })
+    return annotations
+
+
+def iter_export_records(db: Session, parameters: Dict[str, Any], since: Optional[datetime], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Yields one export record per matching recording: its current revision's header, events,
+    annotations and aggregated reviews. Incremental exports then yield a tombstone per recording
+    deleted since their start time, {"recording_id", "deleted": True, "deleted_at"}, so consumers
+    know to remove it.
+
+    Recordings are read through a server-side cursor batch_size rows at a time, and the annotations
+    of each batch are loaded in one query, so memory stays flat however many recordings there are.
+    """
+    for batch in stream_batches(export_recordings_query(db, parameters, since), batch_size):
+        annotations = read_annotations_with_stats(db, [(row.id, row.revision_number) for row in batch])
+        for row in batch:
+            record = {
+                "recording_id": row.id,
+                "revision_number": row.revision_number,
+                "title": row.title,
+                "description": row.description,
+                "creator_username": row.creator_username,
+                "duration_milliseconds": row.duration_milliseconds,
+                "header": json.loads(row.content_metadata or "{}"),
+                "annotations": annotations.get((row.id, row.revision_number), []),
+                "review_stats": AnnotationReviewStatsRead.from_stats(row.TerminalRecordingReviewStats).dict(),
+            }
+            if parameters.get("include_content", True):
+                record["events"] = row.content_body
+            yield record
+
+    if since is not None:
+        for batch in stream_batches(deleted_recordings_query(db, since), batch_size):
+            for row in batch:
+                yield {"recording_id": row.id, "deleted": True, "deleted_at": row.deleted_at}
+
+
+class ShardWriter:
+    """Collects records into gzipped JSON Lines shards, handing each full shard to write_shard(data, object_name)."""
+
+    def __init__(self, write_shard: Callable[[bytes, str], None], object_prefix: str, records_per_shard: int):
+        self.write_shard = write_shard
+        self.object_prefix = object_prefix
+        self.records_per_shard = records_per_shard
+        self.shards = []
+        self._start_shard()
+
+    def _start_shard(self):
+        self.buffer = io.BytesIO()
+        # A fixed mtime keeps the output identical for identical records
+        self.stream = gzip.GzipFile(fileobj=self.buffer, mode="wb", mtime=0)
+        self.records_count = 0
+
+    def add(self, record: dict):
+        self.stream.write(dumps_json(record) + b"\n")
+        self.records_count += 1
+        if self.records_count >= self.records_per_shard:
+            self.flush()
+
+    def flush(self):
+        if not self.records_count:
+            return
+        self.stream.close()
+        data = self.buffer.getvalue()
+        object_name = f"{self.object_prefix}/part-{len(self.shards):05d}.jsonl.gz"
+        self.write_shard(data, object_name)
+        self.shards.append({"object_name": object_name, "records_count": self.records_count, "size_bytes": len(data)})
+        self._start_shard()
+
+
+def run_dataset_export(db: Session, export_id: int, write_shard: Callable[[bytes, str], None], batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Runs a dataset export job, writing its records as shards with write_shard(data, object_name) and
+    recording the shards, record count and watermark on the job. A failure marks the job failed.
+    """
+    export = db.query(DatasetExport).filter_by(id=export_id).first()
+    export.status = EXPORT_RUNNING
+    db.commit()
+
+    try:
+        # Transactions that started before the export but commit after its snapshot are not seen, so
+        # the watermark is set back far enough for the next incremental export to pick them up
+        started_at = db.scalar(select(func.now()))
+        parameters = export.parameters
+        writer = ShardWriter(write_shard, export.object_prefix, parameters.get("records_per_shard") or EXPORT_RECORDS_PER_SHARD)
+        records_count = 0
+        for record in iter_export_records(db, parameters, export.since, batch_size):
+            writer.add(record)
+            records_count += 1
+        writer.flush()
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Dataset export {export_id} failed: {e}")
+        export.status = EXPORT_FAILED
+        export.error = str(e)
+        db.commit()
+        return
+
+    export.status = EXPORT_COMPLETED
+    export.shards = writer.shards
+    export.records_count = records_count
+    export.watermark = started_at - timedelta(seconds=EXPORT_WATERMARK_OVERLAP_SECONDS)
+    export.completed_at = datetime.now(timezone.utc)
+    db.commit()
+    logging.info(f"Dataset export {export_id} wrote {records_count} records in {len(writer.shards)} shards.")
@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Callable, List
+from sqlalchemy.orm import Session
+from models.annotation_reviews import AudioAnnotationReview, TerminalAnnotationReview
+from models.annotation_review_stats import TerminalAnnotationReviewStats, TerminalRecordingReviewStats
+from models.annotations import AudioTranscriptionAnnotation, TerminalRecordingAnnotation
+from models.recordings import AudioFile, AudioTranscription, TerminalRecording
+from utils._logging import logging
+
+
+def purge_deleted_terminal_recordings(db: Session, deleted_before: datetime, batch_size: int) -> int:
+    """
+    Permanently removes terminal recordings soft-deleted before the given time, with their annotations,
+    reviews and review stats.
+
+    Recordings are purged in batches of batch_size, each in its own transaction, so a large backlog
+    never holds locks for long. Rows locked by another purge are skipped. Returns the number purged.
+    """
+    purged_count = 0
+    while True:
+        recording_ids = [
+            row.id for row in db.query(TerminalRecording.id).filter(
+                TerminalRecording.deleted_at < deleted_before,
+            ).order_by(TerminalRecording.id).limit(batch_size).with_for_update(skip_locked=True)
+        ]
+        if not recording_ids:
+            return purged_count
+
+        # Children first, so the foreign keys hold at every step
+        for model in (TerminalAnnotationReview, TerminalAnnotationReviewStats, TerminalRecordingReviewStats, TerminalRecordingAnnotation):
+            db.query(model).filter(model.recording_id.in_(recording_ids)).delete(synchronize_session=False)
+        db.query(TerminalRecording).filter(TerminalRecording.id.in_(recording_ids)).delete(synchronize_session=False)
+        db.commit()
+
+        purged_count += len(recording_ids)
+        logging.info(f"Purged {len(recording_ids)} deleted terminal recordings ({purged_count} so far).")
+
+
+def purge_deleted_audio_files(db: Session, deleted_before: datetime, batch_size: int, remove_files: Callable[[List[str], str], None]) -> int:
+    """
+    Permanently removes audio files soft-deleted before the given time, with their transcriptions and
+    stored objects.
+
+    The objects of a batch are removed before its rows, so a failed removal leaves the rows in place
+    for the next purge to retry. Returns the number of audio files purged.
+    """
+    purged_count = 0
+    while True:
+        audio_files = db.query(AudioFile.id, AudioFile.storage_path).filter(
+            AudioFile.deleted_at < deleted_before,
+        ).order_by(AudioFile.id).limit(batch_size).with_for_update(skip_locked=True).all()
+        if not audio_files:
+            return purged_count
+        audio_file_ids = [audio_file.id for audio_file in audio_files]
+
+        # Storage paths are "<bucket>/<object name>"
+        objects_by_bucket = {}
+        for audio_file in audio_files:
+            bucket_name, _, file_name = audio_file.storage_path.partition("/")
+            objects_by_bucket.setdefault(bucket_name, []).append(file_name)
+        for bucket_name, file_names in objects_by_bucket.items():
+            remove_files(file_names, bucket_name)
+
+        transcription_ids = [
+            row.id for row in db.query(AudioTranscription.id).filter(AudioTranscription.audio_file_id.in_(audio_file_ids))
+        ]
+        if transcription_ids:
+            for model in (AudioAnnotationReview, AudioTranscriptionAnnotation):
+                db.query(model).filter(model.recording_id.in_(transcription_ids)).delete(synchronize_session=False)
+            db.query(AudioTranscription).filter(AudioTranscription.id.in_(transcription_ids)).delete(synchronize_session=False)
+        db.query(AudioFile).filter(AudioFile.id.in_(audio_file_ids)).delete(synchronize_session=False)
+        db.commit()
+
+        purged_count += len(audio_file_ids)
+        logging.info(f"Purged {len(audio_file_ids)} deleted audio files ({purged_count} so far).")
@@ -2,6 +2,7 @@ from sqlalchemy import inspect
 from models.recordings import TerminalRecording, AudioTranscription, AudioFile
 from models.annotations import AudioTranscriptionAnnotation, TerminalRecordingAnnotation
 from models.annotation_reviews import TerminalAnnotationReview, AudioAnnotationReview
+from models.annotation_review_stats import TerminalAnnotationReviewStats, TerminalRecordingReviewStats
 from models.users import User
 
 
@@ -36,6 +37,8 @@ def print_all_model_schemas():
         AudioTranscriptionAnnotation,
         TerminalAnnotationReview,
         AudioAnnotationReview,
+        TerminalAnnotationReviewStats,
+        TerminalRecordingReviewStats,
         AudioFile,
         User
     ]
@@ -0,0 +1,56 @@
+import re
+from typing import Iterable, List
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+
+# Titles, descriptions and annotations are prose, so they are stemmed as English
+METADATA_SEARCH_CONFIG = "english"
+# Terminal output is mostly commands, paths and identifiers, which stemming would mangle
+CONTENT_SEARCH_CONFIG = "simple"
+# Output text beyond this many characters is not indexed, keeping tsvectors well under their 1MB limit
+CONTENT_SEARCH_MAX_CHARS = 256 * 1024
+# Matches in terminal output count for less than matches in the recording's own description
+CONTENT_RANK_WEIGHT = 0.4
+
+# CSI and OSC escape sequences, other two-character escapes, and the remaining control characters
+ANSI_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)?|\x1b[@-_]|[\x00-\x08\x0b-\x1f\x7f]")
+
+
+def extract_output_text(content_body: List[list]) -> str:
+    """Returns the printable text of a recording's output events, up to CONTENT_SEARCH_MAX_CHARS."""
+    parts = []
+    size = 0
+    for event in content_body:
+        if event[1] != "o":
+            continue
+        text = ANSI_ESCAPE_PATTERN.sub(" ", event[2])
+        parts.append(text)
+        size += len(text)
+        if size >= CONTENT_SEARCH_MAX_CHARS:
+            break
+    return "".join(parts)[:CONTENT_SEARCH_MAX_CHARS]
+
+
+def recording_search_vector(title: str, description: str, annotation_texts: Iterable[str]):
+    """
+    Returns the SQL expression computing a recording's metadata search vector.
+
+    Title matches weigh the most, then the description, then the text of the current revision's
+    annotations.
+    """
+    weighted_parts = [
+        (title, "A"),
+        (description, "B"),
+        (" ".join(text for text in annotation_texts if text), "C"),
+    ]
+    vector = None
+    for text, weight in weighted_parts:
+        part = func.setweight(func.to_tsvector(METADATA_SEARCH_CONFIG, text or ""), weight)
+        vector = part if vector is None else vector.op("||", return_type=TSVECTOR)(part)
+    return vector
+
+
+def content_search_vector(content_body: List[list]):
+    """Returns the SQL expression computing the search vector of a recording's terminal output."""
+    return func.to_tsvector(CONTENT_SEARCH_CONFIG, extract_output_text(content_body))
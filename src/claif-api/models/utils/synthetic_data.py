@@ -0,0 +1,360 @@
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models.annotation_reviews import TerminalAnnotationReview
+from models.annotations import TerminalRecordingAnnotation
+from models.recordings import TerminalRecording
+from models.users import User
+from models.utils.annotation_review_stats import backfill_review_stats
+from models.utils.content_stats import compute_content_stats
+from models.utils.search import CONTENT_SEARCH_CONFIG, METADATA_SEARCH_CONFIG, extract_output_text
+from utils._logging import logging
+from utils.database import SessionLocal, copy_rows, engine, reserve_ids
+from utils.json_responses import dumps_json
+
+
+PROMPT = "\u001b[01;32mdev@claif\u001b[00m:\u001b[01;34m~/project\u001b[00m$ "
+IDLE_TIME_LIMIT_SECONDS = 2.0
+# Recordings are spread over this many days before the seeding
+CREATED_WITHIN_DAYS = 365
+
+# Sessions are built from tasks: an activity, annotated on layer 1, made of commands annotated on layer 0
+TASKS = (
+    ("inspecting the repository", (
+        ("git status", "On branch main\r\nYour branch is up to date with 'origin/main'.\r\n\r\nnothing to commit, working tree clean\r\n"),
+        ("git log --oneline -3", "3f2c1ab Fix pagination of search results\r\n9e8d7c6 Add review stats\r\n1a2b3c4 Initial commit\r\n"),
+        ("ls -la", "total 24\r\ndrwxr-xr-x 4 dev dev 4096 .\r\ndrwxr-xr-x 8 dev dev 4096 ..\r\n-rw-r--r-- 1 dev dev  812 README.md\r\ndrwxr-xr-x 2 dev dev 4096 src\r\n"),
+    )),
+    ("running the tests", (
+        ("pytest -q", "........................................                     [100%]\r\n40 passed in 3.21s\r\n"),
+        ("pytest -q -k search", "....                                                         [100%]\r\n4 passed, 36 deselected in 0.84s\r\n"),
+    )),
+    ("installing dependencies", (
+        ("pip install -r requirements.txt", "Collecting fastapi\r\n  Using cached fastapi-0.115.0-py3-none-any.whl\r\nSuccessfully installed fastapi-0.115.0\r\n"),
+        ("python -m venv .venv", ""),
+    )),
+    ("editing a Python module", (
+        ("vi src/main.py", "\u001b[?1049h\u001b[1;1H\"src/main.py\" 42L, 1203B\u001b[?1049l"),
+        ("python src/main.py --help", "usage: main.py [-h] [--verbose] path\r\n"),
+    )),
+    ("searching the code", (
+        ("grep -rn TODO src", "src/main.py:12:# TODO handle empty input\r\nsrc/utils.py:40:# TODO cache results\r\n"),
+        ("find . -name '*.py' | wc -l", "17\r\n"),
+    )),
+    ("checking system resources", (
+        ("df -h .", "Filesystem      Size  Used Avail Use% Mounted on\r\n/dev/nvme0n1p2  468G  201G  244G  46% /\r\n"),
+        ("free -m", "               total        used        free\r\nMem:           15843        6120        4410\r\n"),
+    )),
+)
+
+RECORDING_COLUMNS = (
+    "id", "creator_id", "creator_username", "created_at", "updated_at", "title", "description", "revision_number",
+    "content_metadata", "content_body", "content_stats", "annotations_count", "size_bytes", "duration_milliseconds",
+)
+ANNOTATION_COLUMNS = (
+    "id", "creator_id", "recording_id", "revision_number", "annotation_text",
+    "start_time_milliseconds", "end_time_milliseconds", "reviews_count", "level",
+)
+REVIEW_COLUMNS = (
+    "id", "creator_id", "creator_username", "created_at", "annotation_id", "recording_id", "revision_number",
+    "q_does_anno_match_content", "q_can_anno_be_halved", "q_how_well_anno_matches_content",
+    "q_can_you_improve_anno", "q_can_you_provide_markdown",
+)
+
+
+def annotation_group(rng: random.Random) -> str:
+    """Returns a group id in the dash-separated format the librecode annotator writes."""
+    return "-".join(str(rng.getrandbits(32)) for _ in range(4))
+
+
+def generate_session(rng: random.Random, commands_count: int) -> Tuple[List[list], List[Tuple[str, List[Tuple[str, float, float]]]]]:
+    """
+    Generates the events of a shell session running about commands_count commands, returning the
+    events and the tasks run as (activity, [(command, start_seconds, end_seconds)]).
+
+    Keystrokes come at lognormal intervals with the echo a millisecond behind, output follows a
+    short pause, and the user thinks between commands, so the timing resembles a real recording.
+    """
+    events = [[round(rng.uniform(0.3, 1.5), 6), "o", PROMPT]]
+    tasks = []
+    clock = events[0][0]
+    while sum(len(commands) for _, commands in tasks) < commands_count:
+        activity, task_commands = rng.choice(TASKS)
+        commands = []
+        for command, output in task_commands[:rng.randint(1, len(task_commands))]:
+            clock += min(rng.expovariate(1 / 1.5), 8.0)
+            start = clock
+            for character in command:
+                clock += min(rng.lognormvariate(-2.1, 0.5), 1.5)
+                events.append([round(clock, 6), "i", character])
+                events.append([round(clock + 0.001, 6), "o", character])
+            clock += rng.uniform(0.1, 0.6)
+            events.append([round(clock, 6), "i", "\r"])
+            events.append([round(clock + 0.001, 6), "o", "\r\n"])
+            for line in output.splitlines(keepends=True):
+                clock += rng.uniform(0.002, 0.05)
+                events.append([round(clock, 6), "o", line])
+            clock += rng.uniform(0.01, 0.1)
+            events.append([round(clock, 6), "o", PROMPT])
+            commands.append((command, start, clock))
+        tasks.append((activity, commands))
+    clock += rng.uniform(0.5, 2.0)
+    events.append([round(clock, 6), "i", "\u0004"])
+    events.append([round(clock + 0.001, 6), "o", "exit\r\n"])
+    return events, tasks
+
+
+def generate_annotation_layers(rng: random.Random, tasks: List, duration_seconds: float, revision_number: int) -> List[dict]:
+    """
+    Returns the librecode annotation layers of a session: one annotation per command on layer 0, per
+    task on layer 1, and the whole shell session on layer 2. Later revisions describe commands in
+    more detail, as reviewers' suggestions are worked in.
+    """
+    def annotation(start_seconds, end_seconds, text):
+        return {
+            "group": annotation_group(rng),
+            "beginning": int(start_seconds * 1000),
+            "end": int(end_seconds * 1000),
+            "text": text,
+        }
+
+    commands_layer = []
+    tasks_layer = []
+    for activity, commands in tasks:
+        for command, start, end in commands:
+            text = f"User runs `{command}`." if revision_number <= 2 else f"User runs `{command}` while {activity}."
+            commands_layer.append(annotation(start, end, text))
+        tasks_layer.append(annotation(commands[0][1], commands[-1][2], f"User is {activity}."))
+    session_layer = [annotation(0, duration_seconds, "bash prompt")]
+    return [{"annotations": commands_layer}, {"annotations": tasks_layer}, {"annotations": session_layer}]
+
+
+def generate_recording(rng: random.Random, creator: Tuple[int, str], users: List[Tuple[int, str]], revisions_count: int, commands_count: int, reviews_per_annotation: float, now: datetime) -> dict:
+    """
+    Generates a terminal recording with its revisions, annotations and reviews, as they would be
+    after the recording was created and then updated revisions_count - 1 times with annotations.
+
+    As through the API, the first revision is the plain upload and each update adds a revision with
+    its own annotations. Ids are left for the caller to assign.
+    """
+    events, tasks = generate_session(rng, commands_count)
+    duration_seconds = events[-1][0]
+    created_at = now - timedelta(days=rng.uniform(0, CREATED_WITHIN_DAYS))
+    header = {
+        "version": 2,
+        "width": rng.choice((80, 120, 160)),
+        "height": rng.choice((24, 30, 40)),
+        "timestamp": int(created_at.timestamp()),
+        "idle_time_limit": IDLE_TIME_LIMIT_SECONDS,
+        "env": {"SHELL": "/bin/bash", "TERM": "xterm-256color"},
+        "librecode_annotations": None,
+    }
+
+    reviewers = [user for user in users if user != creator]
+    annotations = []
+    for revision_number in range(2, revisions_count + 1):
+        layers = generate_annotation_layers(rng, tasks, duration_seconds, revision_number)
+        header["librecode_annotations"] = {"note": "librecode annotations", "version": 1, "layers": layers}
+        # Later revisions are reviewed less, having had less time, and rated higher
+        review_weights = [1] * 5 + [revision_number] * 5
+        for level, layer in enumerate(layers):
+            for layer_annotation in layer["annotations"]:
+                reviews = []
+                reviews_count = int(reviews_per_annotation) + (rng.random() < reviews_per_annotation % 1)
+                for reviewer in rng.sample(reviewers, min(reviews_count, len(reviewers))):
+                    score = rng.choices(range(1, 11), weights=review_weights)[0]
+                    reviews.append({
+                        "creator": reviewer,
+                        "created_at": created_at + (now - created_at) * rng.random(),
+                        "q_does_anno_match_content": score >= 5,
+                        "q_can_anno_be_halved": level > 0 and rng.random() < 0.2,
+                        "q_how_well_anno_matches_content": score,
+                        "q_can_you_improve_anno": score < 8,
+                        "q_can_you_provide_markdown": rng.random() < 0.1,
+                    })
+                annotations.append({
+                    "revision_number": revision_number,
+                    "annotation_text": layer_annotation["text"],
+                    "start_time_milliseconds": layer_annotation["beginning"],
+                    "end_time_milliseconds": layer_annotation["end"],
+                    "level": level,
+                    "reviews": reviews,
+                })
+
+    current_annotations = [annotation for annotation in annotations if annotation["revision_number"] == revisions_count]
+    activity = tasks[0][0]
+    title = f"{activity.capitalize()} ({len(events)} events)"
+    description = f"A shell session {', then '.join(task_activity for task_activity, _ in tasks[:3])}."
+    content_metadata = json.dumps(header)
+    return {
+        "creator": creator,
+        "created_at": created_at,
+        "title": title,
+        "description": description,
+        "revision_number": revisions_count,
+        "content_metadata": content_metadata,
+        "content_body": events,
+        "content_stats": compute_content_stats(events, IDLE_TIME_LIMIT_SECONDS),
+        "annotations_count": len(current_annotations),
+        "size_bytes": len(content_metadata) + len(dumps_json(events)),
+        "duration_milliseconds": duration_seconds * 1000,
+        "output_text": extract_output_text(events),
+        "annotation_texts": " ".join(annotation["annotation_text"] for annotation in current_annotations),
+        "annotations": annotations,
+    }
+
+
+def seed_users(db: Session, users_count: int, username_prefix: str) -> List[Tuple[int, str]]:
+    """Loads users_count users named {username_prefix}_<id>, returning their (id, username) pairs."""
+    users = [(user_id, f"{username_prefix}_{user_id}") for user_id in reserve_ids(db, User, users_count)]
+    now = datetime.now(timezone.utc)
+    copy_rows(db, User.__tablename__, ("id", "keycloak_id", "username", "created_at"), (
+        (user_id, f"{username_prefix}-kc-{user_id}", username, now) for user_id, username in users
+    ))
+    db.commit()
+    return users
+
+
+def load_recordings(db: Session, recordings: List[dict]) -> Tuple[int, int]:
+    """
+    Loads generated recordings with their annotations and reviews in the session's transaction,
+    returning the numbers of annotations and reviews loaded.
+
+    Recordings are copied into a temporary table first, so their search vectors are computed by the
+    database as the API computes them on create.
+    """
+    annotations = [annotation for recording in recordings for annotation in recording["annotations"]]
+    reviews = [review for annotation in annotations for review in annotation["reviews"]]
+    recording_ids = iter(reserve_ids(db, TerminalRecording, len(recordings)))
+    annotation_ids = iter(reserve_ids(db, TerminalRecordingAnnotation, len(annotations)))
+    review_ids = iter(reserve_ids(db, TerminalAnnotationReview, len(reviews)))
+
+    recording_rows = []
+    annotation_rows = []
+    review_rows = []
+    for recording in recordings:
+        recording_id = next(recording_ids)
+        creator_id, creator_username = recording["creator"]
+        recording_rows.append((
+            recording_id, creator_id, creator_username, recording["created_at"], recording["created_at"],
+            *(recording[column] for column in RECORDING_COLUMNS[5:]),
+            recording["output_text"], recording["annotation_texts"],
+        ))
+        for annotation in recording["annotations"]:
+            annotation_id = next(annotation_ids)
+            annotation_rows.append((
+                annotation_id, creator_id, recording_id, annotation["revision_number"], annotation["annotation_text"],
+                annotation["start_time_milliseconds"], annotation["end_time_milliseconds"], 0, annotation["level"],
+            ))
+            for review in annotation["reviews"]:
+                reviewer_id, reviewer_username = review["creator"]
+                review_rows.append((
+                    next(review_ids), reviewer_id, reviewer_username, review["created_at"], annotation_id, recording_id, annotation["revision_number"],
+                    *(review[column] for column in REVIEW_COLUMNS[7:]),
+                ))
+
+    db.execute(text(
+        f"CREATE TEMPORARY TABLE seed_terminal_recordings (LIKE {TerminalRecording.__tablename__} INCLUDING DEFAULTS, "
+        "output_text TEXT, annotation_texts TEXT) ON COMMIT DROP"
+    ))
+    copy_rows(db, "seed_terminal_recordings", RECORDING_COLUMNS + ("output_text", "annotation_texts"), recording_rows)
+    columns = ", ".join(RECORDING_COLUMNS)
+    db.execute(text(f"""
+        INSERT INTO {TerminalRecording.__tablename__} ({columns}, search_vector, content_search_vector)
+        SELECT {columns},
+            setweight(to_tsvector('{METADATA_SEARCH_CONFIG}', coalesce(title, '')), 'A')
+            || setweight(to_tsvector('{METADATA_SEARCH_CONFIG}', coalesce(description, '')), 'B')
+            || setweight(to_tsvector('{METADATA_SEARCH_CONFIG}', coalesce(annotation_texts, '')), 'C'),
+            to_tsvector('{CONTENT_SEARCH_CONFIG}', output_text)
+        FROM seed_terminal_recordings
+    """))
+    copy_rows(db, TerminalRecordingAnnotation.__tablename__, ANNOTATION_COLUMNS, annotation_rows)
+    copy_rows(db, TerminalAnnotationReview.__tablename__, REVIEW_COLUMNS, review_rows)
+    return len(annotation_rows), len(review_rows)
+
+
+def seed_recordings_batch(batch_number: int, recordings_count: int, users: List[Tuple[int, str]], revisions_count: int, commands_count: int, reviews_per_annotation: float, seed: int, now: datetime) -> Tuple[int, int, int]:
+    """Generates and loads one batch of recordings in its own session and transaction, returning the rows loaded."""
+    rng = random.Random(f"{seed}-{batch_number}")
+    recordings = [
+        generate_recording(
+            rng,
+            rng.choice(users),
+            users,
+            rng.randint(min(2, revisions_count), revisions_count),
+            max(1, int(rng.gauss(commands_count, commands_count / 4))),
+            reviews_per_annotation,
+            now,
+        )
+        for _ in range(recordings_count)
+    ]
+    db = SessionLocal()
+    try:
+        annotations_count, reviews_count = load_recordings(db, recordings)
+        db.commit()
+    finally:
+        db.close()
+    return recordings_count, annotations_count, reviews_count
+
+
+def dispose_inherited_engine():
+    # Connections of the parent process must not be shared with the workers
+    engine.dispose(close=False)
+
+
+def seed_synthetic_data(
+    db: Session,
+    users_count: int,
+    recordings_count: int,
+    revisions_count: int = 3,
+    commands_count: int = 20,
+    reviews_per_annotation: float = 0.5,
+    batch_size: int = 200,
+    workers: int = 1,
+    seed: int = 0,
+    username_prefix: str = "synthetic_user",
+    update_stats: bool = True,
+) -> Dict[str, int]:
+    """
+    Loads synthetic users and terminal recordings, with their revisions, layered annotations and
+    reviews, for performance testing, returning the numbers of rows loaded.
+
+    Each recording gets up to revisions_count revisions, all annotated but the first, with about
+    commands_count commands, each annotated, plus an annotation per task and one for the session.
+    Batches of batch_size recordings are generated and loaded with COPY by workers processes in
+    parallel, each batch in its own transaction. The same seed generates the same data. Review
+    stats are then rebuilt from the reviews unless update_stats is off.
+    """
+    now = datetime.now(timezone.utc)
+    users = seed_users(db, users_count, username_prefix)
+    logging.info(f"Seeded {len(users)} users.")
+
+    batches = []
+    for batch_number, start in enumerate(range(0, recordings_count, batch_size)):
+        batches.append((batch_number, min(batch_size, recordings_count - start), users, revisions_count, commands_count, reviews_per_annotation, seed, now))
+
+    totals = {"users": len(users), "recordings": 0, "annotations": 0, "reviews": 0}
+
+    def add_batch(counts):
+        for name, count in zip(("recordings", "annotations", "reviews"), counts):
+            totals[name] += count
+        logging.info(f"Seeded {totals['recordings']}/{recordings_count} recordings, {totals['annotations']} annotations and {totals['reviews']} reviews.")
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=dispose_inherited_engine) as executor:
+            for counts in executor.map(seed_recordings_batch, *zip(*batches)):
+                add_batch(counts)
+    else:
+        for batch in batches:
+            add_batch(seed_recordings_batch(*batch))
+
+    if update_stats:
+        backfill_review_stats(db)
+    for model in (User, TerminalRecording, TerminalRecordingAnnotation, TerminalAnnotationReview):
+        db.execute(text(f"ANALYZE {model.__tablename__}"))
+    db.commit()
+    return totals
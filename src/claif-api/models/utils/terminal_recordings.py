@@ -1,8 +1,13 @@
 import json, logging
-from typing import Dict, Any
-from sqlalchemy.orm import Session
-from models.annotations import TerminalRecordingAnnotation
+from typing import Dict, Any, Optional, Tuple
+from sqlalchemy import Integer, and_, func, literal
+from sqlalchemy.orm import Session, defer, joinedload
+from models.annotations import TerminalRecordingAnnotation, TerminalAnnotationRead
+from models.annotation_reviews import TerminalAnnotationReview, AnnotationReviewRead
+from models.annotation_review_stats import TerminalRecordingReviewStats
+from models.recordings import TerminalRecording, TerminalRecordingRead
 from utils._logging import logging
+from utils.json_responses import serialize_orm
 from sqlalchemy.orm import Session
 
 
@@ -111,3 +116,77 @@ def create_annotation(db: Session, annotation_data: Dict[str, Any], recording_id
         level=annotation_data.get("layer_level"),
     )
     db.add(annotation)
+
+
+
+# The recording columns too large to load when a read leaves them out
+LARGE_RECORDING_FIELDS = ("content_body", "content_metadata")
+
+
+def parse_recording_fields(fields: str = None) -> Optional[Tuple[str, ...]]:
+    """
+    Parses a comma-separated list of recording fields into a sorted tuple, so equal selections
+    compare and cache alike. Returns None, selecting every field, when no list is given.
+    """
+    if fields is None:
+        return None
+    field_names = tuple(sorted({name.strip() for name in fields.split(",") if name.strip()}))
+    unknown_fields = [name for name in field_names if name not in TerminalRecordingRead.__fields__]
+    if unknown_fields:
+        raise ValueError(f"Unknown recording fields: {', '.join(unknown_fields)}")
+    return field_names
+
+
+def read_recording_revision(db: Session, recording_id: int, revision_number: int = None, fields: Tuple[str, ...] = None):
+    """
+    Loads a recording revision with its annotations and reviews, serialized for the read endpoint.
+
+    Creators are joined into the recording and review queries, so the read costs three queries
+    regardless of how many reviews or distinct reviewers the revision has. Given fields, only those
+    recording fields are returned, and large columns left out are never loaded. The result is plain
+    data ready for dumps_json. Returns None if the recording does not exist or is deleted.
+    """
+    options = []
+    if fields is None or "creator" in fields:
+        options.append(joinedload(TerminalRecording.creator))
+    if fields is not None:
+        options += [defer(getattr(TerminalRecording, name)) for name in LARGE_RECORDING_FIELDS if name not in fields]
+    recording = db.query(TerminalRecording).options(*options).filter_by(id=recording_id, deleted_at=None).first()
+    if recording is None:
+        return None
+
+    if revision_number is None:
+        revision_number = recording.revision_number
+    annotations = recording.annotations.filter_by(revision_number=revision_number).all()
+    annotation_reviews = recording.annotation_reviews.options(
+        joinedload(TerminalAnnotationReview.creator)
+    ).filter_by(revision_number=revision_number).all()
+
+    return {
+        "recording": serialize_orm(TerminalRecordingRead, recording, fields),
+        "annotations": [serialize_orm(TerminalAnnotationRead, annotation) for annotation in annotations],
+        "annotation_reviews": [serialize_orm(AnnotationReviewRead, review) for review in annotation_reviews],
+        "selected_revision_number": revision_number,
+    }
+
+
+def read_recording_version(db: Session, recording_id: int, revision_number: int = None):
+    """
+    Returns the parts identifying the current state of a recording revision read in a single query.
+
+    The row holds the selected and current revision numbers and the version of the revision's review
+    stats, which changes whenever a review of the revision is created or updated. Returns None if
+    the recording does not exist or is deleted.
+    """
+    selected_revision_number = func.coalesce(literal(revision_number, Integer), TerminalRecording.revision_number)
+    return db.query(
+        selected_revision_number.label("selected_revision_number"),
+        TerminalRecording.revision_number,
+        func.coalesce(TerminalRecordingReviewStats.version, 0).label("reviews_version"),
+    ).select_from(TerminalRecording).outerjoin(
+        TerminalRecordingReviewStats,
+        and_(
+            TerminalRecordingReviewStats.recording_id == TerminalRecording.id,
+            TerminalRecordingReviewStats.revision_number == selected_revision_number,
+        ),
+    ).filter(TerminalRecording.id == recording_id, TerminalRecording.deleted_at.is_(None)).first()
@@ -1,24 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from collections import Counter
+from types import SimpleNamespace
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session, joinedload
 
 from models.recordings import TerminalRecording
 from models.users import User
 from models.annotation_reviews import (
     TerminalAnnotationReview,
+    AnnotationReviewBatchCreate,
     AnnotationReviewCreate,
+    AnnotationReviewQuestions,
     AnnotationReviewRead,
     AnnotationReviewUpdate,
 )
 from models.annotations import TerminalRecordingAnnotation
+from models.annotation_review_stats import (
+    TerminalAnnotationReviewStats,
+    TerminalAnnotationReviewStatsRead,
+    TerminalRecordingReviewStats,
+    TerminalRecordingReviewStatsRead,
+)
+from models.utils.annotation_review_stats import increment_annotation_reviews_count, update_review_stats
 from utils.database import get_db
+from utils.env import rate_limit
 from utils.auth import get_current_user, limiter
 from utils.exception_handlers import value_error_handler
+from utils.response_cache import invalidate_recording
 
 router = APIRouter()
 
 
 @router.post("/create")
-@limiter.limit("5/minute")
+@limiter.limit(rate_limit("create_annotation_review", "5/minute"))
 @value_error_handler
 async def create_annotation_review(
     payload: AnnotationReviewCreate,
@@ -26,8 +40,14 @@ async def create_annotation_review(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    # Get the corresponding annotation
-    annotation = db.query(TerminalRecordingAnnotation).filter_by(id=payload.annotation_id).first()
+    # Get the recording and revision of the corresponding annotation
+    annotation = db.query(
+        TerminalRecordingAnnotation.recording_id,
+        TerminalRecordingAnnotation.revision_number,
+    ).join(TerminalRecording).filter(
+        TerminalRecordingAnnotation.id == payload.annotation_id,
+        TerminalRecording.deleted_at.is_(None),
+    ).first()
     if not annotation:
         raise HTTPException(status_code=404, detail="Annotation not found")
 
@@ -40,14 +60,129 @@ async def create_annotation_review(
         revision_number=annotation.revision_number,
     )
     db.add(annotation_review)
-    annotation.reviews_count += 1
+    increment_annotation_reviews_count(db, {payload.annotation_id: 1})
+    update_review_stats(db, added_reviews=[annotation_review])
     db.commit()
+    invalidate_recording(annotation.recording_id, [annotation.revision_number])
     db.refresh(annotation_review)
     return {"message": "Annotation review created", "annotation_review_id": annotation_review.id}
 
 
+@router.post("/create_batch")
+@limiter.limit(rate_limit("create_annotation_reviews_batch", "5/minute"))
+@value_error_handler
+async def create_annotation_reviews_batch(
+    payload: AnnotationReviewBatchCreate,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # Validate all annotation IDs with a single IN query
+    annotation_ids = {review.annotation_id for review in payload.reviews}
+    annotations = {
+        annotation.id: annotation
+        for annotation in db.query(
+            TerminalRecordingAnnotation.id,
+            TerminalRecordingAnnotation.recording_id,
+            TerminalRecordingAnnotation.revision_number,
+        ).join(TerminalRecording).filter(
+            TerminalRecordingAnnotation.id.in_(annotation_ids),
+            TerminalRecording.deleted_at.is_(None),
+        )
+    }
+
+    results = []
+    annotation_reviews = []
+    for index, review in enumerate(payload.reviews):
+        annotation = annotations.get(review.annotation_id)
+        if annotation is None:
+            results.append({"index": index, "annotation_id": review.annotation_id, "error": "Annotation not found"})
+            continue
+        annotation_review = TerminalAnnotationReview(
+            **review.dict(),
+            creator_id=current_user.id,
+            creator_username=current_user.username,
+            recording_id=annotation.recording_id,
+            revision_number=annotation.revision_number,
+        )
+        annotation_reviews.append(annotation_review)
+        results.append({"index": index, "annotation_id": review.annotation_id, "annotation_review": annotation_review})
+
+    # Insert the reviews in one batched INSERT ... RETURNING and bump the counts with one grouped UPDATE
+    db.add_all(annotation_reviews)
+    db.flush()
+    increment_annotation_reviews_count(db, Counter(review.annotation_id for review in annotation_reviews))
+    update_review_stats(db, added_reviews=annotation_reviews)
+    for result in results:
+        if "annotation_review" in result:
+            result["annotation_review_id"] = result.pop("annotation_review").id
+    reviewed_revisions = {(review.recording_id, review.revision_number) for review in annotation_reviews}
+    db.commit()
+    for recording_id, revision_number in reviewed_revisions:
+        invalidate_recording(recording_id, [revision_number])
+
+    return {
+        "message": "Annotation reviews created",
+        "created_count": len(annotation_reviews),
+        "results": results,
+    }
+
+
+@router.get("/stats/annotation/{annotation_id}", response_model=TerminalAnnotationReviewStatsRead)
+@limiter.limit(rate_limit("read_annotation_review_stats", "20/minute"))
+@value_error_handler
+async def read_annotation_review_stats(request: Request, annotation_id: int, db: Session = Depends(get_db)):
+    stats = db.query(TerminalAnnotationReviewStats).join(
+        TerminalRecording, TerminalRecording.id == TerminalAnnotationReviewStats.recording_id,
+    ).filter(
+        TerminalAnnotationReviewStats.annotation_id == annotation_id,
+        TerminalRecording.deleted_at.is_(None),
+    ).first()
+    if stats is not None:
+        return TerminalAnnotationReviewStatsRead.from_stats(
+            stats,
+            annotation_id=stats.annotation_id,
+            recording_id=stats.recording_id,
+            revision_number=stats.revision_number,
+        )
+
+    # Not reviewed yet, so report empty stats if the annotation exists
+    annotation = db.query(TerminalRecordingAnnotation).join(TerminalRecording).filter(
+        TerminalRecordingAnnotation.id == annotation_id,
+        TerminalRecording.deleted_at.is_(None),
+    ).first()
+    if annotation is None:
+        raise HTTPException(status_code=404, detail="Annotation not found")
+    return TerminalAnnotationReviewStatsRead.from_stats(
+        None,
+        annotation_id=annotation.id,
+        recording_id=annotation.recording_id,
+        revision_number=annotation.revision_number,
+    )
+
+
+@router.get("/stats/recording/{recording_id}", response_model=TerminalRecordingReviewStatsRead)
+@limiter.limit(rate_limit("read_recording_review_stats", "20/minute"))
+@value_error_handler
+async def read_recording_review_stats(
+    request: Request,
+    recording_id: int,
+    revision_number: int = None,
+    db: Session = Depends(get_db),
+):
+    # Checked for every read, since the stats of a deleted recording's revisions are kept until the purge
+    recording = db.query(TerminalRecording.revision_number).filter_by(id=recording_id, deleted_at=None).first()
+    if recording is None:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    if revision_number is None:
+        revision_number = recording.revision_number
+
+    stats = db.query(TerminalRecordingReviewStats).filter_by(recording_id=recording_id, revision_number=revision_number).first()
+    return TerminalRecordingReviewStatsRead.from_stats(stats, recording_id=recording_id, revision_number=revision_number)
+
+
 @router.post("/update")
-@limiter.limit("5/minute")
+@limiter.limit(rate_limit("update_annotation_review", "5/minute"))
 @value_error_handler
 async def update_annotation_review(
     payload: AnnotationReviewUpdate,
@@ -55,11 +190,69 @@ async def update_annotation_review(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    pass
+    # Lock the review so concurrent updates apply their stats changes one after another; reviews of
+    # deleted recordings can no longer be changed
+    annotation_review = db.query(TerminalAnnotationReview).join(
+        TerminalRecording, TerminalRecording.id == TerminalAnnotationReview.recording_id,
+    ).filter(
+        TerminalAnnotationReview.id == payload.annotation_review_id,
+        TerminalRecording.deleted_at.is_(None),
+    ).with_for_update(of=TerminalAnnotationReview).first()
+    if annotation_review is None:
+        raise HTTPException(status_code=404, detail="Annotation review not found")
+    if annotation_review.creator_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the creator of an annotation review can update it")
+
+    previous_review = SimpleNamespace(
+        annotation_id=annotation_review.annotation_id,
+        recording_id=annotation_review.recording_id,
+        revision_number=annotation_review.revision_number,
+        **{question: getattr(annotation_review, question) for question in AnnotationReviewQuestions.__fields__},
+    )
+    for question, answer in payload.dict(exclude={"annotation_review_id"}).items():
+        setattr(annotation_review, question, answer)
+
+    update_review_stats(db, added_reviews=[annotation_review], removed_reviews=[previous_review])
+    db.commit()
+    invalidate_recording(previous_review.recording_id, [previous_review.revision_number])
+    return {"message": "Annotation review updated", "annotation_review_id": payload.annotation_review_id}
 
-    
-@router.get("/{recording_id}", response_model=AnnotationReviewRead)
-@limiter.limit("20/minute")
+
+@router.get("/{recording_id}", response_model=List[AnnotationReviewRead])
+@limiter.limit(rate_limit("read_recording_reviews", "20/minute"))
 @value_error_handler
-async def read_recording(request: Request, recording_id: int, db: Session = Depends(get_db), response_model=AnnotationReviewRead):
-    pass
+async def read_recording_reviews(
+    request: Request,
+    recording_id: int,
+    revision_number: int = None,
+    annotation_id: int = None,
+    creator_id: int = None,
+    min_score: int = Query(None, ge=1, le=10),
+    max_score: int = Query(None, ge=1, le=10),
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """Returns a page of the reviews of a recording ordered by ID; pass the last ID as after_id for the next page."""
+    # Creators are joined into the same query instead of being lazy loaded per review, and deleted
+    # recordings have no reviews to list
+    query = db.query(TerminalAnnotationReview).options(joinedload(TerminalAnnotationReview.creator)).join(
+        TerminalRecording, TerminalRecording.id == TerminalAnnotationReview.recording_id,
+    ).filter(
+        TerminalAnnotationReview.recording_id == recording_id,
+        TerminalRecording.deleted_at.is_(None),
+        TerminalAnnotationReview.id > after_id,
+    )
+    if revision_number is not None:
+        query = query.filter(TerminalAnnotationReview.revision_number == revision_number)
+    if annotation_id is not None:
+        query = query.filter(TerminalAnnotationReview.annotation_id == annotation_id)
+    if creator_id is not None:
+        query = query.filter(TerminalAnnotationReview.creator_id == creator_id)
+    if min_score is not None:
+        query = query.filter(TerminalAnnotationReview.q_how_well_anno_matches_content >= min_score)
+    if max_score is not None:
+        query = query.filter(TerminalAnnotationReview.q_how_well_anno_matches_content <= max_score)
+
+    annotation_reviews = query.order_by(TerminalAnnotationReview.id).limit(limit).all()
+    return [AnnotationReviewRead.from_orm(annotation_review) for annotation_review in annotation_reviews]
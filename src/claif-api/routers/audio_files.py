@@ -8,14 +8,14 @@ from utils.database import get_db
 from utils.auth import get_current_user, limiter
 from utils.exception_handlers import value_error_handler
 from utils.minio_utils import ensure_bucket_exists, upload_file_to_minio
-from utils.env import CLAIF_TRANSCRIBER_ENDPOINT
+from utils.env import CLAIF_TRANSCRIBER_ENDPOINT, rate_limit
 from datetime import datetime, timezone
 import logging
 
 router = APIRouter()
 
 @router.post("/create")
-@limiter.limit("5/minute")
+@limiter.limit(rate_limit("create_file", "5/minute"))
 @value_error_handler
 async def create_file(
     request: Request,
@@ -83,3 +83,24 @@ async def create_file(
         "file_metadata": new_audio_file,
         "transcription": transcription_response
     }
+
+
+@router.delete("/delete/{audio_file_id}")
+@limiter.limit(rate_limit("delete_file", "5/minute"))
+@value_error_handler
+async def delete_file(
+    request: Request,
+    audio_file_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Soft delete an audio file; its stored object is removed later by scripts/purge_deleted.py."""
+    audio_file = db.query(AudioFile).filter_by(id=audio_file_id, deleted_at=None).first()
+    if audio_file is None:
+        raise HTTPException(status_code=404, detail="Audio file not found")
+    if audio_file.creator_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the creator of an audio file can delete it")
+
+    audio_file.deleted_at = datetime.now(timezone.utc)
+    db.commit()
+    return {"message": "Audio file deleted"}
@@ -1,23 +1,39 @@
-from fastapi import Depends
+import httpx
+from fastapi import Depends, Form, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from keycloak import KeycloakOpenID
+from keycloak import KeycloakError
 from fastapi import APIRouter
-from utils.env import KEYCLOAK_CLIENT_ID, KEYCLOAK_REALM, KEYCLOAK_SERVER_URL
+from utils._logging import logging
+from utils.auth import keycloak_openid
 
 
 router = APIRouter()
 
 
+def raise_for_keycloak_error(e: Exception, detail: str):
+    # Keycloak answers rejected credentials and refresh tokens with 401 or 400 (invalid_grant)
+    if isinstance(e, KeycloakError) and e.response_code in (400, 401):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail) from e
+    logging.error(f"Keycloak token request failed: {e}")
+    raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Authentication service unavailable") from e
+
+
+# The token calls are awaited on the pooled async client, so slow logins never hold a worker thread
 @router.post("/token")
-def token(form_data: OAuth2PasswordRequestForm = Depends()):
-    keycloak_openid = KeycloakOpenID(
-        server_url=KEYCLOAK_SERVER_URL + "/",
-        client_id=KEYCLOAK_CLIENT_ID,
-        realm_name=KEYCLOAK_REALM,
-    )
-    token = keycloak_openid.token(
-        username=form_data.username,
-        password=form_data.password,
-        grant_type="password",
-    )
-    return token
\ No newline at end of file
+async def token(form_data: OAuth2PasswordRequestForm = Depends()):
+    try:
+        return await keycloak_openid.a_token(
+            username=form_data.username,
+            password=form_data.password,
+            grant_type="password",
+        )
+    except (KeycloakError, httpx.HTTPError) as e:
+        raise_for_keycloak_error(e, "Invalid username or password")
+
+
+@router.post("/refresh")
+async def refresh(refresh_token: str = Form(...)):
+    try:
+        return await keycloak_openid.a_refresh_token(refresh_token)
+    except (KeycloakError, httpx.HTTPError) as e:
+        raise_for_keycloak_error(e, "Invalid or expired refresh token")
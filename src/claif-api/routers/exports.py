@@ -0,0 +1,73 @@
+from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+from models.exports import DatasetExport, DatasetExportCreate, DatasetExportRead
+from models.users import User
+from models.utils.exports import EXPORT_CONTENT_TYPE, run_dataset_export
+from utils.database import get_db, run_with_db_session
+from utils.env import MINIO_EXPORT_BUCKET, rate_limit
+from utils.auth import get_current_user, limiter
+from utils.exception_handlers import value_error_handler
+from utils.minio_utils import ensure_bucket_exists, upload_file_to_minio
+
+
+router = APIRouter()
+
+
+def write_export_shard(data: bytes, object_name: str):
+    ensure_bucket_exists(MINIO_EXPORT_BUCKET)
+    upload_file_to_minio(file_data=data, file_name=object_name, content_type=EXPORT_CONTENT_TYPE, bucket_name=MINIO_EXPORT_BUCKET)
+
+
+@router.post("", response_model=DatasetExportRead)
+@limiter.limit(rate_limit("create_export", "5/minute"))
+@value_error_handler
+async def create_export(
+    payload: DatasetExportCreate,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Starts exporting live recordings to object storage, returning the job to poll for its shards."""
+    export = DatasetExport(
+        creator_id=current_user.id,
+        parameters=payload.dict(exclude={"since"}, exclude_none=True),
+        since=payload.since,
+        bucket_name=MINIO_EXPORT_BUCKET,
+    )
+    db.add(export)
+    db.flush()
+    export.object_prefix = f"export_{export.id}"
+    db.commit()
+    db.refresh(export)
+
+    # The export runs after the response is sent, with a session of its own
+    background_tasks.add_task(run_with_db_session, run_dataset_export, export.id, write_export_shard)
+    return export
+
+
+@router.get("", response_model=List[DatasetExportRead])
+@limiter.limit(rate_limit("list_exports", "20/minute"))
+@value_error_handler
+async def list_exports(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return db.query(DatasetExport).filter_by(creator_id=current_user.id).order_by(DatasetExport.id.desc()).limit(50).all()
+
+
+@router.get("/{export_id}", response_model=DatasetExportRead)
+@limiter.limit(rate_limit("read_export", "20/minute"))
+@value_error_handler
+async def read_export(
+    request: Request,
+    export_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    export = db.query(DatasetExport).filter_by(id=export_id, creator_id=current_user.id).first()
+    if export is None:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return export
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from models.recordings import TerminalRecording, TerminalRecordingSearchResults
+from models.utils.search import CONTENT_RANK_WEIGHT, CONTENT_SEARCH_CONFIG, METADATA_SEARCH_CONFIG
+from utils.database import get_db
+from utils.env import rate_limit
+from utils.auth import limiter
+from utils.exception_handlers import value_error_handler
+
+
+router = APIRouter()
+
+
+@router.get("", response_model=TerminalRecordingSearchResults)
+@limiter.limit(rate_limit("search_recordings", "20/minute"))
+@value_error_handler
+async def search_recordings(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, gt=0, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    # Each vector is matched with a query parsed by its own text search configuration
+    metadata_query = func.websearch_to_tsquery(METADATA_SEARCH_CONFIG, q)
+    content_query = func.websearch_to_tsquery(CONTENT_SEARCH_CONFIG, q)
+    rank = (
+        func.coalesce(func.ts_rank(TerminalRecording.search_vector, metadata_query), 0)
+        + CONTENT_RANK_WEIGHT * func.coalesce(func.ts_rank(TerminalRecording.content_search_vector, content_query), 0)
+    ).label("rank")
+
+    # Either match is served by its partial GIN index; one extra row tells whether another page exists
+    rows = db.query(
+        TerminalRecording.id,
+        TerminalRecording.title,
+        TerminalRecording.description,
+        TerminalRecording.revision_number,
+        TerminalRecording.creator_id,
+        TerminalRecording.creator_username,
+        TerminalRecording.annotations_count,
+        TerminalRecording.duration_milliseconds,
+        rank,
+    ).filter(
+        TerminalRecording.deleted_at.is_(None),
+        or_(
+            TerminalRecording.search_vector.op("@@")(metadata_query),
+            TerminalRecording.content_search_vector.op("@@")(content_query),
+        ),
+    ).order_by(rank.desc(), TerminalRecording.id).offset(offset).limit(limit + 1).all()
+
+    return {
+        "query": q,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if len(rows) > limit else None,
+        "results": [row._asdict() for row in rows[:limit]],
+    }
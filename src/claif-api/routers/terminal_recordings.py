@@ -1,23 +1,37 @@
 import json
-from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import List
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
 from models.recordings import TerminalRecording
 from models.users import User
-from models.recordings import TerminalRecordingCreate, TerminalRecordingRead, TerminalRecordingUpdate, TerminalRecordingListRead
-from models.annotations import TerminalAnnotationRead, TerminalAnnotationRead
-from models.annotation_reviews import AnnotationReviewRead
-from models.utils.terminal_recordings import create_annotation, extract_annotations, parse_asciinema_recording
+from models.recordings import TerminalRecordingCreate, TerminalRecordingUpdate, TerminalRecordingListRead, TerminalRecordingContentStats
+from models.annotations import TerminalAnnotationRead, TerminalAnnotationDiff, TerminalRecordingAnnotation
+from models.utils.terminal_recordings import (
+    create_annotation,
+    extract_annotations,
+    parse_asciinema_recording,
+    parse_recording_fields,
+    read_recording_revision,
+    read_recording_version,
+)
+from models.utils.annotation_diffs import diff_annotations
+from models.utils.content_stats import compute_content_stats
+from models.utils.search import content_search_vector, recording_search_vector
 from utils.database import get_db
+from utils.env import rate_limit
 from utils.auth import get_current_user, limiter
 from utils.exception_handlers import value_error_handler
+from utils.json_responses import FastJSONResponse, dumps_json, serialize_orm
+from utils.http_caching import RECORDING_CACHE_CONTROL, etag_matches, make_body_etag, make_etag, not_modified_response
+from utils.response_cache import invalidate_recording, recording_cache_key, response_cache
 from sqlalchemy.orm import Session
-from sqlalchemy.orm import load_only
 
 router = APIRouter()
 
 
 @router.post("/create")
-@limiter.limit("5/minute")
+@limiter.limit(rate_limit("create_recording", "5/minute"))
 @value_error_handler
 async def create_recording(
     payload: TerminalRecordingCreate,
@@ -27,6 +41,7 @@ async def create_recording(
 ):
     
     content_metadata, content_body, annotations = parse_asciinema_recording(payload.recording_content)
+    content_metadata_json = json.dumps(content_metadata)
 
     terminal_recording = TerminalRecording(
         creator_id=current_user.id,
@@ -34,10 +49,13 @@ async def create_recording(
         title=payload.title,
         description=payload.description,
         revision_number=1,
-        content_metadata=json.dumps(content_metadata),
-        content_body=json.dumps(content_body),
+        content_metadata=content_metadata_json,
+        content_body=content_body,
+        content_stats=compute_content_stats(content_body, content_metadata.get("idle_time_limit")),
+        search_vector=recording_search_vector(payload.title, payload.description, (annotation["text"] for annotation in annotations)),
+        content_search_vector=content_search_vector(content_body),
         annotations_count=len(annotations),
-        size_bytes=len(json.dumps(content_metadata)) + len(json.dumps(content_body)),
+        size_bytes=len(content_metadata_json) + len(dumps_json(content_body)),
         duration_milliseconds=content_body[-1][0] * 1000 if content_body else 0,
     )
 
@@ -51,52 +69,175 @@ async def create_recording(
 
 
 @router.get("/read/{recording_id}")
-@limiter.limit("20/minute")
+@limiter.limit(rate_limit("read_recording", "20/minute"))
 @value_error_handler
 async def read_recording(
     request: Request,
     recording_id: int,
     revision_number: int = None,
+    fields: str = None,
     db: Session = Depends(get_db),
 ):
-    # Fetch the recording
-    recording = db.query(TerminalRecording).filter_by(id=recording_id).first()
+    recording_fields = parse_recording_fields(fields)
+
+    # Revisions are immutable, so the revision numbers and the review stats version identify the
+    # response, along with the selected fields
+    recording_version = read_recording_version(db, recording_id, revision_number)
+    if recording_version is None:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    etag_parts = [recording_id, *recording_version]
+    if recording_fields is not None:
+        etag_parts += ["fields", *recording_fields]
+    etag = make_etag(*etag_parts)
+    if etag_matches(request, etag):
+        return not_modified_response(etag, RECORDING_CACHE_CONTROL)
+
+    # Full reads are served from the response cache when cached with the current ETag, so entries
+    # left stale by writes handled in other workers are never served. Reads of selected fields skip
+    # it, since they leave out the large columns that make full reads costly.
+    cache_key = recording_cache_key(recording_id, revision_number) if recording_fields is None else None
+    cached_response = response_cache.get(cache_key, etag) if cache_key else None
+    if cached_response is not None:
+        return Response(content=cached_response[1], media_type="application/json", headers={"ETag": etag, "Cache-Control": RECORDING_CACHE_CONTROL})
+
+    # Fetch the recording revision with its annotations and reviews
+    recording_revision = read_recording_revision(db, recording_id, recording_version.selected_revision_number, recording_fields)
+    if recording_revision is None:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    body = dumps_json(recording_revision)
+    # A write committed during the read may have invalidated the cache already, so the body is only
+    # cached if the recording is still at the version it was read at
+    if cache_key and read_recording_version(db, recording_id, revision_number) == recording_version:
+        response_cache.set(cache_key, etag, body)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": RECORDING_CACHE_CONTROL})
+
+
+@router.get("/response_cache")
+@limiter.limit(rate_limit("read_response_cache_stats", "20/minute"))
+@value_error_handler
+async def read_response_cache_stats(request: Request):
+    return response_cache.stats()
+
+
+@router.get("/{recording_id}/diff", response_model=TerminalAnnotationDiff)
+@limiter.limit(rate_limit("diff_recording_revisions", "20/minute"))
+@value_error_handler
+async def diff_recording_revisions(
+    request: Request,
+    recording_id: int,
+    from_revision_number: int = Query(..., alias="from", gt=0),
+    to_revision_number: int = Query(None, alias="to", gt=0),
+    db: Session = Depends(get_db),
+):
+    # Fetch only the current revision number of the recording
+    recording = db.query(TerminalRecording.revision_number).filter_by(id=recording_id, deleted_at=None).first()
     if recording is None:
         raise HTTPException(status_code=404, detail="Recording not found")
 
-    # Convert the dynamic annotations relationship into a list of Pydantic models
-    if revision_number is None:
-        revision_number = recording.revision_number
-    annotations = list(recording.annotations.filter_by(revision_number=revision_number).all())
-    annotations_list = [TerminalAnnotationRead.from_orm(annotation) for annotation in annotations]
+    if to_revision_number is None:
+        to_revision_number = recording.revision_number
+    if max(from_revision_number, to_revision_number) > recording.revision_number:
+        raise ValueError(f"Recording {recording_id} has no revision greater than {recording.revision_number}")
 
-    annotation_reviews = list(recording.annotation_reviews.filter_by(revision_number=revision_number).all())
-    annotation_reviews_list = [AnnotationReviewRead.from_orm(review) for review in annotation_reviews]
+    # Fetch the annotations of both revisions in a single query
+    annotations = db.query(TerminalRecordingAnnotation).filter(
+        TerminalRecordingAnnotation.recording_id == recording_id,
+        TerminalRecordingAnnotation.revision_number.in_([from_revision_number, to_revision_number]),
+    ).all()
+    from_annotations = [annotation for annotation in annotations if annotation.revision_number == from_revision_number]
+    to_annotations = [annotation for annotation in annotations if annotation.revision_number == to_revision_number]
 
+    unchanged_count, changes = diff_annotations(from_annotations, to_annotations)
     return {
-        "recording": TerminalRecordingRead.from_orm(recording), 
-        "annotations": annotations_list,
-        "annotation_reviews": annotation_reviews_list,
-        "selected_revision_number": revision_number,
+        "recording_id": recording_id,
+        "from_revision_number": from_revision_number,
+        "to_revision_number": to_revision_number,
+        "unchanged_count": unchanged_count,
+        "changes": changes,
     }
 
 
-@router.get("/list")
-@limiter.limit("5/minute")
+@router.get("/{recording_id}/annotations", response_model=List[TerminalAnnotationRead])
+@limiter.limit(rate_limit("read_recording_annotations", "20/minute"))
+@value_error_handler
+async def read_recording_annotations(
+    request: Request,
+    recording_id: int,
+    revision_number: int = None,
+    at_ms: float = None,
+    from_ms: float = None,
+    to_ms: float = None,
+    db: Session = Depends(get_db),
+):
+    if at_ms is not None and (from_ms is not None or to_ms is not None):
+        raise ValueError("Provide either at_ms or from_ms/to_ms, not both")
+    if at_ms is not None:
+        from_ms = to_ms = at_ms
+    if from_ms is not None and to_ms is not None and from_ms > to_ms:
+        raise ValueError("from_ms must not be greater than to_ms")
+
+    # Checked for every read, since the annotations of a deleted recording's revisions are kept until the purge
+    recording = db.query(TerminalRecording.revision_number).filter_by(id=recording_id, deleted_at=None).first()
+    if recording is None:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    if revision_number is None:
+        revision_number = recording.revision_number
+
+    # Annotations overlapping the window, served by the (recording, revision, start, end) index
+    query = db.query(TerminalRecordingAnnotation).filter(
+        TerminalRecordingAnnotation.recording_id == recording_id,
+        TerminalRecordingAnnotation.revision_number == revision_number,
+    )
+    if to_ms is not None:
+        query = query.filter(TerminalRecordingAnnotation.start_time_milliseconds <= to_ms)
+    if from_ms is not None:
+        query = query.filter(TerminalRecordingAnnotation.end_time_milliseconds >= from_ms)
+    annotations = query.order_by(
+        TerminalRecordingAnnotation.start_time_milliseconds,
+        TerminalRecordingAnnotation.level,
+    ).all()
+    return [TerminalAnnotationRead.from_orm(annotation) for annotation in annotations]
+
+
+@router.get("/{recording_id}/stats", response_model=TerminalRecordingContentStats)
+@limiter.limit(rate_limit("read_recording_content_stats", "20/minute"))
+@value_error_handler
+async def read_recording_content_stats(request: Request, recording_id: int, db: Session = Depends(get_db)):
+    # Fetch only the stats column, not the events it was derived from
+    recording = db.query(TerminalRecording.content_stats).filter_by(id=recording_id, deleted_at=None).first()
+    if recording is None:
+        raise HTTPException(status_code=404, detail="Recording not found")
+
+    content_stats = recording.content_stats
+    if content_stats is None:
+        # Recordings ingested before stats existed get them computed and stored on first request
+        recording = db.query(TerminalRecording).filter_by(id=recording_id, deleted_at=None).first()
+        content_metadata = json.loads(recording.content_metadata or "{}")
+        content_stats = compute_content_stats(recording.content_body or [], content_metadata.get("idle_time_limit"))
+        recording.content_stats = content_stats
+        db.commit()
+    return {"recording_id": recording_id, **content_stats}
+
+
+@router.get("/list", response_class=FastJSONResponse)
+@limiter.limit(rate_limit("list_recordings", "5/minute"))
 @value_error_handler
 async def list_recordings(request: Request, db: Session = Depends(get_db)):
-    recordings = db.query(TerminalRecording).options(load_only(
-        TerminalRecording.id,
-        TerminalRecording.revision_number,
-        TerminalRecording.title,
-        TerminalRecording.description, 
-        TerminalRecording.creator_id,
-    )).all()
-    return [TerminalRecordingListRead.from_orm(recording) for recording in recordings]
+    # Select exactly the listed columns so no row attribute is lazy loaded during serialization
+    recordings = db.query(*(
+        getattr(TerminalRecording, field) for field in TerminalRecordingListRead.__fields__
+    )).filter(TerminalRecording.deleted_at.is_(None)).order_by(TerminalRecording.id).all()
+    body = dumps_json([serialize_orm(TerminalRecordingListRead, recording) for recording in recordings])
+
+    # The list has no cheaper version to compare, so its ETag only saves clients the download
+    etag = make_body_etag(body)
+    if etag_matches(request, etag):
+        return not_modified_response(etag, RECORDING_CACHE_CONTROL)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": RECORDING_CACHE_CONTROL})
 
 
 @router.post("/update")
-@limiter.limit("5/minute")
+@limiter.limit(rate_limit("update_recording", "5/minute"))
 @value_error_handler
 async def update_recording(
     payload: TerminalRecordingUpdate,
@@ -111,8 +252,9 @@ async def update_recording(
         content_metadata = json.loads(payload.content_metadata)
         annotations = extract_annotations(content_metadata)
 
-    # Retrieve the current recording
-    recording = db.query(TerminalRecording).filter_by(id=payload.recording_id).first()
+    # Retrieve and lock the current recording. A concurrent delete holds the same lock, so the update
+    # either runs first or finds the recording deleted, and concurrent updates number their revisions in turn.
+    recording = db.query(TerminalRecording).filter_by(id=payload.recording_id, deleted_at=None).with_for_update().first()
     if recording is None:
         raise HTTPException(status_code=404, detail=f"Recording with ID {payload.recording_id} not found")
     
@@ -122,6 +264,7 @@ async def update_recording(
     recording.revision_number += 1
     recording.annotations_count = len(annotations)
     recording.content_metadata = payload.content_metadata
+    recording.search_vector = recording_search_vector(payload.title, payload.description, (annotation["text"] for annotation in annotations))
 
     # Create annotations linked to the new revision number
     try:
@@ -132,4 +275,32 @@ async def update_recording(
         raise HTTPException(status_code=400, detail=str(e))
 
     db.commit()
+
+    # Every cached revision read embeds the recording's title, description and current revision
+    invalidate_recording(recording.id, range(1, recording.revision_number + 1))
     return {"message": "Recording updated"}
+
+
+@router.delete("/delete/{recording_id}")
+@limiter.limit(rate_limit("delete_recording", "5/minute"))
+@value_error_handler
+async def delete_recording(
+    request: Request,
+    recording_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # Lock the recording, as updates do, so a concurrent update cannot add a revision to a deleted recording
+    recording = db.query(TerminalRecording).filter_by(id=recording_id, deleted_at=None).with_for_update().first()
+    if recording is None:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    if recording.creator_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the creator of a recording can delete it")
+
+    # Soft delete; the rows and their annotations and reviews are removed later by scripts/purge_deleted.py
+    recording.deleted_at = datetime.now(timezone.utc)
+    revision_number = recording.revision_number
+    db.commit()
+
+    invalidate_recording(recording_id, range(1, revision_number + 1))
+    return {"message": "Recording deleted"}
@@ -3,6 +3,7 @@ from slowapi import Limiter
 from sqlalchemy.orm import Session
 from models.users import User, UserRead
 from utils.database import get_db
+from utils.env import rate_limit
 from utils.auth import limiter
 from utils.exception_handlers import value_error_handler
 
@@ -12,7 +13,7 @@ limiter = limiter
 
 
 @router.get("/{user_id}", response_model=UserRead)
-@limiter.limit("20/minute")
+@limiter.limit(rate_limit("read_user", "20/minute"))
 @value_error_handler
 def read_user(request: Request, user_id: int, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == user_id).first()
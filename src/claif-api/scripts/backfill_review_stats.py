@@ -0,0 +1,12 @@
+import argparse
+from models.utils.annotation_review_stats import backfill_review_stats
+from utils.database import run_with_db_session
+from utils.env import DB_BATCH_SIZE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the terminal annotation review stats from the reviews.")
+    parser.add_argument("--batch-size", type=int, default=DB_BATCH_SIZE, help="Stats rows read and written per round trip")
+    args = parser.parse_args()
+
+    run_with_db_session(backfill_review_stats, args.batch_size)
@@ -0,0 +1,26 @@
+import argparse
+from datetime import datetime, timedelta, timezone
+from models.utils.purge import purge_deleted_audio_files, purge_deleted_terminal_recordings
+from utils.database import run_with_db_session
+from utils.env import PURGE_BATCH_SIZE, PURGE_RETENTION_DAYS
+from utils.minio_utils import remove_files_from_minio
+from utils._logging import logging
+
+
+def purge_deleted(db, retention_days: float, batch_size: int):
+    # Only rows deleted for longer than the retention period are purged
+    deleted_before = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    logging.info(f"Purging recordings and audio files deleted before {deleted_before.isoformat()}.")
+
+    recordings_count = purge_deleted_terminal_recordings(db, deleted_before, batch_size)
+    audio_files_count = purge_deleted_audio_files(db, deleted_before, batch_size, remove_files_from_minio)
+    logging.info(f"Purged {recordings_count} terminal recordings and {audio_files_count} audio files.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Permanently remove soft-deleted recordings and audio files.")
+    parser.add_argument("--retention-days", type=float, default=PURGE_RETENTION_DAYS, help="Only purge rows deleted longer ago than this")
+    parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE, help="Rows purged per transaction")
+    args = parser.parse_args()
+
+    run_with_db_session(purge_deleted, args.retention_days, args.batch_size)
@@ -0,0 +1,33 @@
+import argparse
+import os
+from models.utils.synthetic_data import seed_synthetic_data
+from utils.database import run_with_db_session
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load synthetic users, terminal recordings, annotations and reviews for performance testing.")
+    parser.add_argument("--users", type=int, default=100, help="Users to create; recordings and reviews are spread among them")
+    parser.add_argument("--recordings", type=int, default=1000, help="Terminal recordings to create")
+    parser.add_argument("--revisions", type=int, default=3, help="Maximum revisions per recording, all annotated but the first")
+    parser.add_argument("--commands", type=int, default=20, help="Mean commands per recording, each annotated")
+    parser.add_argument("--reviews-per-annotation", type=float, default=0.5, help="Mean reviews per annotation")
+    parser.add_argument("--batch-size", type=int, default=200, help="Recordings generated and loaded per transaction")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Batches generated and loaded in parallel")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed generates the same data")
+    parser.add_argument("--username-prefix", default="synthetic_user", help="Prefix of the created usernames")
+    parser.add_argument("--skip-stats", action="store_true", help="Do not rebuild the review stats afterwards")
+    args = parser.parse_args()
+
+    run_with_db_session(
+        seed_synthetic_data,
+        users_count=args.users,
+        recordings_count=args.recordings,
+        revisions_count=args.revisions,
+        commands_count=args.commands,
+        reviews_per_annotation=args.reviews_per_annotation,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        seed=args.seed,
+        username_prefix=args.username_prefix,
+        update_stats=not args.skip_stats,
+    )
@@ -3,6 +3,12 @@ import json
 import logging
 import requests
 import pytest
+from tests.utils.hermetic import hermetic_enabled, stack as hermetic_stack
+
+# Must precede the imports of utils.env, which reads the settings the harness overrides
+if hermetic_enabled():
+    hermetic_stack.configure_environment()
+
 from utils.env import (TEST_USER_USERNAME, TEST_USER_PASSWORD)
 from tests.utils.config import get_base_url
 
@@ -14,6 +20,16 @@ logging.basicConfig(
 logger = logging.getLogger("pytest")
 
 
+def pytest_sessionstart(session):
+    if hermetic_enabled():
+        hermetic_stack.start()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if hermetic_enabled():
+        hermetic_stack.stop()
+
+
 @pytest.fixture(scope="session")
 def base_url():
     """Fixture for base URL used in all tests."""
@@ -39,6 +55,15 @@ def access_token(base_url):
     return token
 
 
+@pytest.fixture(scope="session")
+def asgi_client():
+    """Client calling the in-process app over ASGI, without a socket; only available with the hermetic harness."""
+    if not hermetic_enabled():
+        pytest.skip("The API only runs in-process with the hermetic harness (CLAIF_HERMETIC=true)")
+    from starlette.testclient import TestClient
+    return TestClient(hermetic_stack.app, base_url="http://testserver/v1")
+
+
 def pytest_terminal_summary(terminalreporter, exitstatus, config):
     """Hook to print the JSON report to stdout at the end of the test session."""
     results = []
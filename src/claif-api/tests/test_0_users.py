@@ -1,8 +1,11 @@
 import pytest
+import requests
 from sqlalchemy.orm.session import Session
 from models.users import User
 from utils.auth import extract_keycloak_id_from_token
 from utils.database import get_db
+from utils.env import TEST_USER_PASSWORD, TEST_USER_USERNAME
+from utils.config import get_auth_headers
 
 @pytest.mark.order(1)
 def test_set_user_keycloak_id(access_token):
@@ -14,3 +17,29 @@ def test_set_user_keycloak_id(access_token):
     db.commit()
     db.refresh(user)
     assert len(user.keycloak_id) == 36, "Invalid Keycloak ID length"
+
+
+@pytest.mark.order(2)
+def test_refresh_access_token(base_url):
+    """Test exchanging a refresh token for a new access token, and rejecting bad credentials."""
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    response = requests.post(f"{base_url}/auth/token", headers=headers, data={
+        "username": TEST_USER_USERNAME,
+        "password": TEST_USER_PASSWORD,
+    })
+    assert response.status_code == 200
+    refresh_token = response.json()["refresh_token"]
+
+    response = requests.post(f"{base_url}/auth/refresh", headers=headers, data={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    access_token = response.json()["access_token"]
+    response = requests.get(f"{base_url}/search", headers=get_auth_headers(access_token), params={"q": "refresh"})
+    assert response.status_code == 200
+
+    response = requests.post(f"{base_url}/auth/refresh", headers=headers, data={"refresh_token": "not-a-refresh-token"})
+    assert response.status_code == 401
+    response = requests.post(f"{base_url}/auth/token", headers=headers, data={
+        "username": TEST_USER_USERNAME,
+        "password": "wrong-password",
+    })
+    assert response.status_code == 401
@@ -0,0 +1,99 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+from limits import RateLimitItemPerMinute, RateLimitItemPerSecond
+from limits.strategies import FixedWindowRateLimiter, MovingWindowRateLimiter
+from utils.auth import TokenClaimsCache
+from utils.config import get_auth_headers
+from utils.database import DATABASE_URL
+from utils.env import rate_limit
+from utils.rate_limit_storage import PostgresStorage
+
+
+@pytest.fixture
+def worker_storages():
+    """Two storages on the same database, standing in for two API workers."""
+    storages = [PostgresStorage(DATABASE_URL), PostgresStorage(DATABASE_URL)]
+    storages[0].reset()
+    yield storages
+    storages[0].reset()
+    for storage in storages:
+        storage.engine.dispose()
+
+
+@pytest.mark.order(1000)
+def test_postgres_moving_window_shared_between_workers(worker_storages):
+    """Test that moving-window limits are enforced across workers and slide with time."""
+    limiters = [MovingWindowRateLimiter(storage) for storage in worker_storages]
+    limit = RateLimitItemPerMinute(3)
+    assert [limiters[index % 2].hit(limit, "user-a") for index in range(4)] == [True, True, True, False]
+    assert limiters[1].hit(limit, "user-b")
+    window_start, remaining = limiters[0].get_window_stats(limit, "user-a")
+    assert remaining == 0
+    assert window_start > time.time()
+
+    limit = RateLimitItemPerSecond(2)
+    assert limiters[0].hit(limit, "user-c") and limiters[1].hit(limit, "user-c")
+    assert not limiters[0].hit(limit, "user-c")
+    time.sleep(1.1)
+    assert limiters[1].hit(limit, "user-c")
+
+
+@pytest.mark.order(1001)
+def test_postgres_moving_window_is_atomic(worker_storages):
+    """Test that concurrent hits on one key never acquire more entries than the limit."""
+    limiters = [MovingWindowRateLimiter(storage) for storage in worker_storages]
+    limit = RateLimitItemPerMinute(5)
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(lambda index: limiters[index % 2].hit(limit, "user-concurrent"), range(40)))
+    assert results.count(True) == 5
+
+
+@pytest.mark.order(1002)
+def test_postgres_fixed_window_shared_between_workers(worker_storages):
+    """Test that fixed-window counters are shared across workers and reset after expiry."""
+    limiters = [FixedWindowRateLimiter(storage) for storage in worker_storages]
+    limit = RateLimitItemPerSecond(2)
+    assert [limiters[index % 2].hit(limit, "user-fixed") for index in range(3)] == [True, True, False]
+    # Fixed windows count rejected hits too
+    assert worker_storages[1].get(limit.key_for("user-fixed")) == 3
+    time.sleep(1.1)
+    assert limiters[0].hit(limit, "user-fixed")
+    assert worker_storages[1].get(limit.key_for("user-fixed")) == 1
+
+
+@pytest.mark.order(1003)
+def test_token_claims_cache():
+    """Test that cached claims are evicted by size and never outlive the token's expiry."""
+    cache = TokenClaimsCache(max_size=2, ttl_seconds=60)
+    now = time.time()
+    cache.set("token-a", {"sub": "a", "exp": now + 300})
+    cache.set("token-expired", {"sub": "expired", "exp": now - 1})
+    assert cache.get("token-a") == {"sub": "a", "exp": now + 300}
+    assert cache.get("token-expired") is None
+
+    cache.set("token-b", {"sub": "b", "exp": now + 300})
+    cache.set("token-c", {"sub": "c", "exp": now + 300})
+    assert cache.get("token-a") is None
+    assert cache.get("token-c")["sub"] == "c"
+
+
+@pytest.mark.order(1004)
+def test_rate_limit_env_override(monkeypatch):
+    """Test that a route's limit can be overridden from the environment."""
+    assert rate_limit("read_recording", "20/minute") == "20/minute"
+    monkeypatch.setenv("RATE_LIMIT_READ_RECORDING", "100/minute")
+    assert rate_limit("read_recording", "20/minute") == "100/minute"
+
+
+@pytest.mark.order(1005)
+def test_rate_limited_response_has_retry_after(base_url, access_token):
+    """Test that rate-limited requests are told how long to wait before retrying."""
+    headers = get_auth_headers(access_token)
+    for _ in range(25):
+        response = requests.get(f"{base_url}/search", headers=headers, params={"q": "retry"})
+        if response.status_code == 429:
+            break
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
@@ -0,0 +1,197 @@
+import gzip
+import json
+import time
+import pytest
+import requests
+from sqlalchemy import func, select
+from sqlalchemy.orm.session import Session
+from models.annotation_reviews import TerminalAnnotationReview
+from models.annotations import TerminalRecordingAnnotation
+from models.annotation_review_stats import TerminalRecordingReviewStats
+from models.exports import EXPORT_COMPLETED, DatasetExport
+from models.recordings import TerminalRecording
+from models.users import User
+from models.utils.annotation_review_stats import update_review_stats
+from models.utils.exports import run_dataset_export
+from utils.config import get_auth_headers
+from utils.database import get_db
+
+
+def run_export(db: Session, parameters: dict, since=None):
+    """Runs an export for user1 into memory, returning the job and its records by shard."""
+    user = db.query(User).filter_by(username="user1").first()
+    export = DatasetExport(creator_id=user.id, parameters=parameters, since=since, bucket_name="exports", object_prefix="export_test")
+    db.add(export)
+    db.commit()
+
+    shards = {}
+
+    def write_shard(data, object_name):
+        shards[object_name] = [json.loads(line) for line in gzip.decompress(data).splitlines()]
+
+    run_dataset_export(db, export.id, write_shard, batch_size=2)
+    db.refresh(export)
+    return export, shards
+
+
+def review_current_annotation(db: Session, username: str, score: int) -> TerminalRecording:
+    """Reviews an annotation of the first live recording annotated at its current revision, returning the recording."""
+    recording, annotation = db.query(TerminalRecording, TerminalRecordingAnnotation).join(
+        TerminalRecordingAnnotation,
+        (TerminalRecordingAnnotation.recording_id == TerminalRecording.id) & (TerminalRecordingAnnotation.revision_number == TerminalRecording.revision_number),
+    ).filter(TerminalRecording.deleted_at.is_(None)).order_by(TerminalRecording.id, TerminalRecordingAnnotation.id).first()
+    user = db.query(User).filter_by(username=username).first()
+    review = TerminalAnnotationReview(
+        annotation_id=annotation.id,
+        recording_id=recording.id,
+        revision_number=recording.revision_number,
+        creator_id=user.id,
+        creator_username=user.username,
+        q_does_anno_match_content=True,
+        q_can_anno_be_halved=False,
+        q_how_well_anno_matches_content=score,
+        q_can_you_improve_anno=False,
+        q_can_you_provide_markdown=False,
+    )
+    db.add(review)
+    update_review_stats(db, added_reviews=[review])
+    db.commit()
+    return recording
+
+
+@pytest.mark.order(1100)
+def test_export_shards():
+    """Test that an export writes every live recording with its annotations and reviews in gzipped JSON Lines shards."""
+    db: Session = next(get_db())
+    live_ids = [row.id for row in db.query(TerminalRecording.id).filter(TerminalRecording.deleted_at.is_(None)).order_by(TerminalRecording.id)]
+    assert len(live_ids) > 2
+    review_current_annotation(db, "user2", 8)
+
+    export, shards = run_export(db, {"records_per_shard": 2})
+    assert export.status == EXPORT_COMPLETED
+    assert export.records_count == len(live_ids)
+    assert export.watermark is not None
+    assert [shard["object_name"] for shard in export.shards] == sorted(shards)
+    assert [shard["records_count"] for shard in export.shards] == [len(records) for records in shards.values()]
+    assert all(len(records) <= 2 for records in shards.values())
+
+    records = [record for object_name in sorted(shards) for record in shards[object_name]]
+    assert [record["recording_id"] for record in records] == live_ids
+
+    # Each record holds the current revision's annotations, each with its aggregated reviews
+    reviewed_record = next(record for record in records if record["review_stats"]["reviews_count"] > 0)
+    recording = db.query(TerminalRecording).filter_by(id=reviewed_record["recording_id"]).first()
+    assert reviewed_record["revision_number"] == recording.revision_number
+    assert reviewed_record["events"] == recording.content_body
+    assert reviewed_record["annotations"]
+    assert all(annotation["revision_number"] == recording.revision_number for annotation in reviewed_record["annotations"])
+    assert sum(annotation["review_stats"]["reviews_count"] for annotation in reviewed_record["annotations"]) == reviewed_record["review_stats"]["reviews_count"]
+
+    # Leaving out the content drops the events from every record
+    _, shards = run_export(db, {"include_content": False})
+    assert all("events" not in record for records in shards.values() for record in records)
+    db.close()
+
+
+@pytest.mark.order(1101)
+def test_export_review_filters():
+    """Test that exports can be limited to recordings with enough reviews and a high enough mean score."""
+    db: Session = next(get_db())
+    stats_rows = db.query(TerminalRecordingReviewStats).join(
+        TerminalRecording,
+        (TerminalRecording.id == TerminalRecordingReviewStats.recording_id) & (TerminalRecording.revision_number == TerminalRecordingReviewStats.revision_number),
+    ).filter(TerminalRecording.deleted_at.is_(None), TerminalRecordingReviewStats.reviews_count > 0).all()
+    assert stats_rows
+
+    export, shards = run_export(db, {"min_reviews_count": 1})
+    assert {record["recording_id"] for records in shards.values() for record in records} == {stats.recording_id for stats in stats_rows}
+
+    min_mean_score = max(stats.score_sum / stats.reviews_count for stats in stats_rows)
+    export, shards = run_export(db, {"min_mean_score": min_mean_score})
+    expected_ids = {stats.recording_id for stats in stats_rows if stats.score_sum / stats.reviews_count >= min_mean_score}
+    assert {record["recording_id"] for records in shards.values() for record in records} == expected_ids
+    db.close()
+
+
+@pytest.mark.order(1102)
+def test_incremental_export():
+    """Test that incremental exports contain only the recordings updated, reviewed or deleted since the given time."""
+    db: Session = next(get_db())
+    since = db.scalar(select(func.now()))
+    db.commit()
+    export, shards = run_export(db, {}, since=since)
+    assert export.records_count == 0
+    assert shards == {}
+
+    # Review one recording and update another
+    reviewed_recording = review_current_annotation(db, "admin", 6)
+    updated_recording = db.query(TerminalRecording).filter(
+        TerminalRecording.deleted_at.is_(None),
+        TerminalRecording.id != reviewed_recording.id,
+    ).order_by(TerminalRecording.id).first()
+    updated_recording.description = f"{updated_recording.description} (edited)"
+    db.commit()
+
+    export, shards = run_export(db, {}, since=since)
+    exported_ids = [record["recording_id"] for records in shards.values() for record in records]
+    assert exported_ids == sorted([updated_recording.id, reviewed_recording.id])
+
+    # Deleting a recording adds its tombstone after the live records, and a full export leaves it out
+    deleted_recording = db.query(TerminalRecording).filter(
+        TerminalRecording.deleted_at.is_(None),
+        TerminalRecording.id.notin_([updated_recording.id, reviewed_recording.id]),
+    ).order_by(TerminalRecording.id).first()
+    deleted_id = deleted_recording.id
+    deleted_recording.deleted_at = func.now()
+    db.commit()
+
+    export, shards = run_export(db, {}, since=since)
+    records = [record for object_name in sorted(shards) for record in shards[object_name]]
+    assert [record["recording_id"] for record in records] == exported_ids + [deleted_id]
+    assert records[-1]["deleted"] is True
+    assert records[-1]["deleted_at"]
+    assert all("deleted" not in record for record in records[:-1])
+
+    _, shards = run_export(db, {})
+    assert deleted_id not in {record["recording_id"] for records in shards.values() for record in records}
+
+    db.query(TerminalRecording).filter_by(id=deleted_id).update({"deleted_at": None})
+    db.commit()
+    db.close()
+
+
+@pytest.mark.order(1103)
+def test_export_endpoints(base_url, access_token):
+    """Test starting an export through the API, following it to completion and listing it."""
+    headers = get_auth_headers(access_token)
+    response = requests.post(f"{base_url}/exports", headers=headers, json={"min_reviews_count": 1000000})
+    assert response.status_code == 200
+    export = response.json()
+    assert export["parameters"] == {"min_reviews_count": 1000000, "include_content": True}
+    assert export["object_prefix"] == f"export_{export['id']}"
+
+    # Nothing matches, so the export completes without writing a shard
+    for _ in range(20):
+        export = requests.get(f"{base_url}/exports/{export['id']}", headers=headers).json()
+        if export["status"] == EXPORT_COMPLETED:
+            break
+        time.sleep(0.25)
+    assert export["status"] == EXPORT_COMPLETED
+    assert export["records_count"] == 0
+    assert export["shards"] == []
+
+    response = requests.get(f"{base_url}/exports", headers=headers)
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == export["id"]
+
+    # Other users' exports are not visible
+    db: Session = next(get_db())
+    admin = db.query(User).filter_by(username="admin").first()
+    other_export = DatasetExport(creator_id=admin.id, parameters={}, bucket_name="exports")
+    db.add(other_export)
+    db.commit()
+    assert requests.get(f"{base_url}/exports/{other_export.id}", headers=headers).status_code == 404
+    db.close()
+
+    response = requests.post(f"{base_url}/exports", headers=headers, json={"min_mean_score": 11})
+    assert response.status_code == 422
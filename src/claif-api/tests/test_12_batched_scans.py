@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy.orm.session import Session
+from models.annotation_reviews import TerminalAnnotationReview
+from models.annotation_review_stats import TerminalAnnotationReviewStats, TerminalRecordingReviewStats
+from models.annotations import TerminalRecordingAnnotation
+from models.utils.annotation_review_stats import STATS_COLUMNS, accumulate_deltas, backfill_review_stats, review_stats_deltas
+from utils.database import get_db, stream_batches, stream_rows, write_in_batches
+
+
+@pytest.mark.order(1200)
+def test_stream_batches():
+    """Test that streamed queries yield every row, in order, in batches of at most the batch size."""
+    db: Session = next(get_db())
+    query = db.query(TerminalAnnotationReview.id).order_by(TerminalAnnotationReview.id)
+    expected_ids = [row.id for row in query.all()]
+    assert len(expected_ids) > 7
+
+    batches = list(stream_batches(query, batch_size=7))
+    assert all(0 < len(batch) <= 7 for batch in batches)
+    assert [row.id for batch in batches for row in batch] == expected_ids
+    assert [row.id for row in stream_rows(query, batch_size=7)] == expected_ids
+
+    # Writes between batches run on the same transaction while the cursor stays open
+    written = []
+    rows_count = write_in_batches(db, stream_rows(query, batch_size=3), lambda db, batch: written.append([row.id for row in batch]), batch_size=5)
+    assert rows_count == len(expected_ids)
+    assert all(len(batch) <= 5 for batch in written)
+    assert [review_id for batch in written for review_id in batch] == expected_ids
+    db.close()
+
+
+@pytest.mark.order(1201)
+def test_backfill_review_stats():
+    """Test that the backfill rebuilds drifted stats and review counts from the reviews."""
+    db: Session = next(get_db())
+    annotation_stats = db.query(TerminalAnnotationReviewStats).order_by(TerminalAnnotationReviewStats.annotation_id).first()
+    recording_stats = db.query(TerminalRecordingReviewStats).first()
+    annotation = db.query(TerminalRecordingAnnotation).filter_by(id=annotation_stats.annotation_id).first()
+    unreviewed_annotation = db.query(TerminalRecordingAnnotation).filter(
+        ~TerminalRecordingAnnotation.id.in_(db.query(TerminalAnnotationReview.annotation_id)),
+    ).first()
+
+    # Let the stats drift from the reviews
+    annotation_stats.score_sum += 100
+    recording_stats.reviews_count = 0
+    annotation.reviews_count = 1000
+    db.add(TerminalAnnotationReviewStats(
+        annotation_id=unreviewed_annotation.id,
+        recording_id=unreviewed_annotation.recording_id,
+        revision_number=unreviewed_annotation.revision_number,
+        reviews_count=1,
+    ))
+    db.commit()
+
+    backfill_review_stats(db, batch_size=2)
+
+    expected_annotation_rows = {}
+    expected_recording_rows = {}
+    for review in db.query(TerminalAnnotationReview):
+        deltas = review_stats_deltas(review)
+        accumulate_deltas(expected_annotation_rows, review.annotation_id, {}, deltas)
+        accumulate_deltas(expected_recording_rows, (review.recording_id, review.revision_number), {}, deltas)
+
+    def stats_columns(stats):
+        return {column: getattr(stats, column) for column in STATS_COLUMNS}
+
+    assert {
+        stats.annotation_id: stats_columns(stats) for stats in db.query(TerminalAnnotationReviewStats)
+    } == expected_annotation_rows
+    assert {
+        (stats.recording_id, stats.revision_number): stats_columns(stats) for stats in db.query(TerminalRecordingReviewStats)
+    } == expected_recording_rows
+
+    db.refresh(annotation)
+    db.refresh(unreviewed_annotation)
+    assert annotation.reviews_count == expected_annotation_rows[annotation.id]["reviews_count"]
+    assert unreviewed_annotation.reviews_count == 0
+    db.close()
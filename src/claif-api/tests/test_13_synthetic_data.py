@@ -0,0 +1,108 @@
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy.orm.session import Session
+from models.annotation_reviews import TerminalAnnotationReview
+from models.annotation_review_stats import TerminalRecordingReviewStats
+from models.annotations import TerminalRecordingAnnotation
+from models.recordings import TerminalRecording
+from models.users import User
+from models.utils.synthetic_data import generate_recording, seed_synthetic_data
+from models.utils.terminal_recordings import extract_annotations
+from utils.database import SessionLocal, get_db, reserve_ids
+
+
+@pytest.mark.order(1300)
+def test_seed_synthetic_data():
+    """Test that seeded recordings look like ones created and updated through the API, with consistent annotations and stats."""
+    db: Session = next(get_db())
+    totals = seed_synthetic_data(
+        db,
+        users_count=3,
+        recordings_count=5,
+        revisions_count=3,
+        commands_count=4,
+        reviews_per_annotation=1,
+        batch_size=2,
+        username_prefix="synthetic_test",
+    )
+    assert totals["users"] == 3
+    assert totals["recordings"] == 5
+
+    user_ids = [user.id for user in db.query(User).filter(User.username.like("synthetic_test_%"))]
+    recordings = db.query(TerminalRecording).filter(TerminalRecording.creator_id.in_(user_ids)).all()
+    assert len(recordings) == 5
+    recording_ids = [recording.id for recording in recordings]
+    assert db.query(TerminalRecordingAnnotation).filter(TerminalRecordingAnnotation.recording_id.in_(recording_ids)).count() == totals["annotations"]
+    assert db.query(TerminalAnnotationReview).filter(TerminalAnnotationReview.recording_id.in_(recording_ids)).count() == totals["reviews"]
+
+    for recording in recordings:
+        times = [event[0] for event in recording.content_body]
+        assert times == sorted(times)
+        assert recording.duration_milliseconds == times[-1] * 1000
+        assert recording.search_vector is not None and recording.content_search_vector is not None
+
+        # The header holds the current revision's annotation layers; the first revision has none
+        annotations = recording.annotations.filter_by(revision_number=recording.revision_number).order_by(TerminalRecordingAnnotation.id).all()
+        header_annotations = extract_annotations(json.loads(recording.content_metadata))
+        assert [(annotation.annotation_text, annotation.level) for annotation in annotations] == [
+            (annotation["text"], annotation["layer_level"]) for annotation in header_annotations
+        ]
+        assert recording.annotations_count == len(annotations)
+        assert recording.annotations.filter_by(revision_number=1).count() == 0
+
+        # Reviews are never by the recording's creator, and the stats agree with them
+        reviews = recording.annotation_reviews.filter_by(revision_number=recording.revision_number)
+        assert all(review.creator_id != recording.creator_id for review in reviews)
+        stats = db.query(TerminalRecordingReviewStats).filter_by(recording_id=recording.id, revision_number=recording.revision_number).first()
+        assert (stats.reviews_count if stats else 0) == reviews.count()
+        assert sum(annotation.reviews_count for annotation in annotations) == reviews.count()
+
+    # The same seed generates the same recording
+    users = [(1, "a"), (2, "b")]
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert generate_recording(random.Random(7), users[0], users, 3, 5, 1, now) == generate_recording(random.Random(7), users[0], users, 3, 5, 1, now)
+    db.close()
+
+
+@pytest.mark.order(1301)
+def test_reserve_ids_concurrently():
+    """Test that ids reserved by concurrent sessions never overlap."""
+
+    def reserve(index):
+        db = SessionLocal()
+        try:
+            return [user_id for _ in range(200) for user_id in reserve_ids(db, User, 5)]
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        reserved_ids = [user_id for user_ids in executor.map(reserve, range(16)) for user_id in user_ids]
+    assert len(reserved_ids) == 16 * 200 * 5
+    assert len(set(reserved_ids)) == len(reserved_ids)
+
+
+@pytest.mark.order(1302)
+def test_seed_synthetic_data_in_parallel():
+    """Test that batches loaded by several worker processes at once get distinct ids."""
+    db: Session = next(get_db())
+    totals = seed_synthetic_data(
+        db,
+        users_count=4,
+        recordings_count=12,
+        revisions_count=2,
+        commands_count=3,
+        reviews_per_annotation=1,
+        batch_size=2,
+        workers=4,
+        username_prefix="synthetic_parallel_test",
+    )
+    user_ids = [user.id for user in db.query(User).filter(User.username.like("synthetic_parallel_test_%"))]
+    assert len(user_ids) == 4
+    recording_ids = [recording.id for recording in db.query(TerminalRecording.id).filter(TerminalRecording.creator_id.in_(user_ids))]
+    assert len(recording_ids) == totals["recordings"] == 12
+    assert db.query(TerminalRecordingAnnotation).filter(TerminalRecordingAnnotation.recording_id.in_(recording_ids)).count() == totals["annotations"]
+    assert db.query(TerminalAnnotationReview).filter(TerminalAnnotationReview.recording_id.in_(recording_ids)).count() == totals["reviews"]
+    db.close()
@@ -0,0 +1,30 @@
+import gzip
+import json
+import os
+from pathlib import Path
+import pytest
+from models.exports import EXPORT_COMPLETED
+from utils.config import get_auth_headers
+from utils.env import MINIO_EXPORT_BUCKET
+
+
+@pytest.mark.order(1400)
+def test_export_over_asgi(asgi_client, access_token):
+    """Test exporting through the in-process app, with the shards written to the filesystem object store."""
+    headers = get_auth_headers(access_token)
+    response = asgi_client.post("/exports", headers=headers, json={"records_per_shard": 2, "include_content": False})
+    assert response.status_code == 200
+
+    # The test client runs background tasks before returning, so the export has completed
+    export = asgi_client.get(f"/exports/{response.json()['id']}", headers=headers).json()
+    assert export["status"] == EXPORT_COMPLETED
+    assert export["records_count"] > 0
+
+    bucket_path = Path(os.environ["MINIO_FILESYSTEM_ROOT"]) / MINIO_EXPORT_BUCKET
+    records = [
+        json.loads(line)
+        for shard in export["shards"]
+        for line in gzip.decompress((bucket_path / shard["object_name"]).read_bytes()).splitlines()
+    ]
+    assert len(records) == export["records_count"]
+    assert all("events" not in record for record in records)
@@ -2,10 +2,15 @@ import pytest
 import requests
 from sqlalchemy.orm.session import Session
 from models.recordings import TerminalRecording
+from models.annotations import TerminalRecordingAnnotation
 from utils.config import get_auth_headers
 from utils.database import get_db
 from utils.files import read_file, read_first_line_of_file
 from models.utils.schema import get_model_schema_string
+from models.utils.terminal_recordings import extract_annotations, parse_header_json
+from models.utils.annotation_diffs import diff_annotations
+from models.utils import content_stats
+from models.utils.content_stats import compute_content_stats
 
 @pytest.mark.order(100)
 def test_get_schema_string():
@@ -56,7 +61,8 @@ def test_get_created_terminal_recording(base_url, access_token):
     assert response_data["annotations"] == []
     assert response_data["annotation_reviews"] == []
     assert response_recording["id"] == recording.id
-    assert response_recording["content_body"].startswith("[[")
+    assert isinstance(response_recording["content_body"], list) and len(response_recording["content_body"]) > 0
+    assert all(len(event) == 3 for event in response_recording["content_body"])
     assert response_recording["content_metadata"].startswith("{")
     assert response_recording["duration_milliseconds"] > 0
     assert response_recording["annotations_count"] == 0
@@ -111,7 +117,8 @@ def test_get_updated_terminal_recording(base_url, access_token):
     assert len(response_data["annotations"]) == 9
     assert response_data["annotation_reviews"] == []
     assert recording_response["id"] == recording.id
-    assert recording_response["content_body"].startswith("[[")
+    assert isinstance(recording_response["content_body"], list) and len(recording_response["content_body"]) > 0
+    assert all(len(event) == 3 for event in recording_response["content_body"])
     assert recording_response["content_metadata"].startswith("{")
     assert recording_response["duration_milliseconds"] > 0
     assert recording_response["annotations_count"] == 9
@@ -135,3 +142,112 @@ def test_list_recordings(base_url, access_token):
         assert len(recording["description"]) > 0
         assert recording["revision_number"] > 0
         assert recording["creator_id"] > 0
+
+
+@pytest.mark.order(106)
+def test_diff_terminal_recording_revisions(base_url, access_token):
+    """Test diffing the annotations of two revisions of a TerminalRecording."""
+    headers = get_auth_headers(access_token)
+
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(revision_number=2).order_by(TerminalRecording.id.desc()).first()
+    assert recording is not None, "No recording found"
+
+    url = f"{base_url}/recordings/terminal/{recording.id}/diff"
+    response = requests.get(url, headers=headers, params={"from": 1, "to": 2})
+    assert response.status_code == 200
+    response_data = response.json()
+
+    assert response_data["recording_id"] == recording.id
+    assert response_data["from_revision_number"] == 1
+    assert response_data["to_revision_number"] == 2
+    assert response_data["unchanged_count"] == 0
+    assert len(response_data["changes"]) == 9
+    for change in response_data["changes"]:
+        assert change["change"] == "added"
+        assert change["from_annotation"] is None
+        assert change["to_annotation"]["revision_number"] == 2
+
+    response = requests.get(url, headers=headers, params={"from": 1, "to": 3})
+    assert response.status_code == 400
+
+
+@pytest.mark.order(107)
+def test_diff_annotations():
+    """Test matching annotations of two revisions by level, time range and text similarity."""
+    revisions = []
+    for revision_number in (2, 3):
+        file_path = f"asciinema_recording_samples/recording_1_revision_{revision_number}.txt"
+        content_metadata = parse_header_json(read_first_line_of_file(file_path))
+        revisions.append([
+            TerminalRecordingAnnotation(
+                revision_number=revision_number,
+                annotation_text=annotation["text"],
+                start_time_milliseconds=annotation["beginning"],
+                end_time_milliseconds=annotation["end"],
+                level=annotation["layer_level"],
+            )
+            for annotation in extract_annotations(content_metadata)
+        ])
+
+    unchanged_count, changes = diff_annotations(*revisions)
+    assert unchanged_count == 7
+    assert len(changes) == 2
+    for change in changes:
+        assert change["change"] == "modified"
+        assert change["from_annotation"].annotation_text == "bash prompt"
+        assert change["to_annotation"].annotation_text == "bash prompt visible"
+        assert change["from_annotation"].start_time_milliseconds == change["to_annotation"].start_time_milliseconds
+
+
+@pytest.mark.order(108)
+def test_compute_content_stats(monkeypatch):
+    """Test the derived event statistics and that the NumPy and pure-Python paths agree."""
+    events = [[0.5, "o", "ab"], [0.9, "i", "a"], [1.2, "o", "\u00e9"], [4.5, "o", "xyz"], [4.6, "i", "b"]]
+    stats = compute_content_stats(events, idle_time_limit=2.0)
+    assert stats["event_counts"] == {"o": 3, "i": 2}
+    assert stats["output_bytes_total"] == 7
+    assert stats["output_bytes_per_second"] == [2, 2, 0, 0, 3]
+    assert stats["idle_gaps"] == [{"start_seconds": 1.2, "end_seconds": 4.5, "duration_seconds": 4.5 - 1.2}]
+    assert [burst["start_seconds"] for burst in stats["peak_output_bursts"]] == [4, 0, 1]
+
+    # A long recording with one 30 second pause halfway through
+    long_events = [
+        [index * 0.37 + (30 if index >= 2500 else 0), "o" if index % 3 else "i", "x" * (index % 11)]
+        for index in range(5000)
+    ]
+    monkeypatch.setattr(content_stats, "NUMPY_MIN_EVENTS", 0)
+    vectorized = compute_content_stats(long_events, idle_time_limit=1.0)
+    monkeypatch.setattr(content_stats, "NUMPY_MIN_EVENTS", len(long_events) + 1)
+    assert compute_content_stats(long_events, idle_time_limit=1.0) == vectorized
+    assert len(vectorized["idle_gaps"]) == 1
+
+
+@pytest.mark.order(109)
+def test_read_terminal_recording_stats(base_url, access_token):
+    """Test reading the statistics stored for a TerminalRecording at ingest."""
+    headers = get_auth_headers(access_token)
+
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).order_by(TerminalRecording.id.desc()).first()
+    assert recording is not None, "No recording found"
+    assert recording.content_stats is not None
+
+    response = requests.get(f"{base_url}/recordings/terminal/{recording.id}/stats", headers=headers)
+    assert response.status_code == 200
+    response_data = response.json()
+    assert response_data["recording_id"] == recording.id
+    assert response_data["event_counts"]["o"] > 0
+    assert response_data["idle_time_limit_seconds"] == 2.0
+    assert sum(response_data["output_bytes_per_second"]) == response_data["output_bytes_total"]
+    assert len(response_data["peak_output_bursts"]) > 0
+
+    # Recordings without stored stats get them computed on first request
+    recording.content_stats = None
+    db.commit()
+    response = requests.get(f"{base_url}/recordings/terminal/{recording.id}/stats", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == response_data
+
+    response = requests.get(f"{base_url}/recordings/terminal/999999/stats", headers=headers)
+    assert response.status_code == 404
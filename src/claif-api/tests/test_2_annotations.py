@@ -1,10 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
 import pytest
 import requests
+from sqlalchemy import event
 from sqlalchemy.orm.session import Session
 from models.recordings import TerminalRecording
 from models.annotations import TerminalRecordingAnnotation
+from models.annotation_reviews import TerminalAnnotationReview
+from models.annotation_review_stats import TerminalAnnotationReviewStats
+from models.users import User
+from models.utils.annotation_review_stats import increment_annotation_reviews_count, update_review_stats
+from models.utils.terminal_recordings import read_recording_revision
+from utils.auth import extract_keycloak_id_from_token, limiter
 from utils.config import get_auth_headers
-from utils.database import get_db
+from utils.database import engine, get_db, SessionLocal
 
 @pytest.mark.order(200)
 def test_get_annotations():
@@ -78,3 +86,322 @@ def test_get_terminal_recording_with_reviews(base_url, access_token):
         assert review["q_how_well_anno_matches_content"] in [i for i in range(1, 11)]
         assert review["q_can_you_improve_anno"] in [True, False]
         assert review["q_can_you_provide_markdown"] in [True, False]
+
+
+@pytest.mark.order(203)
+def test_get_annotations_in_time_window(base_url, access_token):
+    """Test getting the annotations overlapping a playback position and window."""
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(revision_number=2).order_by(TerminalRecording.id.desc()).first()
+    assert recording is not None, "No recording found"
+
+    headers = get_auth_headers(access_token)
+    url = f"{base_url}/recordings/terminal/{recording.id}/annotations"
+
+    response = requests.get(url, headers=headers, params={"at_ms": 35000})
+    assert response.status_code == 200
+    response_data = response.json()
+    assert len(response_data) == 4
+    for annotation in response_data:
+        assert annotation["revision_number"] == 2
+        assert annotation["start_time_milliseconds"] <= 35000 <= annotation["end_time_milliseconds"]
+
+    response = requests.get(url, headers=headers, params={"from_ms": 0, "to_ms": 1100, "revision_number": 2})
+    assert response.status_code == 200
+    response_data = response.json()
+    assert [annotation["annotation_text"] for annotation in response_data] == ["blank terminal"]
+
+    response = requests.get(url, headers=headers, params={"from_ms": 2000, "to_ms": 1000})
+    assert response.status_code == 400
+
+
+@pytest.mark.order(204)
+def test_get_annotation_review_stats(base_url, access_token):
+    """Test reading the aggregated review answers of an annotation and a recording revision."""
+    db: Session = next(get_db())
+    review = db.query(TerminalAnnotationReview).order_by(TerminalAnnotationReview.id.desc()).first()
+    assert review is not None, "No annotation review found"
+
+    headers = get_auth_headers(access_token)
+    url = f"{base_url}/annotation_reviews/stats/annotation/{review.annotation_id}"
+    response = requests.get(url, headers=headers)
+    assert response.status_code == 200
+    response_data = response.json()
+    assert response_data["annotation_id"] == review.annotation_id
+    assert response_data["recording_id"] == review.recording_id
+    assert response_data["reviews_count"] == 1
+    assert response_data["q_how_well_anno_matches_content_mean"] == 5
+    assert response_data["q_how_well_anno_matches_content_histogram"]["5"] == 1
+    assert sum(response_data["q_how_well_anno_matches_content_histogram"].values()) == 1
+    assert response_data["q_does_anno_match_content_yes_ratio"] == 1
+    assert response_data["q_can_anno_be_halved_yes_ratio"] == 0
+    assert response_data["q_can_you_improve_anno_yes_ratio"] == 1
+    assert response_data["q_can_you_provide_markdown_yes_ratio"] == 0
+
+    url = f"{base_url}/annotation_reviews/stats/recording/{review.recording_id}"
+    response = requests.get(url, headers=headers, params={"revision_number": review.revision_number})
+    assert response.status_code == 200
+    response_data = response.json()
+    assert response_data["revision_number"] == review.revision_number
+    assert response_data["reviews_count"] == 1
+
+    response = requests.get(f"{base_url}/annotation_reviews/stats/recording/{review.recording_id}", headers=headers, params={"revision_number": 1})
+    assert response.status_code == 200
+    assert response.json()["reviews_count"] == 0
+    assert response.json()["q_how_well_anno_matches_content_mean"] is None
+
+    response = requests.get(f"{base_url}/annotation_reviews/stats/annotation/999999999", headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.order(205)
+def test_concurrent_annotation_reviews_count(asgi_client, access_token, monkeypatch):
+    """Test that concurrent reviews of one annotation through the create endpoint never lose a reviews_count increment."""
+    db: Session = next(get_db())
+    review = db.query(TerminalAnnotationReview).order_by(TerminalAnnotationReview.id.desc()).first()
+    assert review is not None, "No annotation review found"
+    annotation_id = review.annotation_id
+    annotation = db.query(TerminalRecordingAnnotation).filter_by(id=annotation_id).first()
+    stats = db.query(TerminalAnnotationReviewStats).filter_by(annotation_id=annotation_id).first()
+    reviews_count_before = annotation.reviews_count
+    stats_reviews_count_before = stats.reviews_count
+    db.close()
+
+    # The test client handles each request on its own event loop, so the requests run concurrently,
+    # and the rate limit would reject all but a few of them
+    monkeypatch.setattr(limiter, "enabled", False)
+    concurrent_reviews = 300
+    headers = get_auth_headers(access_token)
+    payload = {
+        "annotation_id": annotation_id,
+        "q_does_anno_match_content": True,
+        "q_can_anno_be_halved": False,
+        "q_how_well_anno_matches_content": 7,
+        "q_can_you_improve_anno": False,
+        "q_can_you_provide_markdown": False,
+    }
+
+    def create_review(_):
+        return asgi_client.post("/annotation_reviews/create", headers=headers, json=payload).status_code
+
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        status_codes = list(executor.map(create_review, range(concurrent_reviews)))
+    assert status_codes == [200] * concurrent_reviews
+
+    db: Session = next(get_db())
+    annotation = db.query(TerminalRecordingAnnotation).filter_by(id=annotation_id).first()
+    stats = db.query(TerminalAnnotationReviewStats).filter_by(annotation_id=annotation_id).first()
+    assert annotation.reviews_count == reviews_count_before + concurrent_reviews
+    assert stats.reviews_count == stats_reviews_count_before + concurrent_reviews
+    assert stats.score_7_count >= concurrent_reviews
+
+
+@pytest.mark.order(206)
+def test_create_terminal_annotation_reviews_batch(base_url, access_token):
+    """Test creating many annotation reviews in one request."""
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(revision_number=2).order_by(TerminalRecording.id.desc()).first()
+    assert recording is not None, "No recording found"
+    annotations = recording.annotations.filter_by(revision_number=2).order_by(TerminalRecordingAnnotation.id).limit(2).all()
+    reviews_counts_before = {annotation.id: annotation.reviews_count for annotation in annotations}
+    db.close()
+
+    review = {
+        "q_does_anno_match_content": True,
+        "q_can_anno_be_halved": False,
+        "q_how_well_anno_matches_content": 8,
+        "q_can_you_improve_anno": False,
+        "q_can_you_provide_markdown": True,
+    }
+    payload = {"reviews": [
+        {**review, "annotation_id": annotations[0].id},
+        {**review, "annotation_id": 999999999},
+        {**review, "annotation_id": annotations[1].id},
+        {**review, "annotation_id": annotations[1].id},
+    ]}
+
+    headers = get_auth_headers(access_token)
+    url = f"{base_url}/annotation_reviews/create_batch"
+    response = requests.post(url, json=payload, headers=headers)
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}"
+    response_data = response.json()
+    assert response_data["message"] == "Annotation reviews created"
+    assert response_data["created_count"] == 3
+    assert [result["index"] for result in response_data["results"]] == [0, 1, 2, 3]
+    assert response_data["results"][1]["error"] == "Annotation not found"
+    for result in response_data["results"][0:1] + response_data["results"][2:]:
+        assert result["annotation_review_id"] > 0
+
+    db: Session = next(get_db())
+    for annotation_id, reviews_count in reviews_counts_before.items():
+        annotation = db.query(TerminalRecordingAnnotation).filter_by(id=annotation_id).first()
+        expected_new_reviews = 1 if annotation_id == annotations[0].id else 2
+        assert annotation.reviews_count == reviews_count + expected_new_reviews
+
+
+@pytest.mark.order(207)
+def test_read_terminal_annotation_reviews(base_url, access_token):
+    """Test reading filtered pages of the annotation reviews of a recording."""
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(revision_number=2).order_by(TerminalRecording.id.desc()).first()
+    assert recording is not None, "No recording found"
+    # The reviews were created by the test user, whose Keycloak ID is in the access token
+    creator_id = db.query(User.id).filter_by(keycloak_id=extract_keycloak_id_from_token(access_token)).scalar()
+    assert creator_id is not None, "Test user not found"
+
+    headers = get_auth_headers(access_token)
+    url = f"{base_url}/annotation_reviews/{recording.id}"
+    params = {"revision_number": 2, "creator_id": creator_id, "min_score": 8, "max_score": 8, "limit": 2}
+    response = requests.get(url, headers=headers, params=params)
+    assert response.status_code == 200
+    first_page = response.json()
+    assert len(first_page) == 2
+    assert first_page[0]["id"] < first_page[1]["id"]
+
+    response = requests.get(url, headers=headers, params={**params, "after_id": first_page[-1]["id"]})
+    assert response.status_code == 200
+    second_page = response.json()
+    assert len(second_page) == 1
+
+    for review in first_page + second_page:
+        assert review["recording_id"] == recording.id
+        assert review["revision_number"] == 2
+        assert review["q_how_well_anno_matches_content"] == 8
+        assert review["creator"]["id"] == review["creator_id"] == creator_id
+        assert review["creator"]["username"] == review["creator_username"]
+
+    response = requests.get(url, headers=headers, params={"annotation_id": second_page[0]["annotation_id"], "min_score": 8})
+    assert response.status_code == 200
+    assert all(review["annotation_id"] == second_page[0]["annotation_id"] for review in response.json())
+
+
+@pytest.mark.order(208)
+def test_update_terminal_annotation_review(base_url, access_token):
+    """Test updating the answers of an annotation review."""
+    db: Session = next(get_db())
+    review = db.query(TerminalAnnotationReview).filter_by(q_how_well_anno_matches_content=8).order_by(TerminalAnnotationReview.id.desc()).first()
+    assert review is not None, "No annotation review found"
+    stats_before = db.query(TerminalAnnotationReviewStats).filter_by(annotation_id=review.annotation_id).first()
+    reviews_count_before, score_8_count_before, score_3_count_before = stats_before.reviews_count, stats_before.score_8_count, stats_before.score_3_count
+    db.close()
+
+    payload = {
+        "annotation_review_id": review.id,
+        "q_does_anno_match_content": False,
+        "q_can_anno_be_halved": False,
+        "q_how_well_anno_matches_content": 3,
+        "q_can_you_improve_anno": True,
+        "q_can_you_provide_markdown": False,
+    }
+    headers = get_auth_headers(access_token)
+    response = requests.post(f"{base_url}/annotation_reviews/update", json=payload, headers=headers)
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}"
+    assert response.json()["message"] == "Annotation review updated"
+
+    db: Session = next(get_db())
+    updated_review = db.query(TerminalAnnotationReview).filter_by(id=review.id).first()
+    assert updated_review.q_how_well_anno_matches_content == 3
+    assert updated_review.q_does_anno_match_content is False
+    stats = db.query(TerminalAnnotationReviewStats).filter_by(annotation_id=review.annotation_id).first()
+    assert stats.reviews_count == reviews_count_before
+    assert stats.score_8_count == score_8_count_before - 1
+    assert stats.score_3_count == score_3_count_before + 1
+
+    response = requests.post(f"{base_url}/annotation_reviews/update", json={**payload, "annotation_review_id": 999999999}, headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.order(209)
+def test_read_recording_query_count():
+    """Test that reading a recording revision costs the same number of queries however many reviewers it has."""
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(revision_number=2).order_by(TerminalRecording.id.desc()).first()
+    assert recording is not None, "No recording found"
+    recording_id = recording.id
+    db.close()
+
+    def count_read_queries():
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        session = SessionLocal()
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            recording_revision = read_recording_revision(session, recording_id, 2)
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+            session.close()
+        return len(statements), len(recording_revision["annotation_reviews"])
+
+    queries_before, reviews_before = count_read_queries()
+
+    # Add reviews from reviewers who have not reviewed this recording yet
+    db: Session = next(get_db())
+    annotation = db.query(TerminalRecordingAnnotation).filter_by(recording_id=recording_id, revision_number=2).first()
+    new_reviews = [
+        TerminalAnnotationReview(
+            annotation_id=annotation.id,
+            recording_id=recording_id,
+            revision_number=2,
+            creator_id=user.id,
+            creator_username=user.username,
+            q_does_anno_match_content=True,
+            q_can_anno_be_halved=True,
+            q_how_well_anno_matches_content=6,
+            q_can_you_improve_anno=False,
+            q_can_you_provide_markdown=False,
+        )
+        for user in db.query(User).filter(User.username.in_(["admin", "user2"])).all()
+    ]
+    db.add_all(new_reviews)
+    increment_annotation_reviews_count(db, {annotation.id: len(new_reviews)})
+    update_review_stats(db, added_reviews=new_reviews)
+    db.commit()
+    db.close()
+
+    queries_after, reviews_after = count_read_queries()
+    assert reviews_after == reviews_before + 2
+    assert queries_after == queries_before
+    assert queries_after <= 3
+
+
+@pytest.mark.order(210)
+def test_read_terminal_recording_conditional_get(base_url, access_token):
+    """Test revalidating a recording read with its ETag."""
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(revision_number=2).order_by(TerminalRecording.id.desc()).first()
+    assert recording is not None, "No recording found"
+    annotation = recording.annotations.filter_by(revision_number=2).first()
+    db.close()
+
+    headers = get_auth_headers(access_token)
+    url = f"{base_url}/recordings/terminal/read/{recording.id}"
+    response = requests.get(url, headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.removeprefix("W/").startswith('"')
+    assert response.headers["Cache-Control"] == "public, no-cache"
+
+    response = requests.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    # A new review of the revision changes the ETag
+    payload = {
+        "annotation_id": annotation.id,
+        "q_does_anno_match_content": True,
+        "q_can_anno_be_halved": False,
+        "q_how_well_anno_matches_content": 9,
+        "q_can_you_improve_anno": False,
+        "q_can_you_provide_markdown": False,
+    }
+    response = requests.post(f"{base_url}/annotation_reviews/create", json=payload, headers=headers)
+    assert response.status_code == 200
+
+    response = requests.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert any(review["q_how_well_anno_matches_content"] == 9 for review in response.json()["annotation_reviews"])
@@ -0,0 +1,163 @@
+import time
+from datetime import datetime, timezone
+import pytest
+import requests
+from sqlalchemy.orm.session import Session
+from models.recordings import TerminalRecording
+from utils.config import get_auth_headers
+from utils.database import get_db
+from utils.response_cache import InMemoryCacheBackend, RedisCacheBackend, ResponseCache, create_cache_backend
+
+
+class FakeRedis:
+    """In-process stand-in for the subset of the Redis client used by the cache backend."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at < time.monotonic():
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        self.values[key] = (value, time.monotonic() + ex if ex else None)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+
+@pytest.mark.order(400)
+def test_in_memory_cache_backend_eviction():
+    """Test that the in-memory backend evicts least recently used entries to stay within its size."""
+    backend = InMemoryCacheBackend(max_bytes=10, ttl_seconds=60)
+    backend.set("a", b"1234")
+    backend.set("b", b"1234")
+    assert backend.get("a") == b"1234"
+    backend.set("c", b"1234")
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1234"
+    assert backend.get("c") == b"1234"
+    assert backend.size_bytes == 8
+
+    backend.set("too_large", b"12345678901")
+    assert backend.get("too_large") is None
+
+    expired_backend = InMemoryCacheBackend(max_bytes=10, ttl_seconds=-1)
+    expired_backend.set("a", b"1")
+    assert expired_backend.get("a") is None
+
+
+@pytest.mark.order(401)
+def test_response_cache_with_redis_backend():
+    """Test the response cache round trip, invalidation and metrics on a fake Redis client."""
+    cache = ResponseCache(RedisCacheBackend(FakeRedis(), ttl_seconds=60))
+    assert cache.get("key") is None
+    cache.set("key", '"etag"', b'{"a": 1}')
+    assert cache.get("key") == ('"etag"', b'{"a": 1}')
+    # An entry cached with another ETag than the current one is stale
+    assert cache.get("key", '"etag"') == ('"etag"', b'{"a": 1}')
+    assert cache.get("key", '"newer-etag"') is None
+    cache.invalidate(["key"])
+    assert cache.get("key") is None
+
+    stats = cache.stats()
+    assert stats["backend"] == "RedisCacheBackend"
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+    assert stats["invalidations"] == 1
+
+    # The configured backend connects lazily, so it is created without a Redis server
+    assert isinstance(create_cache_backend("redis"), RedisCacheBackend)
+
+
+@pytest.mark.order(402)
+def test_read_terminal_recording_from_response_cache(base_url, access_token):
+    """Test that repeated recording reads are served from the response cache until the recording changes."""
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(revision_number=2).order_by(TerminalRecording.id.desc()).first()
+    assert recording is not None, "No recording found"
+    db.close()
+
+    headers = get_auth_headers(access_token)
+    url = f"{base_url}/recordings/terminal/read/{recording.id}"
+    stats_url = f"{base_url}/recordings/terminal/response_cache"
+
+    first_response = requests.get(url, headers=headers, params={"revision_number": 1})
+    assert first_response.status_code == 200
+    stats_before = requests.get(stats_url, headers=headers).json()
+
+    second_response = requests.get(url, headers=headers, params={"revision_number": 1})
+    assert second_response.status_code == 200
+    assert second_response.content == first_response.content
+    assert second_response.headers["ETag"] == first_response.headers["ETag"]
+
+    stats_after = requests.get(stats_url, headers=headers).json()
+    assert stats_after["hits"] == stats_before["hits"] + 1
+    assert stats_after["misses"] == stats_before["misses"]
+
+
+@pytest.mark.order(403)
+def test_response_cache_checks_recording_version(base_url, access_token):
+    """Test that cached reads are not served once the recording changed without this worker invalidating them."""
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(deleted_at=None).order_by(TerminalRecording.id.desc()).first()
+    assert recording is not None, "No recording found"
+
+    headers = get_auth_headers(access_token)
+    url = f"{base_url}/recordings/terminal/read/{recording.id}"
+    assert requests.get(url, headers=headers).status_code == 200
+    assert requests.get(url, headers=headers).status_code == 200
+
+    # Writes handled by other workers only invalidate their own caches, as a direct write does here
+    recording.deleted_at = datetime.now(timezone.utc)
+    db.commit()
+    assert requests.get(url, headers=headers).status_code == 404
+
+    recording.deleted_at = None
+    db.commit()
+    assert requests.get(url, headers=headers).status_code == 200
+    db.close()
+
+
+@pytest.mark.order(404)
+def test_read_terminal_recording_fields(base_url, access_token):
+    """Test that reads can select recording fields, with ETags of their own."""
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(revision_number=2).order_by(TerminalRecording.id.desc()).first()
+    assert recording is not None, "No recording found"
+    db.close()
+
+    headers = get_auth_headers(access_token)
+    url = f"{base_url}/recordings/terminal/read/{recording.id}"
+    full_response = requests.get(url, headers=headers)
+    assert full_response.status_code == 200
+
+    # Field order and repetition make no difference to the response or its ETag
+    response = requests.get(url, headers=headers, params={"fields": "title,id,title"})
+    assert response.status_code == 200
+    assert response.json()["recording"] == {"id": recording.id, "title": recording.title}
+    assert response.json()["annotations"] == full_response.json()["annotations"]
+    assert response.headers["ETag"] != full_response.headers["ETag"]
+    revalidated_response = requests.get(url, headers={**headers, "If-None-Match": response.headers["ETag"]}, params={"fields": "id,title"})
+    assert revalidated_response.status_code == 304
+
+    response = requests.get(url, headers=headers, params={"fields": "id,not_a_field"})
+    assert response.status_code == 400
+    assert "not_a_field" in response.json()["detail"]
+
+
+@pytest.mark.order(405)
+def test_list_terminal_recordings_etag(base_url, access_token):
+    """Test that an unchanged recording list is revalidated without downloading it again."""
+    headers = get_auth_headers(access_token)
+    url = f"{base_url}/recordings/terminal/list"
+    response = requests.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, no-cache"
+
+    revalidated_response = requests.get(url, headers={**headers, "If-None-Match": response.headers["ETag"]})
+    assert revalidated_response.status_code == 304
+    assert revalidated_response.content == b""
@@ -0,0 +1,26 @@
+import json
+import pytest
+from models.annotations import TerminalAnnotationRead
+from models.recordings import TerminalRecordingRead
+from routers.terminal_recordings import router as terminal_recordings_router
+from utils.json_responses import FastJSONResponse, serialize_orm
+from utils.serialization import build_large_recording, default_serialization, fast_serialization
+
+
+@pytest.mark.order(500)
+def test_fast_serialization():
+    """
+    Test that the fast path serializes a large recording as the default pydantic/jsonable_encoder path
+    does, and that the routes use it. Its speed is compared in the benchmark suite.
+    """
+    recording, annotations = build_large_recording(1024 * 1024)
+    fast_output = fast_serialization(recording, annotations)
+    assert json.loads(fast_output) == json.loads(default_serialization(recording, annotations))
+
+    content = {
+        "recording": serialize_orm(TerminalRecordingRead, recording),
+        "annotations": [serialize_orm(TerminalAnnotationRead, annotation) for annotation in annotations],
+    }
+    assert FastJSONResponse(content).body == fast_output
+    list_route = next(route for route in terminal_recordings_router.routes if route.path.endswith("/list"))
+    assert list_route.response_class is FastJSONResponse
@@ -0,0 +1,139 @@
+import gzip
+import json
+import pytest
+import requests
+import zstandard
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy.orm.session import Session
+from models.recordings import TerminalRecording
+from utils.compression import CompressionMiddleware, negotiate_encoding
+from utils.config import get_auth_headers
+from utils.database import get_db
+from utils.files import read_file
+
+
+def build_compression_app():
+    """Builds a minimal app behind the compression middleware with a small request size cap."""
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100, max_request_size=10_000)
+
+    @app.get("/large")
+    async def large():
+        return JSONResponse({"events": ["output line"] * 200}, headers={"ETag": '"large-v1"'})
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body()), "payload": await request.json()}
+
+    return app
+
+
+@pytest.mark.order(600)
+def test_negotiate_encoding():
+    """Test that Accept-Encoding negotiation honors quality values and falls back to identity."""
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("zstd, gzip") == "zstd"
+    assert negotiate_encoding("zstd;q=0.5, gzip") == "gzip"
+    assert negotiate_encoding("*") == "zstd"
+    assert negotiate_encoding("") is None
+
+
+@pytest.mark.order(601)
+def test_compression_middleware():
+    """Test response compression above the threshold and decompression of encoded request bodies."""
+    client = TestClient(build_compression_app())
+
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"large-v1"'
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(json.dumps(response.json()))
+    assert len(response.json()["events"]) == 200
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"large-v1"'
+
+    payload = {"text": "compressible " * 100}
+    body = gzip.compress(json.dumps(payload).encode())
+    headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    response = client.post("/echo", content=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["payload"] == payload
+
+    # Bodies that decompress beyond the cap, truncated streams and unknown codings are rejected
+    bomb = gzip.compress(b" " * 1_000_000)
+    assert len(bomb) < 10_000
+    assert client.post("/echo", content=bomb, headers=headers).status_code == 413
+    assert client.post("/echo", content=body[:-10], headers=headers).status_code == 400
+    response = client.post("/echo", content=body, headers={**headers, "Content-Encoding": "br"})
+    assert response.status_code == 415
+    assert response.headers["accept-encoding"] == "zstd, gzip"
+
+
+@pytest.mark.order(602)
+def test_zstd_compression_middleware():
+    """Test zstd response compression and decompression of zstd request bodies."""
+    client = TestClient(build_compression_app())
+
+    response = client.get("/large", headers={"Accept-Encoding": "zstd, gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "zstd"
+    assert response.headers["etag"] == 'W/"large-v1"'
+    assert int(response.headers["content-length"]) < len(json.dumps(response.json()))
+    assert len(response.json()["events"]) == 200
+
+    payload = {"text": "compressible " * 100}
+    body = zstandard.ZstdCompressor().compress(json.dumps(payload).encode())
+    headers = {"Content-Type": "application/json", "Content-Encoding": "zstd"}
+    response = client.post("/echo", content=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["payload"] == payload
+
+    bomb = zstandard.ZstdCompressor().compress(b" " * 1_000_000)
+    assert len(bomb) < 10_000
+    assert client.post("/echo", content=bomb, headers=headers).status_code == 413
+    assert client.post("/echo", content=body[:-10], headers=headers).status_code == 400
+    assert client.post("/echo", content=b"not zstd", headers=headers).status_code == 400
+
+
+@pytest.mark.order(603)
+def test_create_and_read_compressed_recording(base_url, access_token):
+    """Test creating a recording from a gzip request body and reading it back compressed."""
+    payload = {
+        "title": "Compressed upload",
+        "description": "A recording uploaded with Content-Encoding: gzip",
+        "recording_content": read_file("asciinema_recording_samples/recording_1_revision_1.txt"),
+    }
+    headers = {**get_auth_headers(access_token), "Content-Type": "application/json", "Content-Encoding": "gzip"}
+    response = requests.post(f"{base_url}/recordings/terminal/create", data=gzip.compress(json.dumps(payload).encode()), headers=headers)
+    assert response.status_code == 200, response.text
+    recording_id = response.json()["recording_id"]
+
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(id=recording_id).first()
+    assert recording.title == "Compressed upload"
+    assert len(recording.content_body) > 0
+
+    url = f"{base_url}/recordings/terminal/read/{recording_id}"
+    headers = {**get_auth_headers(access_token), "Accept-Encoding": "gzip"}
+    response = requests.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"].startswith("W/")
+    assert response.json()["recording"]["content_body"] == recording.content_body
+
+    # The weakened ETag still revalidates the recording
+    response = requests.get(url, headers={**headers, "If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
@@ -0,0 +1,65 @@
+import pytest
+import requests
+from models.utils.search import CONTENT_SEARCH_MAX_CHARS, extract_output_text
+from utils.config import get_auth_headers
+
+
+@pytest.mark.order(700)
+def test_extract_output_text():
+    """Test that output text is stripped of escape sequences, ignores input and is capped in size."""
+    events = [
+        [0.1, "o", "\u001b[01;32muser@host\u001b[00m:~$ "],
+        [0.2, "i", "secret input"],
+        [0.3, "o", "\u001b]0;window title\u0007python3 hello.py\r\n"],
+        [0.4, "o", "Hello, Annotations!\r\n"],
+    ]
+    text = extract_output_text(events)
+    assert "user@host" in text
+    assert "python3 hello.py" in text
+    assert "Hello, Annotations!" in text
+    assert "secret input" not in text
+    assert "window title" not in text
+    assert "\u001b" not in text
+
+    long_events = [[index, "o", "x" * 1000] for index in range(1000)]
+    assert len(extract_output_text(long_events)) == CONTENT_SEARCH_MAX_CHARS
+
+
+@pytest.mark.order(701)
+def test_search_recordings(base_url, access_token):
+    """Test ranked full-text search over recording metadata, annotations and terminal output."""
+    headers = get_auth_headers(access_token)
+    url = f"{base_url}/search"
+
+    # Title and description matches, stemmed as English
+    response = requests.get(url, headers=headers, params={"q": "compressed uploads"})
+    assert response.status_code == 200
+    response_data = response.json()
+    assert response_data["query"] == "compressed uploads"
+    assert [result["title"] for result in response_data["results"]] == ["Compressed upload"]
+    assert response_data["results"][0]["rank"] > 0
+
+    # Annotation text of the current revision
+    response = requests.get(url, headers=headers, params={"q": "\"bash prompt\""})
+    assert response.status_code == 200
+    assert "Updated Recording Title" in [result["title"] for result in response.json()["results"]]
+
+    # Terminal output, matched across every recording made from the sample file
+    response = requests.get(url, headers=headers, params={"q": "written", "limit": 1})
+    assert response.status_code == 200
+    first_page = response.json()
+    assert len(first_page["results"]) == 1
+    assert first_page["next_offset"] == 1
+    response = requests.get(url, headers=headers, params={"q": "written", "limit": 1, "offset": 1})
+    second_page = response.json()
+    assert len(second_page["results"]) == 1
+    assert second_page["results"][0]["id"] != first_page["results"][0]["id"]
+    assert second_page["results"][0]["rank"] <= first_page["results"][0]["rank"]
+
+    response = requests.get(url, headers=headers, params={"q": "nonexistentwordxyz"})
+    assert response.status_code == 200
+    assert response.json()["results"] == []
+    assert response.json()["next_offset"] is None
+
+    response = requests.get(url, headers=headers, params={"q": ""})
+    assert response.status_code == 422
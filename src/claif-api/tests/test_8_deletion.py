@@ -0,0 +1,210 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import pytest
+import requests
+from sqlalchemy import text
+from sqlalchemy.orm.session import Session
+from models.annotation_reviews import TerminalAnnotationReview
+from models.annotation_review_stats import TerminalAnnotationReviewStats, TerminalRecordingReviewStats
+from models.annotations import TerminalRecordingAnnotation
+from models.recordings import AudioFile, TerminalRecording
+from models.users import User
+from models.utils.annotation_review_stats import increment_annotation_reviews_count, update_review_stats
+from models.utils.purge import purge_deleted_audio_files, purge_deleted_terminal_recordings
+from utils.config import get_auth_headers
+from utils.database import get_db
+from utils.files import read_file, read_first_line_of_file
+
+
+@pytest.mark.order(800)
+def test_delete_terminal_recording(base_url, access_token):
+    """Test that a soft-deleted recording disappears from every read path."""
+    headers = get_auth_headers(access_token)
+    payload = {
+        "title": "Recording to delete",
+        "description": "Created to be soft deleted and purged",
+        "recording_content": read_file("asciinema_recording_samples/recording_1_revision_1.txt"),
+    }
+    response = requests.post(f"{base_url}/recordings/terminal/create", json=payload, headers=headers)
+    assert response.status_code == 200
+    recording_id = response.json()["recording_id"]
+    update_payload = {
+        "recording_id": recording_id,
+        "title": "Recording to delete",
+        "description": "Created to be soft deleted and purged",
+        "content_metadata": read_first_line_of_file("asciinema_recording_samples/recording_1_revision_2.txt"),
+    }
+    response = requests.post(f"{base_url}/recordings/terminal/update", json=update_payload, headers=headers)
+    assert response.status_code == 200
+
+    # Review an annotation directly so the purge has reviews and stats to remove
+    db: Session = next(get_db())
+    annotation = db.query(TerminalRecordingAnnotation).filter_by(recording_id=recording_id).first()
+    annotation_id = annotation.id
+    # The test user is user1, so another user reviews the recording and stands in as a non-creator
+    user = db.query(User).filter_by(username="admin").first()
+    review = TerminalAnnotationReview(
+        annotation_id=annotation.id,
+        recording_id=recording_id,
+        revision_number=annotation.revision_number,
+        creator_id=user.id,
+        creator_username=user.username,
+        q_does_anno_match_content=True,
+        q_can_anno_be_halved=False,
+        q_how_well_anno_matches_content=8,
+        q_can_you_improve_anno=False,
+        q_can_you_provide_markdown=False,
+    )
+    db.add(review)
+    increment_annotation_reviews_count(db, {annotation.id: 1})
+    update_review_stats(db, added_reviews=[review])
+    db.commit()
+
+    read_url = f"{base_url}/recordings/terminal/read/{recording_id}"
+    assert requests.get(read_url, headers=headers).status_code == 200
+
+    # Only the creator may delete a recording
+    recording = db.query(TerminalRecording).filter_by(id=recording_id).first()
+    creator_id = recording.creator_id
+    recording.creator_id = user.id
+    db.commit()
+    delete_url = f"{base_url}/recordings/terminal/delete/{recording_id}"
+    assert requests.delete(delete_url, headers=headers).status_code == 403
+    recording.creator_id = creator_id
+    db.commit()
+
+    response = requests.delete(delete_url, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["message"] == "Recording deleted"
+    db.refresh(recording)
+    assert recording.deleted_at is not None
+    db.close()
+
+    # The cached read is invalidated and every read path treats the recording as missing
+    assert requests.get(read_url, headers=headers).status_code == 404
+    assert requests.get(f"{base_url}/recordings/terminal/{recording_id}/annotations", headers=headers).status_code == 404
+    # Including reads of an explicit revision, whose annotations, reviews and stats are kept until the purge
+    for revision_number in (1, 2):
+        response = requests.get(f"{base_url}/recordings/terminal/{recording_id}/annotations", headers=headers, params={"revision_number": revision_number})
+        assert response.status_code == 404
+        response = requests.get(f"{base_url}/annotation_reviews/stats/recording/{recording_id}", headers=headers, params={"revision_number": revision_number})
+        assert response.status_code == 404
+    response = requests.get(f"{base_url}/annotation_reviews/{recording_id}", headers=headers, params={"revision_number": 2})
+    assert response.status_code == 200
+    assert response.json() == []
+    assert requests.get(f"{base_url}/annotation_reviews/stats/annotation/{annotation_id}", headers=headers).status_code == 404
+
+    # Reviews of the deleted recording can no longer be changed, even by their creator
+    db = next(get_db())
+    review = db.query(TerminalAnnotationReview).filter_by(recording_id=recording_id).first()
+    review_id = review.id
+    review.creator_id = db.query(User.id).filter_by(username="user1").scalar()
+    db.commit()
+    db.close()
+    response = requests.post(f"{base_url}/annotation_reviews/update", headers=headers, json={
+        "annotation_review_id": review_id,
+        "q_does_anno_match_content": False,
+        "q_can_anno_be_halved": False,
+        "q_how_well_anno_matches_content": 2,
+        "q_can_you_improve_anno": False,
+        "q_can_you_provide_markdown": False,
+    })
+    assert response.status_code == 404
+    assert requests.get(f"{base_url}/recordings/terminal/{recording_id}/stats", headers=headers).status_code == 404
+    assert requests.delete(delete_url, headers=headers).status_code == 404
+    response = requests.get(f"{base_url}/search", headers=headers, params={"q": "soft deleted purged"})
+    assert response.status_code == 200
+    assert response.json()["results"] == []
+
+
+@pytest.mark.order(801)
+def test_live_recordings_partial_indexes():
+    """Test that the listing and search indexes only cover live recordings."""
+    db: Session = next(get_db())
+    index_definitions = dict(db.execute(text(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'terminal_recordings'"
+    )).all())
+    db.close()
+    for index_name in (
+        "ix_terminal_recordings_live_id",
+        "ix_terminal_recordings_search_vector",
+        "ix_terminal_recordings_content_search_vector",
+    ):
+        assert index_definitions[index_name].endswith("WHERE (deleted_at IS NULL)")
+
+
+@pytest.mark.order(802)
+def test_update_waits_for_concurrent_delete(base_url, access_token):
+    """Test that an update racing a delete of the same recording does not add a revision to it once deleted."""
+    db: Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(deleted_at=None).order_by(TerminalRecording.id.desc()).first()
+    recording_id, revision_number = recording.id, recording.revision_number
+
+    # Hold the delete's lock on the recording while the update is sent
+    db.query(TerminalRecording).filter_by(id=recording_id).with_for_update().first()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        update = executor.submit(requests.post, f"{base_url}/recordings/terminal/update", headers=get_auth_headers(access_token), json={
+            "recording_id": recording_id,
+            "title": recording.title,
+            "description": recording.description,
+            "content_metadata": read_first_line_of_file("asciinema_recording_samples/recording_1_revision_2.txt"),
+        })
+        time.sleep(0.5)
+        recording.deleted_at = datetime.now(timezone.utc)
+        db.commit()
+        assert update.result().status_code == 404
+
+    db.refresh(recording)
+    assert recording.revision_number == revision_number
+
+    # Restore the recording for the tests that follow
+    recording.deleted_at = None
+    db.commit()
+    db.close()
+
+
+@pytest.mark.order(803)
+def test_purge_deleted_terminal_recordings():
+    """Test that purging removes deleted recordings with their annotations, reviews and stats."""
+    db: Session = next(get_db())
+    deleted_ids = [row.id for row in db.query(TerminalRecording.id).filter(TerminalRecording.deleted_at.isnot(None))]
+    assert len(deleted_ids) > 0
+    live_count = db.query(TerminalRecording).filter(TerminalRecording.deleted_at.is_(None)).count()
+
+    # Nothing is purged before the retention period has passed
+    assert purge_deleted_terminal_recordings(db, datetime.now(timezone.utc) - timedelta(days=1), batch_size=1) == 0
+    assert purge_deleted_terminal_recordings(db, datetime.now(timezone.utc) + timedelta(seconds=1), batch_size=1) == len(deleted_ids)
+
+    for model in (TerminalRecordingAnnotation, TerminalAnnotationReview, TerminalAnnotationReviewStats, TerminalRecordingReviewStats):
+        assert db.query(model).filter(model.recording_id.in_(deleted_ids)).count() == 0
+    assert db.query(TerminalRecording).filter(TerminalRecording.id.in_(deleted_ids)).count() == 0
+    assert db.query(TerminalRecording).count() == live_count
+    db.close()
+
+
+@pytest.mark.order(804)
+def test_purge_deleted_audio_files():
+    """Test that purging removes the stored objects of deleted audio files before their rows."""
+    db: Session = next(get_db())
+    now = datetime.now(timezone.utc)
+    audio_files = [
+        AudioFile(storage_path=f"audio/purge_test_{index}.wav", revision_number=1, title=f"purge_test_{index}.wav", deleted_at=now)
+        for index in range(3)
+    ]
+    live_audio_file = AudioFile(storage_path="audio/purge_test_live.wav", revision_number=1, title="purge_test_live.wav")
+    db.add_all(audio_files + [live_audio_file])
+    db.commit()
+    storage_paths = [audio_file.storage_path for audio_file in audio_files]
+
+    removed_files = []
+
+    def remove_files(file_names, bucket_name):
+        removed_files.extend(f"{bucket_name}/{file_name}" for file_name in file_names)
+
+    assert purge_deleted_audio_files(db, now + timedelta(seconds=1), batch_size=2, remove_files=remove_files) == 3
+    assert sorted(removed_files) == sorted(storage_paths)
+    assert db.query(AudioFile).filter(AudioFile.title.like("purge_test_%")).all() == [live_audio_file]
+    db.delete(live_audio_file)
+    db.commit()
+    db.close()
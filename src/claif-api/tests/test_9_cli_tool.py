@@ -1,3 +1,4 @@
+import json
 import sys
 import os
 import pytest
@@ -13,10 +14,12 @@ from conftest import logger
 
 
 @pytest.fixture
-def setup_cli(monkeypatch):
+def setup_cli(monkeypatch, tmp_path):
     """
     Fixture to set up the project directory and load the CLI module.
     """
+    # Each test starts with an empty local response cache
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
     project_dir = Path(__file__).parent.parent / "claif_cli"
     os.chdir(project_dir)
     sys.path.insert(0, str(project_dir))
@@ -69,7 +72,7 @@ def test_cli_review_terminal_recording(monkeypatch, setup_cli):
     annotation_id = recording.annotations.filter_by(revision_number=recording.revision_number).first().id
 
     # Set up input prompts for the review-recording command
-    inputs = [str(annotation_id), "yes", "yes", "5", "yes", "yes", "0"]
+    inputs = ["@35", "@", str(annotation_id), "yes", "yes", "5", "yes", "yes", "0"]
     set_input_prompts(monkeypatch, inputs)
 
     # Pass in args: review-recording, record_id, revision_number
@@ -84,6 +87,7 @@ def test_cli_review_terminal_recording(monkeypatch, setup_cli):
     captured_output_value = captured_output.getvalue()
     assert "Error" not in captured_output.getvalue()
     assert "Annotations for Recording ID" in captured_output_value
+    assert "Invalid time window" not in captured_output_value
     assert "Annotation review created" in captured_output_value
 
 
@@ -98,7 +102,7 @@ def test_cli_create_terminal_recording(monkeypatch, setup_cli):
     # Pass in args: create-recording, recording_filepath, title, description
     patch_sys_argv(monkeypatch, [
         "create-recording", str(recording_filepath),
-        "CLI Test Recording", "CLI Test Description"
+        "CLI Test Recording", "CLI Test Description", "--compress"
     ])
 
     # Capture stdout
@@ -205,3 +209,178 @@ def test_cli_create_audio_file(monkeypatch, setup_cli):
     captured_output_value = captured_output.getvalue()
     assert "Error" not in captured_output_value
     assert "File uploaded and metadata stored successfully" in captured_output_value
+
+
+@pytest.mark.order(907)
+def test_cli_interval_tree(setup_cli):
+    # The fixture puts the CLI modules on the import path
+    from interval_tree import IntervalTree
+
+    intervals = [(start, start + length, f"{start}-{start + length}") for start in range(0, 1000, 7) for length in (0, 5, 60)]
+    tree = IntervalTree(intervals)
+
+    for start, end in [(0, 0), (35, 35), (100, 180), (990, 2000), (-10, -1)]:
+        expected = sorted(
+            [interval for interval in intervals if interval[0] <= end and interval[1] >= start],
+            key=lambda interval: (interval[0], interval[1]),
+        )
+        assert tree.overlapping(start, end) == [item for _, _, item in expected]
+    assert tree.at(-1) == []
+
+
+@pytest.mark.order(908)
+def test_cli_search(monkeypatch, setup_cli):
+    # Unpack the fixture
+    main_module, _ = setup_cli
+
+    # The recording updated by the CLI is found by its new title
+    patch_sys_argv(monkeypatch, ["search", "CLI Test Recording Updated", "--limit", "5"])
+    captured_output = capture_output(monkeypatch)
+    main_module.main()
+
+    captured_output_value = captured_output.getvalue()
+    assert "Error" not in captured_output_value
+    assert "CLI Test Recording Updated" in captured_output_value
+
+
+@pytest.mark.order(909)
+def test_cli_refreshes_expired_token(monkeypatch, setup_cli):
+    # Unpack the fixture
+    main_module, project_dir = setup_cli
+
+    # Replace the saved access token with an invalid one, keeping the refresh token
+    access_token_path = project_dir / "access_token.json"
+    with open(access_token_path) as f:
+        tokens = json.load(f)
+    assert tokens["refresh_token"]
+    with open(access_token_path, "w") as f:
+        json.dump({**tokens, "access_token": "expired-token"}, f)
+
+    # Any prompt would fail the test, since the token must be renewed without one
+    set_input_prompts(monkeypatch, [])
+    patch_sys_argv(monkeypatch, ["search", "CLI Test Recording Updated"])
+    captured_output = capture_output(monkeypatch)
+    main_module.main()
+
+    captured_output_value = captured_output.getvalue()
+    assert "Error" not in captured_output_value
+    assert "CLI Test Recording Updated" in captured_output_value
+    with open(access_token_path) as f:
+        assert json.load(f)["access_token"] != "expired-token"
+
+
+@pytest.mark.order(910)
+def test_cli_retry_policy(setup_cli):
+    # The fixture puts the CLI modules on the import path
+    from http_client import create_session
+
+    retry = create_session(max_retries=3).get_adapter("http://localhost").max_retries
+    # Rate-limited requests are retried whatever the method; server errors only when idempotent
+    assert retry.is_retry("POST", 429)
+    assert retry.is_retry("GET", 503)
+    assert retry.is_retry("DELETE", 502)
+    assert not retry.is_retry("POST", 503)
+    assert not retry.is_retry("GET", 404)
+    assert retry.respect_retry_after_header
+
+
+@pytest.mark.order(911)
+def test_cli_bulk_import(monkeypatch, setup_cli, tmp_path):
+    # Unpack the fixture
+    main_module, _ = setup_cli
+
+    # One recording in a subdirectory, and a file that is neither a recording nor audio
+    recording_filepath = Path(__file__).parent.parent / "asciinema_recording_samples" / "recording_1_revision_1.txt"
+    (tmp_path / "session_1").mkdir()
+    (tmp_path / "session_1" / "bulk_import_test.cast").write_bytes(recording_filepath.read_bytes())
+    (tmp_path / "notes.md").write_text("not a recording")
+
+    patch_sys_argv(monkeypatch, ["bulk-import", str(tmp_path), "--workers", "2", "--compress"])
+    captured_output = capture_output(monkeypatch)
+    main_module.main()
+
+    captured_output_value = captured_output.getvalue()
+    assert "Error" not in captured_output_value
+    assert "[1/1] uploaded" in captured_output_value
+    assert "Uploaded 1, skipped 0, failed 0" in captured_output_value
+    with open(tmp_path / ".claif-import-manifest.json") as f:
+        manifest = json.load(f)
+    [entry] = manifest.values()
+    assert entry["kind"] == "terminal"
+    recording_id = entry["response"]["recording_id"]
+
+    db: pytest.Session = next(get_db())
+    recording = db.query(TerminalRecording).filter_by(id=recording_id).first()
+    assert recording.title == "bulk_import_test"
+    db.close()
+
+    # A rerun skips the file by its content, even after it was renamed
+    (tmp_path / "session_1" / "bulk_import_test.cast").rename(tmp_path / "session_1" / "renamed.cast")
+    captured_output = capture_output(monkeypatch)
+    main_module.main()
+    assert "Uploaded 0, skipped 1, failed 0" in captured_output.getvalue()
+
+
+@pytest.mark.order(912)
+def test_cli_bulk_import_adaptive_concurrency(setup_cli, tmp_path):
+    # The fixture puts the CLI modules on the import path
+    from bulk_import import AdaptiveConcurrency, ImportManifest
+
+    # Rate limiting halves the concurrency, and successes win it back additively
+    concurrency = AdaptiveConcurrency(8)
+    concurrency.acquire()
+    concurrency.release(rate_limited=True)
+    assert concurrency.limit == 4
+    concurrency.acquire()
+    concurrency.release(rate_limited=True)
+    concurrency.acquire()
+    concurrency.release(rate_limited=True)
+    concurrency.acquire()
+    concurrency.release(rate_limited=True)
+    assert concurrency.limit == 1
+    for _ in range(3):
+        concurrency.acquire()
+        concurrency.release(rate_limited=False)
+    assert 2 <= concurrency.limit < 3
+
+    # Content is claimed by one worker at a time and never again once recorded
+    manifest = ImportManifest(tmp_path / "manifest.json")
+    assert manifest.claim("digest")
+    assert not manifest.claim("digest")
+    manifest.release("digest")
+    assert manifest.claim("digest")
+    manifest.record("digest", {"path": "a.cast"})
+    assert not ImportManifest(tmp_path / "manifest.json").claim("digest")
+
+
+@pytest.mark.order(913)
+def test_cli_local_cache(monkeypatch, setup_cli, base_url):
+    # The fixture puts the CLI modules on the import path
+    import api_requests
+    from local_cache import cache_path
+    from recordings import REVIEW_RECORDING_FIELDS, fetch_recording
+
+    db: pytest.Session = next(get_db())
+    recording = db.query(TerminalRecording).filter(TerminalRecording.revision_number > 1).order_by(TerminalRecording.id.desc()).first()
+    db.close()
+
+    # Record the status of every response the CLI receives
+    statuses = []
+
+    def recording_request(*args, **kwargs):
+        response = request(*args, **kwargs)
+        statuses.append(response.status_code)
+        return response
+
+    request = api_requests.request
+    monkeypatch.setattr(api_requests, "request", recording_request)
+
+    first_read = fetch_recording(base_url, recording.id, None, fields=REVIEW_RECORDING_FIELDS)
+    assert set(first_read["recording"]) == {"id", "title", "revision_number"}
+    assert first_read["annotations"]
+
+    # The second read is revalidated with the cached ETag and served from the cache
+    second_read = fetch_recording(base_url, recording.id, None, fields=REVIEW_RECORDING_FIELDS)
+    assert second_read == first_read
+    assert statuses == [200, 304]
+    assert cache_path().exists()
@@ -2,6 +2,7 @@ import sys
 import importlib.util
 from pathlib import Path
 from io import StringIO
+from tests.utils.config import get_base_url
 
 def load_cli_module(project_dir):
     """
@@ -38,6 +39,6 @@ def assert_output(expected_output, captured_output):
 
 def patch_sys_argv(monkeypatch, command):
     """
-    Patches sys.argv with the given command.
+    Patches sys.argv with the given command, pointed at the API under test.
     """
-    monkeypatch.setattr(sys, 'argv', ['main.py'] + command)
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--base-url', get_base_url()] + command)
@@ -0,0 +1,249 @@
+"""
+Hermetic test harness: runs the API in the test process against a throwaway Postgres database, with
+in-process stand-ins for Keycloak, MinIO and the transcriber, so the test and benchmark suites need
+no other services.
+
+Enabled with CLAIF_HERMETIC=true. Postgres comes from TEST_POSTGRES_URL, a server URL whose user may
+create databases, or else from pgserver when it is installed; either way the suites get a database of
+their own, dropped at the end of the session.
+
+Access tokens are signed with an RSA key generated per session, whose public key is set in the app
+state before startup. Stored objects go to a temporary directory (see MINIO_FILESYSTEM_ROOT).
+"""
+import base64
+import gc
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+import uvicorn
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import FastAPI, Form, Request
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+
+HERMETIC_ENV_VAR = "CLAIF_HERMETIC"
+# Lifetime of the stand-in's access tokens, as Keycloak's default
+ACCESS_TOKEN_SECONDS = 300
+REFRESH_TOKEN_SECONDS = 1800
+
+
+def hermetic_enabled() -> bool:
+    return os.environ.get(HERMETIC_ENV_VAR, "false").lower() in ("1", "true", "yes")
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TokenSigner:
+    """Issues Keycloak-shaped access and refresh tokens signed with a freshly generated RSA key."""
+
+    def __init__(self):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_key_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        public_key_der = key.public_key().public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+        # Keycloak's realm endpoint returns the bare base64 key, which fetch_keycloak_public_key wraps as PEM
+        self.public_key_base64 = base64.b64encode(public_key_der).decode()
+        self.public_key_pem = "-----BEGIN PUBLIC KEY-----\n" + self.public_key_base64 + "\n-----END PUBLIC KEY-----"
+
+    @staticmethod
+    def keycloak_id(username: str) -> str:
+        """Returns the user's Keycloak ID, the same for every session."""
+        return str(uuid.uuid5(uuid.NAMESPACE_DNS, username))
+
+    def issue_tokens(self, username: str) -> dict:
+        now = int(time.time())
+        claims = {"sub": self.keycloak_id(username), "preferred_username": username, "iat": now}
+        access_token = jwt.encode({**claims, "aud": "account", "typ": "Bearer", "exp": now + ACCESS_TOKEN_SECONDS}, self.private_key_pem, algorithm="RS256")
+        refresh_token = jwt.encode({**claims, "typ": "Refresh", "exp": now + REFRESH_TOKEN_SECONDS}, self.private_key_pem, algorithm="RS256")
+        return {
+            "access_token": access_token,
+            "expires_in": ACCESS_TOKEN_SECONDS,
+            "refresh_token": refresh_token,
+            "refresh_expires_in": REFRESH_TOKEN_SECONDS,
+            "token_type": "Bearer",
+        }
+
+    def username_from_refresh_token(self, refresh_token: str) -> Optional[str]:
+        try:
+            claims = jwt.decode(refresh_token, self.public_key_pem, algorithms=["RS256"], options={"verify_aud": False})
+        except JWTError:
+            return None
+        return claims["preferred_username"] if claims.get("typ") == "Refresh" else None
+
+
+def create_stand_in_app(signer: TokenSigner, password: str) -> FastAPI:
+    """
+    Returns an app answering the Keycloak requests the API makes (the realm's public key and the
+    password and refresh token grants) and the transcriber's /transcribe. Every user has the password.
+    """
+    app = FastAPI()
+
+    def invalid_grant(description: str):
+        return JSONResponse(status_code=400, content={"error": "invalid_grant", "error_description": description})
+
+    @app.get("/realms/{realm}")
+    def read_realm(realm: str):
+        return {"realm": realm, "public_key": signer.public_key_base64, "token-service": f"/realms/{realm}/protocol/openid-connect"}
+
+    @app.post("/realms/{realm}/protocol/openid-connect/token")
+    def token(
+        grant_type: str = Form(...),
+        username: Optional[str] = Form(None),
+        password_: Optional[str] = Form(None, alias="password"),
+        refresh_token: Optional[str] = Form(None),
+    ):
+        if grant_type == "password":
+            if not username or password_ != password:
+                return JSONResponse(status_code=401, content={"error": "invalid_grant", "error_description": "Invalid user credentials"})
+            return signer.issue_tokens(username)
+        if grant_type == "refresh_token":
+            username = signer.username_from_refresh_token(refresh_token or "")
+            if username is None:
+                return invalid_grant("Invalid refresh token")
+            return signer.issue_tokens(username)
+        return JSONResponse(status_code=400, content={"error": "unsupported_grant_type"})
+
+    @app.post("/transcribe")
+    async def transcribe(request: Request):
+        payload = await request.json()
+        return {"filepath": payload.get("filepath"), "transcription": "Stand-in transcription."}
+
+    return app
+
+
+class BackgroundServer:
+    """Serves an ASGI app with uvicorn on a daemon thread of this process."""
+
+    def __init__(self, app, port: int):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_config=None, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self, timeout_seconds: float = 30):
+        self.thread.start()
+        deadline = time.monotonic() + timeout_seconds
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Test server failed to start")
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def create_throwaway_database(data_dir: Path) -> Tuple[str, Callable[[], None]]:
+    """Creates an empty database, returning its URL and a function dropping it."""
+    admin_url = os.environ.get("TEST_POSTGRES_URL")
+    server = None
+    if not admin_url:
+        try:
+            import pgserver
+        except ImportError:
+            raise RuntimeError("Hermetic tests need Postgres: set TEST_POSTGRES_URL to a server URL whose user may create databases, or install pgserver")
+        server = pgserver.get_server(data_dir / "pgdata", cleanup_mode="stop")
+        admin_url = server.get_uri("postgres")
+
+    database_name = f"claif_test_{uuid.uuid4().hex[:12]}"
+    admin_engine = create_engine(admin_url, isolation_level="AUTOCOMMIT", poolclass=NullPool)
+    with admin_engine.connect() as connection:
+        connection.execute(text(f'CREATE DATABASE "{database_name}"'))
+
+    def drop_database():
+        with admin_engine.connect() as connection:
+            connection.execute(text("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = :name AND pid <> pg_backend_pid()"), {"name": database_name})
+            connection.execute(text(f'DROP DATABASE IF EXISTS "{database_name}"'))
+        admin_engine.dispose()
+        if server is not None:
+            server.cleanup()
+
+    return make_url(admin_url).set(database=database_name).render_as_string(hide_password=False), drop_database
+
+
+class HermeticStack:
+    """
+    The services of one hermetic test session. configure_environment() must run before anything
+    imports utils.env, which reads the settings it overrides; start() then serves the API.
+    """
+
+    def __init__(self):
+        self.signer = TokenSigner()
+        self.data_dir: Optional[Path] = None
+        self.drop_database: Optional[Callable[[], None]] = None
+        self.servers = []
+        self.app = None
+
+    def configure_environment(self, **overrides: str):
+        """Creates the database and storage directory and points the settings at them and the stand-ins."""
+        if self.data_dir is not None:
+            return
+        self.data_dir = Path(tempfile.mkdtemp(prefix="claif_hermetic_"))
+        database_url, self.drop_database = create_throwaway_database(self.data_dir)
+        self.stand_in_port = get_free_port()
+        self.api_port = get_free_port()
+        stand_in_url = f"http://127.0.0.1:{self.stand_in_port}"
+        os.environ.update({
+            "DATABASE_URL": database_url,
+            "KEYCLOAK_SERVER_URL": stand_in_url,
+            "OPENAPI_KEYCLOAK_SERVER_URL": stand_in_url,
+            "CLAIF_TRANSCRIBER_ENDPOINT": stand_in_url,
+            "MINIO_FILESYSTEM_ROOT": str(self.data_dir / "objects"),
+            "CLAIF_API_HOST": "127.0.0.1",
+            "CLAIF_API_PORT": str(self.api_port),
+            **overrides,
+        })
+
+    def start(self):
+        """Starts the stand-ins and the API, creating the schema and the seeded users."""
+        if self.servers:
+            return
+        from main import app
+        from scripts.seed_users import seed_users
+        from utils.database import run_with_db_session
+        from utils.env import TEST_USER_PASSWORD
+
+        stand_in = BackgroundServer(create_stand_in_app(self.signer, TEST_USER_PASSWORD), self.stand_in_port)
+        stand_in.start()
+        self.servers.append(stand_in)
+
+        self.app = app
+        app.state.keycloak_public_key = self.signer.public_key_pem
+        api = BackgroundServer(app, self.api_port)
+        api.start()
+        self.servers.append(api)
+        run_with_db_session(seed_users)
+
+    def stop(self):
+        for server in reversed(self.servers):
+            server.stop()
+        self.servers = []
+        if self.app is not None:
+            from utils.database import engine
+            # Sessions the tests left open return their connections when collected
+            gc.collect()
+            engine.dispose()
+        if self.drop_database is not None:
+            self.drop_database()
+            self.drop_database = None
+        if self.data_dir is not None:
+            shutil.rmtree(self.data_dir, ignore_errors=True)
+            self.data_dir = None
+
+
+# The stack of this test session, shared by the test and benchmark suites' conftest modules
+stack = HermeticStack()
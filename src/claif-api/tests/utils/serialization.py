@@ -0,0 +1,64 @@
+import json
+from datetime import datetime, timezone
+from fastapi.encoders import jsonable_encoder
+from models.annotations import TerminalAnnotationRead, TerminalRecordingAnnotation
+from models.recordings import TerminalRecording, TerminalRecordingRead
+from models.users import User
+from utils.json_responses import dumps_json, serialize_orm
+import utils.database  # Registers every mapped model so the relationships resolve
+
+
+def build_large_recording(target_size_bytes):
+    """Builds an unsaved recording with a content body of about the target size and many annotations."""
+    events = []
+    size_bytes = 2
+    while size_bytes < target_size_bytes:
+        event = [round(len(events) * 0.013, 6), "o", f"\u001b[01;32muser@host\u001b[00m:~$ echo line {len(events)}\r\n"]
+        events.append(event)
+        size_bytes += len(json.dumps(event)) + 2
+
+    recording = TerminalRecording(
+        id=1,
+        title="Benchmark recording",
+        description="Synthetic recording for serialization benchmarks",
+        size_bytes=len(json.dumps(events)),
+        duration_milliseconds=events[-1][0] * 1000,
+        content_metadata=json.dumps({"version": 2, "width": 120, "height": 30}),
+        content_body=events,
+        annotations_count=2000,
+        revision_number=1,
+        creator=User(id=1, keycloak_id="kc-benchmark", username="benchmark"),
+        creator_id=1,
+        created_at=datetime.now(timezone.utc),
+        deleted_at=None,
+    )
+    annotations = [
+        TerminalRecordingAnnotation(
+            id=index + 1,
+            revision_number=1,
+            recording_id=1,
+            annotation_text=f"Annotation number {index}",
+            start_time_milliseconds=index * 100.0,
+            end_time_milliseconds=index * 100.0 + 250,
+            reviews_count=index % 7,
+            level=index % 3,
+        )
+        for index in range(2000)
+    ]
+    return recording, annotations
+
+
+def default_serialization(recording, annotations) -> bytes:
+    """Serializes a recording and its annotations through pydantic and jsonable_encoder, as FastAPI does by default."""
+    return json.dumps(jsonable_encoder({
+        "recording": TerminalRecordingRead.from_orm(recording),
+        "annotations": [TerminalAnnotationRead.from_orm(annotation) for annotation in annotations],
+    })).encode()
+
+
+def fast_serialization(recording, annotations) -> bytes:
+    """Serializes a recording and its annotations with serialize_orm and dumps_json, as the recording routes do."""
+    return dumps_json({
+        "recording": serialize_orm(TerminalRecordingRead, recording),
+        "annotations": [serialize_orm(TerminalAnnotationRead, annotation) for annotation in annotations],
+    })
@@ -1,5 +1,8 @@
+import threading
 import time
 import logging
+from collections import OrderedDict
+from typing import Optional
 
 from fastapi import HTTPException, status, Request, Depends
 from jose import JWTError, jwt
@@ -7,16 +10,31 @@ from keycloak import KeycloakGetError, KeycloakOpenID
 from sqlalchemy.orm import Session
 from slowapi import Limiter
 from utils.database import get_db
-from utils.env import KEYCLOAK_CLIENT_ID, KEYCLOAK_REALM, KEYCLOAK_SERVER_URL
+from utils.env import (
+    KEYCLOAK_CLIENT_ID,
+    KEYCLOAK_REALM,
+    KEYCLOAK_SERVER_URL,
+    KEYCLOAK_TIMEOUT_SECONDS,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_STORAGE_URI,
+    RATE_LIMIT_STRATEGY,
+    TOKEN_CLAIMS_CACHE_SECONDS,
+    TOKEN_CLAIMS_CACHE_SIZE,
+)
 from models.users import User
+import utils.rate_limit_storage  # Registers the postgresql:// rate limit storage
+
+
+# One client per process, so its HTTP sessions keep their connections to Keycloak open between requests
+keycloak_openid = KeycloakOpenID(
+    server_url=KEYCLOAK_SERVER_URL + "/",
+    client_id=KEYCLOAK_CLIENT_ID,
+    realm_name=KEYCLOAK_REALM,
+    timeout=KEYCLOAK_TIMEOUT_SECONDS,
+)
 
 
 def fetch_keycloak_public_key():
-    keycloak_openid = KeycloakOpenID(
-        server_url=KEYCLOAK_SERVER_URL + "/",
-        client_id=KEYCLOAK_CLIENT_ID,
-        realm_name=KEYCLOAK_REALM
-    )
     while True:
         try:
             public_key = keycloak_openid.public_key()
@@ -54,6 +72,58 @@ def decode_token(token: str, public_key: str):
         ) from e
 
 
+class TokenClaimsCache:
+    """Thread-safe LRU of verified token claims, each kept until its TTL or the token's expiry."""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None:
+                return None
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self.entries[token]
+                return None
+            self.entries.move_to_end(token)
+            return claims
+
+    def set(self, token: str, claims: dict):
+        expires_at = min(time.time() + self.ttl_seconds, claims.get("exp", 0))
+        with self.lock:
+            self.entries[token] = (expires_at, claims)
+            self.entries.move_to_end(token)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+token_claims_cache = TokenClaimsCache(TOKEN_CLAIMS_CACHE_SIZE, TOKEN_CLAIMS_CACHE_SECONDS)
+
+
+def get_token_claims(request: Request) -> dict:
+    """
+    Returns the verified claims of the request's bearer token.
+
+    The claims are kept on the request, so the rate limit key and the current user share one lookup,
+    and in a process-wide cache, so a token's signature is verified once rather than on every request.
+    Cached claims are never used past the token's expiry.
+    """
+    claims = getattr(request.state, "token_claims", None)
+    if claims is None:
+        token = get_token_from_request(request)
+        claims = token_claims_cache.get(token)
+        if claims is None:
+            claims = decode_token(token, request.app.state.keycloak_public_key)
+            token_claims_cache.set(token, claims)
+        request.state.token_claims = claims
+    return claims
+
+
 def extract_keycloak_id_from_token(token: str, public_key: str=None):
     if not public_key:
         public_key = fetch_keycloak_public_key()
@@ -62,9 +132,7 @@ def extract_keycloak_id_from_token(token: str, public_key: str=None):
 
 
 def extract_user_id_or_raise(request: Request):
-    public_key = request.app.state.keycloak_public_key
-    token = get_token_from_request(request)
-    user_id = extract_keycloak_id_from_token(token, public_key)
+    user_id = get_token_claims(request).get("sub")
     if not user_id:
         logging.error("Unauthorized access attempt")
         raise HTTPException(
@@ -82,12 +150,14 @@ def get_user_from_keycloak_id(db: Session, keycloak_id: str):
 
 
 def get_current_user(request: Request, db: Session = Depends(get_db)):
-    public_key = request.app.state.keycloak_public_key
-    token = get_token_from_request(request)
-    keycloak_id = extract_keycloak_id_from_token(token, public_key)
+    keycloak_id = get_token_claims(request).get("sub")
     return get_user_from_keycloak_id(db, keycloak_id)
 
 
+# Limits are counted per user in the configured storage, which is shared between processes unless it is memory://
 limiter = Limiter(
-    key_func=lambda request: extract_user_id_or_raise(request)
+    key_func=extract_user_id_or_raise,
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    strategy=RATE_LIMIT_STRATEGY,
+    enabled=RATE_LIMIT_ENABLED,
 )
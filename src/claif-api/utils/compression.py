@@ -0,0 +1,245 @@
+import zlib
+from typing import Optional
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from utils.env import COMPRESSION_MINIMUM_SIZE, MAX_DECOMPRESSED_REQUEST_BYTES
+
+
+# The content codings the server produces and accepts, in order of preference
+SUPPORTED_ENCODINGS = ("zstd", "gzip")
+DECOMPRESSION_ERRORS = (zlib.error, zstandard.ZstdError)
+# zstandard's decompressor imitates zlib's, unconsumed_tail included, so the two are told apart by type
+ZLIB_DECOMPRESSOR_TYPE = type(zlib.decompressobj())
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+ZSTD_INPUT_SLICE_BYTES = 256
+COMPRESSIBLE_CONTENT_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+
+
+class RequestBodyTooLarge(Exception):
+    """Raised when a compressed request body decompresses to more than the allowed size."""
+
+
+class UnsupportedContentEncoding(Exception):
+    """Raised for request bodies in an encoding the server cannot decompress."""
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Picks the preferred supported coding allowed by an Accept-Encoding header, or None for identity."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    candidates = [
+        coding for coding in SUPPORTED_ENCODINGS
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda coding: accepted.get(coding, accepted.get("*", 0.0)))
+
+
+def create_compressor(encoding: str):
+    """Returns a streaming compressor with compress() and flush() for a supported coding."""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+
+def create_decompressor(encoding: str):
+    """Returns a streaming decompressor for a supported coding of request bodies."""
+    if encoding == "gzip" or encoding == "x-gzip":
+        return zlib.decompressobj(31)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise UnsupportedContentEncoding(encoding)
+
+
+def iter_decompressed(decompressor, data: bytes, max_length: int):
+    """
+    Yields the decompressed output of data in bounded pieces so callers can stop early.
+
+    zlib can limit its output directly. zstd cannot, so it is fed small slices of input instead,
+    which bounds each piece by the format's maximum expansion of a slice.
+    """
+    if isinstance(decompressor, ZLIB_DECOMPRESSOR_TYPE):
+        while data:
+            chunk = decompressor.decompress(data, max_length)
+            data = decompressor.unconsumed_tail
+            if not chunk:
+                return
+            yield chunk
+        return
+    for offset in range(0, len(data), ZSTD_INPUT_SLICE_BYTES):
+        yield decompressor.decompress(data[offset:offset + ZSTD_INPUT_SLICE_BYTES])
+
+
+async def read_decompressed_body(receive, encoding: str, max_size: int) -> bytes:
+    """
+    Reads a compressed request body chunk by chunk, decompressing as it arrives.
+
+    Decompression stops as soon as the output exceeds max_size, so a small compressed body cannot
+    expand into an unbounded amount of memory.
+    """
+    decompressor = create_decompressor(encoding)
+    chunks = []
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        more_body = message.get("more_body", False)
+        for chunk in iter_decompressed(decompressor, message.get("body", b""), max_size - size + 1):
+            size += len(chunk)
+            if size > max_size:
+                raise RequestBodyTooLarge()
+            chunks.append(chunk)
+    if not decompressor.eof:
+        raise zlib.error("Truncated request body")
+    return b"".join(chunks)
+
+
+def is_compressible(headers: Headers) -> bool:
+    """Checks whether a response is text-like and not already encoded."""
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_CONTENT_TYPES)
+
+
+def weaken_etag(headers: MutableHeaders):
+    """Marks a strong ETag as weak, since compressed bytes differ from those the tag was computed for."""
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with zstd or gzip and decompressing encoded request bodies.
+
+    Responses smaller than minimum_size are sent as they are. A compressed response no longer has the
+    bytes its ETag was computed from, so the ETag is weakened, which still matches If-None-Match.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE, max_request_size: int = MAX_DECOMPRESSED_REQUEST_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.max_request_size = max_request_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_encoding = headers.get("content-encoding", "identity").strip().lower()
+        if content_encoding != "identity":
+            try:
+                body = await read_decompressed_body(receive, content_encoding, self.max_request_size)
+            except RequestBodyTooLarge:
+                response = JSONResponse({"detail": "Decompressed request body is too large"}, status_code=413)
+                await response(scope, receive, send)
+                return
+            except UnsupportedContentEncoding:
+                response = JSONResponse(
+                    {"detail": f"Unsupported Content-Encoding: {content_encoding}"},
+                    status_code=415,
+                    headers={"Accept-Encoding": ", ".join(SUPPORTED_ENCODINGS)},
+                )
+                await response(scope, receive, send)
+                return
+            except DECOMPRESSION_ERRORS:
+                response = JSONResponse({"detail": "Malformed compressed request body"}, status_code=400)
+                await response(scope, receive, send)
+                return
+            scope = dict(scope)
+            request_headers = MutableHeaders(scope=scope)
+            del request_headers["content-encoding"]
+            request_headers["content-length"] = str(len(body))
+            receive = replay_body(body)
+
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressingResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+def replay_body(body: bytes):
+    """Returns an ASGI receive callable that delivers an already read body, then a disconnect."""
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    return receive
+
+
+class CompressingResponder:
+    """Wraps ASGI send, deciding on the first body chunk whether the response gets compressed."""
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.downstream_send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.compressor = None
+        self.started = False
+
+    async def send(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Held back until the first body chunk shows whether compression applies
+            self.start_message = message
+            return
+        if message_type != "http.response.body":
+            await self.downstream_send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if self.start_message["status"] == 304:
+                # Revalidations answer for the compressed representation the client holds
+                weaken_etag(headers)
+            if not is_compressible(headers) or (not more_body and len(body) < self.minimum_size):
+                await self.downstream_send(self.start_message)
+                await self.downstream_send(message)
+                return
+            self.compressor = create_compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            weaken_etag(headers)
+            if more_body:
+                del headers["content-length"]
+            else:
+                body = self.compressor.compress(body) + self.compressor.flush()
+                headers["Content-Length"] = str(len(body))
+                await self.downstream_send(self.start_message)
+                await self.downstream_send({"type": "http.response.body", "body": body})
+                return
+            await self.downstream_send(self.start_message)
+
+        if self.compressor is None:
+            await self.downstream_send(message)
+            return
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.flush()
+        await self.downstream_send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -5,6 +5,7 @@ import os
 KEYCLOAK_SERVER_URL = os.environ.get("KEYCLOAK_SERVER_URL", "http://localhost:8085")
 KEYCLOAK_REALM = os.environ.get("KEYCLOAK_REALM", "fastapi")
 KEYCLOAK_CLIENT_ID = os.environ.get("KEYCLOAK_CLIENT_ID", "fastapi-client")
+KEYCLOAK_TIMEOUT_SECONDS = int(os.environ.get("KEYCLOAK_TIMEOUT_SECONDS", 10))
 OPENAPI_KEYCLOAK_SERVER_URL = os.environ.get("OPENAPI_KEYCLOAK_SERVER_URL", "http://localhost:8085")
 UVI_LOG_LEVEL = os.environ.get("UVICORN_LOGGING_LEVEL", "DEBUG")
 SQL_LOGGING_LEVEL = os.environ.get("SQL_LOGGING_LEVEL", "INFO")
@@ -16,4 +17,45 @@ MINIO_ENDPOINT = os.environ.get("MINIO_ENDPOINT", "localhost:9000")
 MINIO_ACCESS_KEY = os.environ.get("MINIO_ACCESS_KEY", "minio-user")
 MINIO_SECRET_KEY = os.environ.get("MINIO_SECRET_KEY", "minio-password")
 MINIO_AUDIO_BUCKET = os.environ.get("MINIO_AUDIO_BUCKET", "audio")
-CLAIF_TRANSCRIBER_ENDPOINT = os.environ.get("CLAIF_TRANSCRIBER_ENDPOINT", "http://localhost:8003")
\ No newline at end of file
+# Stores objects in this directory instead of MinIO, one subdirectory per bucket (local development and tests)
+MINIO_FILESYSTEM_ROOT = os.environ.get("MINIO_FILESYSTEM_ROOT")
+CLAIF_TRANSCRIBER_ENDPOINT = os.environ.get("CLAIF_TRANSCRIBER_ENDPOINT", "http://localhost:8003")
+# Response cache settings. Cached reads are only served after checking the recording's version, so
+# the per-process "memory" backend stays correct with several workers, whose writes only invalidate
+# their own caches; the shared "redis" backend lets them reuse each other's entries. "none" disables it.
+RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", 300))
+RESPONSE_CACHE_REDIS_URL = os.environ.get("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Compression settings. Responses smaller than the minimum size are not compressed, and compressed
+# request bodies are rejected once they decompress to more than the maximum size.
+COMPRESSION_MINIMUM_SIZE = int(os.environ.get("COMPRESSION_MINIMUM_SIZE", 1024))
+MAX_DECOMPRESSED_REQUEST_BYTES = int(os.environ.get("MAX_DECOMPRESSED_REQUEST_BYTES", 64 * 1024 * 1024))
+# Soft-deleted recordings and audio files are purged once deleted for longer than the retention period
+PURGE_RETENTION_DAYS = float(os.environ.get("PURGE_RETENTION_DAYS", 30))
+PURGE_BATCH_SIZE = int(os.environ.get("PURGE_BATCH_SIZE", 100))
+# Rows read through server-side cursors, and rows written, per round trip in batched scans and backfills
+DB_BATCH_SIZE = int(os.environ.get("DB_BATCH_SIZE", 1000))
+# Dataset exports are written as gzipped JSON Lines shards to their own bucket. Recordings are read
+# from the database in batches, and each export's watermark is set back by the overlap, so the next
+# incremental export also covers changes whose transactions were still running when this one began.
+MINIO_EXPORT_BUCKET = os.environ.get("MINIO_EXPORT_BUCKET", "exports")
+EXPORT_RECORDS_PER_SHARD = int(os.environ.get("EXPORT_RECORDS_PER_SHARD", 1000))
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 200))
+EXPORT_WATERMARK_OVERLAP_SECONDS = int(os.environ.get("EXPORT_WATERMARK_OVERLAP_SECONDS", 300))
+# Rate limiting settings. The default in-memory storage counts per process; deployments running
+# several workers or replicas should point the storage at Postgres (postgresql://...) or Redis
+# (redis://...) so every process shares the same counters.
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
+RATE_LIMIT_STORAGE_URI = os.environ.get("RATE_LIMIT_STORAGE_URI", "memory://")
+RATE_LIMIT_STRATEGY = os.environ.get("RATE_LIMIT_STRATEGY", "moving-window")
+# Reports the database statements each request executed in the X-DB-Query-Count header, for benchmarks
+QUERY_COUNT_HEADER_ENABLED = os.environ.get("QUERY_COUNT_HEADER_ENABLED", "false").lower() in ("1", "true", "yes")
+# Decoded access token claims are cached so rate limiting and authentication verify each token once
+TOKEN_CLAIMS_CACHE_SIZE = int(os.environ.get("TOKEN_CLAIMS_CACHE_SIZE", 10000))
+TOKEN_CLAIMS_CACHE_SECONDS = int(os.environ.get("TOKEN_CLAIMS_CACHE_SECONDS", 60))
+
+
+def rate_limit(route_name: str, default: str) -> str:
+    """Returns the rate limit of a route, overridable with the RATE_LIMIT_<ROUTE_NAME> environment variable."""
+    return os.environ.get(f"RATE_LIMIT_{route_name.upper()}", default)
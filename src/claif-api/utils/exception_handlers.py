@@ -1,5 +1,9 @@
+import math
+import time
 from functools import wraps
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from slowapi.errors import RateLimitExceeded
 
 
 def value_error_handler(func):
@@ -10,4 +14,13 @@ def value_error_handler(func):
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         # You can add more exception types here if needed
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
+    """Rejects a rate-limited request, telling the client in Retry-After when the limit next allows it."""
+    response = JSONResponse({"error": f"Rate limit exceeded: {exc.detail}"}, status_code=429)
+    current_limit = getattr(request.state, "view_rate_limit", None)
+    if current_limit is not None:
+        reset_at, _ = request.app.state.limiter.limiter.get_window_stats(current_limit[0], *current_limit[1])
+        response.headers["Retry-After"] = str(max(1, math.ceil(reset_at - time.time())))
+    return response
@@ -1,16 +1,26 @@
 
 from fastapi import FastAPI
+from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from fastapi.openapi.utils import get_openapi
 from utils.auth import limiter
-from utils.env import OPENAPI_KEYCLOAK_SERVER_URL, KEYCLOAK_REALM
+from utils.compression import CompressionMiddleware
+from utils.database import engine
+from utils.exception_handlers import rate_limit_exceeded_handler
+from utils.env import OPENAPI_KEYCLOAK_SERVER_URL, KEYCLOAK_REALM, QUERY_COUNT_HEADER_ENABLED
+from utils.query_count import QueryCountMiddleware, count_queries
 
 
 def init_fastapi_app() -> FastAPI:
     # Initialize and return FastAPI app
     app = FastAPI()
     app.add_middleware(SlowAPIMiddleware)
+    app.add_middleware(CompressionMiddleware)
+    if QUERY_COUNT_HEADER_ENABLED:
+        count_queries(engine)
+        app.add_middleware(QueryCountMiddleware)
     app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 
 
     # Custom OpenAPI schema to include the OAuth2 Password Flow in Swagger UI
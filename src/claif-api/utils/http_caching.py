@@ -0,0 +1,35 @@
+import hashlib
+from fastapi import Request, Response
+
+
+# Recording reads are the same for every user, so clients and shared caches such as Traefik may store
+# them. public lets shared caches store responses to requests with an Authorization header, and
+# no-cache makes them revalidate with the ETag before every reuse, so each reuse is still authorized.
+RECORDING_CACHE_CONTROL = "public, no-cache"
+
+
+def make_etag(*version_parts) -> str:
+    """Returns a strong ETag derived from the parts that identify a version of a resource."""
+    digest = hashlib.sha1(":".join(str(part) for part in version_parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def make_body_etag(body: bytes) -> str:
+    """Returns a strong ETag derived from a response body, for resources with no cheaper version to compare."""
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Checks the If-None-Match header against the ETag using the weak comparison required for GET."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque_tag for candidate in if_none_match.split(","))
+
+
+def not_modified_response(etag: str, cache_control: str) -> Response:
+    """Returns an empty 304 response carrying the validators of the unchanged resource."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
@@ -0,0 +1,48 @@
+from typing import Iterable, Optional
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def dumps_json(content) -> bytes:
+    """Serializes plain data (dicts, lists, scalars and datetimes) to JSON bytes."""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def dumps_json_text(content) -> str:
+    """Serializes plain data to a JSON string, used by the engine to encode JSONB columns."""
+    return dumps_json(content).decode()
+
+
+def loads_json(content):
+    """Parses JSON text or bytes, used by the engine to decode JSONB columns."""
+    return orjson.loads(content)
+
+
+def serialize_orm(model_class, obj, field_names: Optional[Iterable[str]] = None) -> dict:
+    """
+    Reads the fields of a pydantic model from an ORM object or row into a plain dict.
+
+    Unlike from_orm this skips validation, which the data already passed on its way into the
+    database, and only coerces floats into the ints the model declares so the output matches.
+    Given field_names, only those fields are read, so deferred columns left out are never loaded.
+    """
+    data = {}
+    for name, field in model_class.__fields__.items():
+        if field_names is not None and name not in field_names:
+            continue
+        value = getattr(obj, name)
+        if value is not None:
+            if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+                value = serialize_orm(field.type_, value)
+            elif field.type_ is int and isinstance(value, float):
+                value = int(value)
+        data[name] = value
+    return data
+
+
+class FastJSONResponse(JSONResponse):
+    """Opt-in response class for large bodies made of plain data, such as serialize_orm output."""
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
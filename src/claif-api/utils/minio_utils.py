@@ -1,15 +1,58 @@
 import io
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List
 from minio import Minio
+from minio.deleteobjects import DeleteError, DeleteObject
 from minio.error import S3Error
-from utils.env import MINIO_ENDPOINT, MINIO_ACCESS_KEY, MINIO_SECRET_KEY, MINIO_AUDIO_BUCKET
+from utils.env import MINIO_ENDPOINT, MINIO_ACCESS_KEY, MINIO_SECRET_KEY, MINIO_AUDIO_BUCKET, MINIO_FILESYSTEM_ROOT
+
+
+class FilesystemObjectStore:
+    """
+    Stores objects as files under a root directory, one subdirectory per bucket, implementing the
+    part of the MinIO client used here. Used instead of MinIO when MINIO_FILESYSTEM_ROOT is set,
+    for local development and hermetic tests.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _object_path(self, bucket_name: str, object_name: str) -> Path:
+        bucket_path = self.root / bucket_name
+        path = (bucket_path / object_name).resolve()
+        if bucket_path.resolve() not in path.parents:
+            raise ValueError(f"Invalid object name: {object_name}")
+        return path
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        return (self.root / bucket_name).is_dir()
+
+    def make_bucket(self, bucket_name: str):
+        (self.root / bucket_name).mkdir(parents=True, exist_ok=True)
+
+    def put_object(self, bucket_name: str, object_name: str, data: BinaryIO, length: int, content_type: str = "application/octet-stream"):
+        path = self._object_path(bucket_name, object_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data.read(length))
+
+    def remove_objects(self, bucket_name: str, delete_object_list: Iterable[DeleteObject]) -> Iterator[DeleteError]:
+        # Like MinIO, removing a missing object is not an error
+        for delete_object in delete_object_list:
+            self._object_path(bucket_name, delete_object._name).unlink(missing_ok=True)
+        return iter(())
+
 
 # Initialize MinIO Client
-minio_client = Minio(
-    endpoint=MINIO_ENDPOINT,
-    access_key=MINIO_ACCESS_KEY,
-    secret_key=MINIO_SECRET_KEY,
-    secure=False  # Set to True if using https
-)
+if MINIO_FILESYSTEM_ROOT:
+    minio_client = FilesystemObjectStore(MINIO_FILESYSTEM_ROOT)
+else:
+    minio_client = Minio(
+        endpoint=MINIO_ENDPOINT,
+        access_key=MINIO_ACCESS_KEY,
+        secret_key=MINIO_SECRET_KEY,
+        secure=False  # Set to True if using https
+    )
 
 # Ensure bucket exists
 def ensure_bucket_exists(bucket_name: str = MINIO_AUDIO_BUCKET):
@@ -39,3 +82,13 @@ def upload_file_to_minio(file_data: bytes, file_name: str, content_type: str, bu
         return {"message": "File uploaded successfully", "file_name": file_name}
     except S3Error as e:
         raise RuntimeError(f"Error uploading file: {str(e)}")
+
+
+# Remove files from MinIO
+def remove_files_from_minio(file_names: List[str], bucket_name: str = MINIO_AUDIO_BUCKET):
+    """Removes files from MinIO in a single multi-object delete request."""
+    if not file_names:
+        return
+    errors = list(minio_client.remove_objects(bucket_name, [DeleteObject(file_name) for file_name in file_names]))
+    if errors:
+        raise RuntimeError(f"Error removing files: {', '.join(str(error) for error in errors)}")
@@ -0,0 +1,52 @@
+from contextvars import ContextVar
+from typing import List, Optional
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+
+# The statement count of the request being handled; a list, so work run in threads copying the
+# context still adds to the request's count
+_query_count: ContextVar[Optional[List[int]]] = ContextVar("query_count", default=None)
+
+
+def count_queries(engine):
+    """Counts every statement executed on the engine towards the request being handled."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def add_query(conn, cursor, statement, parameters, context, executemany):
+        query_count = _query_count.get()
+        if query_count is not None:
+            query_count[0] += 1
+
+
+class QueryCountMiddleware:
+    """
+    ASGI middleware reporting the number of database statements each request executed in the
+    X-DB-Query-Count response header, for benchmarks to catch N+1 queries and other regressions.
+
+    Only statements executed before the response starts are counted, so work done by background
+    tasks is left out.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query_count = [0]
+        token = _query_count.set(query_count)
+
+        async def send_with_query_count(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[QUERY_COUNT_HEADER] = str(query_count[0])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_query_count)
+        finally:
+            _query_count.reset(token)
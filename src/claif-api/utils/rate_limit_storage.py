@@ -0,0 +1,134 @@
+from typing import Tuple
+from limits.storage import MovingWindowSupport, Storage
+from sqlalchemy import Column, Float, Index, Integer, MetaData, String, Table, case, create_engine, delete, func, insert, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert as postgres_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+
+rate_limit_metadata = MetaData()
+
+# Counters and hits are cheap to lose on a crash, so the tables skip the write-ahead log
+rate_limit_counters = Table(
+    "rate_limit_counters",
+    rate_limit_metadata,
+    Column("key", String, primary_key=True),
+    Column("count", Integer, nullable=False),
+    Column("expires_at", Float, nullable=False),
+    prefixes=["UNLOGGED"],
+)
+rate_limit_hits = Table(
+    "rate_limit_hits",
+    rate_limit_metadata,
+    Column("key", String, nullable=False),
+    Column("hit_at", Float, nullable=False),
+    Index("ix_rate_limit_hits_key_hit_at", "key", "hit_at"),
+    prefixes=["UNLOGGED"],
+)
+
+# Times come from the database clock so every worker and replica agrees on the windows
+DATABASE_NOW = literal_column("extract(epoch from clock_timestamp())", Float)
+
+
+class PostgresStorage(Storage, MovingWindowSupport):
+    """
+    Rate limit storage shared by every worker and replica through Postgres, selected with a
+    postgresql:// storage URI.
+
+    Fixed windows are single-statement upserts. Moving windows record one row per hit and take a
+    transaction-scoped advisory lock on the key, so concurrent checks of one key are serialized
+    while different keys never wait on each other. Hits older than the window are pruned whenever
+    their key is checked.
+    """
+
+    STORAGE_SCHEME = ["postgresql", "postgres"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        if uri.startswith("postgres://"):
+            uri = "postgresql://" + uri[len("postgres://"):]
+        self.engine = create_engine(uri, pool_pre_ping=True, **options)
+        rate_limit_metadata.create_all(self.engine, checkfirst=True)
+
+    @property
+    def base_exceptions(self):
+        return SQLAlchemyError
+
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        # An expired window restarts at the incoming amount within the same upsert
+        expired = rate_limit_counters.c.expires_at <= DATABASE_NOW
+        statement = postgres_insert(rate_limit_counters).values(key=key, count=amount, expires_at=DATABASE_NOW + expiry)
+        statement = statement.on_conflict_do_update(
+            index_elements=[rate_limit_counters.c.key],
+            set_={
+                "count": case((expired, amount), else_=rate_limit_counters.c.count + amount),
+                "expires_at": statement.excluded.expires_at if elastic_expiry else case(
+                    (expired, statement.excluded.expires_at), else_=rate_limit_counters.c.expires_at,
+                ),
+            },
+        ).returning(rate_limit_counters.c.count)
+        with self.engine.begin() as connection:
+            return connection.execute(statement).scalar_one()
+
+    def get(self, key: str) -> int:
+        with self.engine.connect() as connection:
+            count = connection.execute(select(rate_limit_counters.c.count).where(
+                rate_limit_counters.c.key == key,
+                rate_limit_counters.c.expires_at > DATABASE_NOW,
+            )).scalar()
+        return count or 0
+
+    def get_expiry(self, key: str) -> int:
+        with self.engine.connect() as connection:
+            expires_at = connection.execute(select(func.coalesce(
+                select(rate_limit_counters.c.expires_at).where(rate_limit_counters.c.key == key).scalar_subquery(),
+                DATABASE_NOW,
+            ))).scalar_one()
+        return int(expires_at)
+
+    def check(self) -> bool:
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            return True
+        except SQLAlchemyError:
+            return False
+
+    def reset(self) -> int:
+        with self.engine.begin() as connection:
+            cleared = connection.execute(delete(rate_limit_counters)).rowcount
+            cleared += connection.execute(delete(rate_limit_hits)).rowcount
+        return cleared
+
+    def clear(self, key: str) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(delete(rate_limit_counters).where(rate_limit_counters.c.key == key))
+            connection.execute(delete(rate_limit_hits).where(rate_limit_hits.c.key == key))
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        with self.engine.begin() as connection:
+            # The clock is read after the lock is granted, so waiting for it never ages the window
+            key_lock = select(func.pg_advisory_xact_lock(func.hashtext(key))).subquery()
+            now = connection.execute(select(DATABASE_NOW).select_from(key_lock)).scalar_one()
+            connection.execute(delete(rate_limit_hits).where(
+                rate_limit_hits.c.key == key,
+                rate_limit_hits.c.hit_at <= now - expiry,
+            ))
+            acquired = connection.execute(select(func.count()).where(rate_limit_hits.c.key == key)).scalar_one()
+            if acquired + amount > limit:
+                return False
+            connection.execute(insert(rate_limit_hits), [{"key": key, "hit_at": now}] * amount)
+        return True
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> Tuple[int, int]:
+        with self.engine.connect() as connection:
+            oldest_hit_at, acquired, now = connection.execute(select(
+                func.min(rate_limit_hits.c.hit_at),
+                func.count(rate_limit_hits.c.hit_at),
+                DATABASE_NOW,
+            ).where(
+                rate_limit_hits.c.key == key,
+                rate_limit_hits.c.hit_at > DATABASE_NOW - expiry,
+            )).one()
+        return int(oldest_hit_at if oldest_hit_at is not None else now), acquired
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+import redis
+from utils._logging import logging
+from utils.env import (
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_REDIS_URL,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+
+
+class InMemoryCacheBackend:
+    """Thread-safe LRU of byte strings bounded by total size, with a time to live per entry."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: int):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.size_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self.size_bytes += len(value)
+            while self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def delete(self, *keys: str):
+        with self.lock:
+            for key in keys:
+                self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry[1])
+
+
+class RedisCacheBackend:
+    """Cache backend shared by all workers and replicas through a Redis-compatible client."""
+
+    def __init__(self, client, ttl_seconds: int):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes):
+        self.client.set(key, value, ex=self.ttl_seconds)
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*keys)
+
+
+class ResponseCache:
+    """Caches serialized response bodies together with their ETags and counts hits and misses."""
+
+    def __init__(self, backend=None, namespace: str = "claif:responses"):
+        self.backend = backend
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str, etag: str = None) -> Optional[Tuple[str, bytes]]:
+        """
+        Returns the cached (etag, body) for the key, or None on a miss. Given the current ETag, an
+        entry cached with another one is stale and also a miss.
+        """
+        value = self.backend.get(f"{self.namespace}:{key}") if self.backend else None
+        if value is not None:
+            cached_etag, _, body = value.partition(b"\n")
+            cached_etag = cached_etag.decode()
+            if etag is not None and cached_etag != etag:
+                value = None
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return cached_etag, body
+
+    def set(self, key: str, etag: str, body: bytes):
+        if self.backend:
+            self.backend.set(f"{self.namespace}:{key}", etag.encode() + b"\n" + body)
+
+    def invalidate(self, keys: Iterable[str]):
+        keys = [f"{self.namespace}:{key}" for key in keys]
+        if self.backend:
+            self.backend.delete(*keys)
+        with self.lock:
+            self.invalidations += len(keys)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__ if self.backend else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "invalidations": self.invalidations,
+            }
+
+
+def create_cache_backend(backend_name: str = RESPONSE_CACHE_BACKEND):
+    """Creates the configured cache backend, or None when caching is disabled."""
+    if backend_name == "memory":
+        return InMemoryCacheBackend(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS)
+    if backend_name == "redis":
+        return RedisCacheBackend(redis.Redis.from_url(RESPONSE_CACHE_REDIS_URL), RESPONSE_CACHE_TTL_SECONDS)
+    if backend_name != "none":
+        logging.warning(f"Unknown response cache backend '{backend_name}', caching is disabled.")
+    return None
+
+
+response_cache = ResponseCache(create_cache_backend())
+
+
+def recording_cache_key(recording_id: int, revision_number: int = None) -> str:
+    """Returns the cache key of a terminal recording read; reads without a revision use the latest one."""
+    return f"terminal_recording:{recording_id}:{revision_number if revision_number is not None else 'latest'}"
+
+
+def invalidate_recording(recording_id: int, revision_numbers: Iterable[int]):
+    """Drops the cached reads of the given revisions of a recording and of its latest revision."""
+    keys = [recording_cache_key(recording_id, revision_number) for revision_number in set(revision_numbers)]
+    response_cache.invalidate(keys + [recording_cache_key(recording_id)])